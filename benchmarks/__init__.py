@@ -0,0 +1,5 @@
+# benchmarks/
+# Synthetic data (datagen.py) and timed runs of the hot paths (run.py) against
+# a throwaway SQLite database:
+#   python -m benchmarks.run --out before.json
+#   python -m benchmarks.run --compare before.json
@@ -0,0 +1,97 @@
+# benchmarks/datagen.py
+# Deterministic synthetic data: same seed + sizes -> same rows, byte for byte.
+import random
+from datetime import date, datetime, timedelta
+
+from database import session, rebuild_daily_stats, change_version
+
+WORDS = ("report review reply budget plan design meeting email invoice refactor deploy release "
+         "bug test docs call draft slides client hiring roadmap sync research notes backup taxes "
+         "groceries gym dentist renew update migrate audit survey launch polish fix write read").split()
+PRIORITIES = (("Low", 45), ("Medium", 40), ("High", 15))
+PROGRESS = (("Not started", 55), ("In progress", 25), ("Completed", 20))
+SESSION_MINUTES = ((25, 60), (50, 20), (15, 12), (90, 8))  # pomodoro-ish lengths
+CHUNK = 10000
+
+def _weighted(rnd, pairs):
+    values, weights = zip(*pairs)
+    return lambda: rnd.choices(values, weights)[0]
+
+def _task_rows(rnd, n_tasks, folder_ids, today):
+    prio, prog = _weighted(rnd, PRIORITIES), _weighted(rnd, PROGRESS)
+    span = 730  # two years of history
+    for tid in range(1, n_tasks + 1):
+        # Older ids are older tasks, like a real table
+        created = datetime.combine(today - timedelta(days=span - span * tid // n_tasks), datetime.min.time()) \
+            + timedelta(seconds=rnd.randrange(86400))
+        start = created.date() + timedelta(days=rnd.randint(0, 14)) if rnd.random() < 0.4 else None
+        due = created.date() + timedelta(days=int(rnd.expovariate(1 / 10))) if rnd.random() < 0.65 else None
+        progress = prog()
+        done = progress == "Completed" or rnd.random() < 0.05
+        completed = created + timedelta(hours=rnd.randint(1, 24 * 20)) if done else None
+        if completed and completed.date() > today:
+            completed = datetime.combine(today, created.time())
+        title = " ".join(rnd.sample(WORDS, rnd.randint(2, 5))).capitalize()
+        notes = " ".join(rnd.choices(WORDS, k=rnd.randint(5, 25))) if rnd.random() < 0.3 else None
+        # Inbox gets about a third of everything
+        folder = folder_ids[0] if rnd.random() < 0.35 else rnd.choice(folder_ids)
+        yield (tid, title, notes, start, due, prio(), progress, 1 if done else 0, completed, folder, created)
+
+def _session_rows(rnd, n_sessions, n_tasks, today):
+    length = _weighted(rnd, SESSION_MINUTES)
+    first = datetime.combine(today - timedelta(days=730), datetime.min.time())
+    for sid in range(1, n_sessions + 1):
+        day = first + timedelta(days=730 * sid // n_sessions)
+        started = day + timedelta(hours=rnd.choice(range(7, 23)), minutes=rnd.randrange(60))
+        mins = length()
+        task = rnd.randint(1, n_tasks) if rnd.random() < 0.8 else None
+        yield (sid, task, started, started + timedelta(minutes=mins), mins)
+
+def _insert(sql, rows, progress=None, label="", versioned=False):
+    """executemany `rows` CHUNK at a time; versioned rows get the batch's row_version appended."""
+    def flush(batch):
+        with session() as cur:
+            if versioned:  # stamped like io_service.import_table, so delta sync sees them
+                version = change_version(cur)
+                batch = [row + (version,) for row in batch]
+            cur.executemany(sql, batch)
+    batch, count = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == CHUNK:
+            flush(batch)
+            count += len(batch); batch = []
+            if progress: progress(label, count)
+    if batch:
+        flush(batch)
+        count += len(batch)
+    if progress: progress(label, count)
+    return count
+
+def generate(n_folders: int = 12, n_tasks: int = 100_000, n_sessions: int = 1_000_000,
+             seed: int = 42, today: date | None = None, progress=None) -> dict:
+    """Replace all task data with a synthetic set; returns row counts.
+
+    `today` pins the dates (default: the real today), so two runs on the same
+    day with the same arguments produce identical tables.
+    """
+    rnd = random.Random(seed)
+    today = today or date.today()
+    with session() as cur:
+        for table in ("focus_sessions", "daily_task_focus", "daily_stats", "tasks", "folders"):
+            cur.execute(f"DELETE FROM {table}")
+        names = ["Inbox"] + [f"Project {i:02d}" for i in range(1, n_folders)]
+        version = change_version(cur)
+        cur.executemany("INSERT INTO folders (id, name, row_version) VALUES (%s, %s, %s)",
+                        [(fid, name, version) for fid, name in enumerate(names, 1)])
+    folder_ids = list(range(1, len(names) + 1))
+    tasks = _insert(
+        "INSERT INTO tasks (id, title, notes, start_date, due_date, priority, progress, is_done, "
+        "completed_at, folder_id, created_at, row_version) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)",
+        _task_rows(rnd, n_tasks, folder_ids, today), progress, "tasks", versioned=True)
+    sessions = _insert(
+        "INSERT INTO focus_sessions (id, task_id, started_at, ended_at, duration_minutes) VALUES (%s,%s,%s,%s,%s)",
+        _session_rows(rnd, n_sessions, n_tasks, today), progress, "focus_sessions")
+    with session() as cur:
+        rebuild_daily_stats(cur)
+    return {"folders": len(names), "tasks": tasks, "focus_sessions": sessions}
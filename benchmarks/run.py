@@ -0,0 +1,200 @@
+# benchmarks/run.py
+# Time the hot service / UI paths on synthetic data and write JSON results.
+#
+#   python -m benchmarks.run [--tasks N] [--sessions N] [--out FILE] [--compare OLD.json]
+#
+# Always runs on SQLite (a throwaway file, generated once per size/seed and
+# reused), so numbers are comparable across commits without a MySQL server.
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+REGRESSION_RATIO = 1.25  # --compare flags anything this much slower (median)
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(description="FocusFlow benchmarks")
+    p.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "focusflow-bench.db"))
+    p.add_argument("--folders", type=int, default=12)
+    p.add_argument("--tasks", type=int, default=100_000)
+    p.add_argument("--sessions", type=int, default=1_000_000)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark (after one warm-up)")
+    p.add_argument("--regen", action="store_true", help="rebuild the data even if it matches")
+    p.add_argument("--no-ui", action="store_true", help="skip the Tk benchmarks")
+    p.add_argument("--out", help="results file (default: benchmarks/results/<commit>.json)")
+    p.add_argument("--compare", help="earlier results file; exit 1 on regressions")
+    return p.parse_args(argv)
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception:
+        return None
+
+def _time(fn, repeat: int) -> dict:
+    fn()  # warm-up (caches, page cache, lazy imports)
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - t0) * 1000)
+    return {"min_ms": round(min(runs), 3), "median_ms": round(statistics.median(runs), 3),
+            "mean_ms": round(statistics.fmean(runs), 3), "runs": len(runs)}
+
+# ---------- Service benchmarks ----------
+def _service_benches(today: date, n_tasks: int):
+    from models import TaskFilter
+    from services import task_service as ts, settings_service as ss, search_service as search, sync_service as sync
+    from ui import SETTING_DEFAULTS
+
+    overdue = TaskFilter.from_mode("overdue", today=today)
+    week = TaskFilter.from_mode("week", today=today)
+    in_progress = TaskFilter.from_mode("p_in", "High", today=today)
+    ids = list(range(1, n_tasks + 1, max(n_tasks // 1000, 1)))[:1000]  # 1000 spread-out tasks
+
+    def settings_cold():
+        ss.invalidate_settings()
+        ss.get_settings(SETTING_DEFAULTS.keys(), SETTING_DEFAULTS)
+
+    def toggle_round_trip():
+        ts.toggle_done_many(ids, True); ts.toggle_done_many(ids, False)
+
+    def priority_round_trip():
+        ts.update_priority_many(ids, "High"); ts.update_priority_many(ids, "Low")
+
+    return {
+        "list_tasks.all": lambda: ts.list_tasks(),
+        "list_tasks.all_table": lambda: ts.list_tasks(as_table=True),
+        "list_tasks.inbox_overdue": lambda: ts.list_tasks(folder_id=1, filters=overdue),
+        "list_tasks.inbox_week": lambda: ts.list_tasks(folder_id=1, filters=week),
+        "list_tasks.folder_in_progress_high": lambda: ts.list_tasks(folder_id=2, filters=in_progress),
+        "list_tasks_page.first": lambda: ts.list_tasks_page(folder_id=1),
+        "get_mini_stats": ts.get_mini_stats,
+        "settings.get_settings_cached": lambda: ss.get_settings(SETTING_DEFAULTS.keys(), SETTING_DEFAULTS),
+        "settings.get_settings_cold": settings_cold,
+        "bulk.toggle_done_1000_x2": toggle_round_trip,
+        "bulk.update_priority_1000_x2": priority_round_trip,
+        "search.prefix": lambda: search.search("rep bud"),
+        "sync.poll_idle": lambda: sync.changes_since(sync.current_version()),
+    }
+
+# ---------- UI benchmarks ----------
+def _pump_until(root, done, timeout_s: float = 30):
+    end = time.perf_counter() + timeout_s
+    while not done():
+        if time.perf_counter() > end:
+            raise TimeoutError("UI did not settle")
+        root.update()
+        time.sleep(0.001)
+
+def _ui_benches(stack):
+    """App on a withdrawn Tk root; each bench waits until the rows are on screen."""
+    import tkinter as tk
+    from ui import App
+    root = tk.Tk(); root.withdraw()
+    app = App(root)
+    stack.append(lambda: (app.close(), root.destroy()))
+
+    applied = []
+    set_rows = app.table.set_rows
+    def tracking_set_rows(rows):
+        set_rows(rows); applied.append(1)
+    app.table.set_rows = tracking_set_rows
+    _pump_until(root, lambda: applied)  # initial load
+
+    def settle(action):
+        def bench():
+            applied.clear(); action(); _pump_until(root, lambda: applied)
+        return bench
+
+    modes = iter(["overdue", "all"] * 1000)
+    return {
+        "ui.reload_tasks": settle(app.reload_tasks),
+        "ui.on_set_filter": settle(lambda: app.on_set_filter(next(modes))),
+    }
+
+# ---------- Results ----------
+def _compare(results: dict, old_path: str) -> int:
+    with open(old_path, encoding="utf-8") as fh:
+        old = json.load(fh)["results"]
+    worse = 0
+    print(f"\n{'benchmark':40} {'before':>10} {'after':>10} {'ratio':>7}")
+    for name, r in results.items():
+        if name not in old or "median_ms" not in r or "median_ms" not in old[name]:
+            continue
+        before, after = old[name]["median_ms"], r["median_ms"]
+        ratio = after / before if before else float("inf")
+        flag = "  << slower" if ratio > REGRESSION_RATIO else ""
+        worse += bool(flag)
+        print(f"{name:40} {before:10.2f} {after:10.2f} {ratio:7.2f}{flag}")
+    return worse
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    # Point the app at the stand-in database before config / database are imported
+    os.environ["FOCUSFLOW_BACKEND"] = "sqlite"
+    os.environ["FOCUSFLOW_SQLITE_PATH"] = args.db
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import database
+    from services import settings_service
+    from benchmarks import datagen
+
+    database.init_db()
+    today = date.today()
+    fingerprint = f"{args.folders}:{args.tasks}:{args.sessions}:{args.seed}:{today.isoformat()}"
+    if args.regen or settings_service.get_setting("bench_data") != fingerprint:
+        print(f"Generating {args.tasks} tasks / {args.sessions} sessions into {args.db} …")
+        t0 = time.perf_counter()
+        counts = datagen.generate(args.folders, args.tasks, args.sessions, args.seed, today,
+                                  progress=lambda table, n: print(f"  {table}: {n}", end="\r"))
+        settings_service.set_setting("bench_data", fingerprint)
+        print(f"\nGenerated {counts} in {time.perf_counter() - t0:.1f} s")
+
+    results = {}
+    for name, fn in _service_benches(today, args.tasks).items():
+        results[name] = _time(fn, args.repeat)
+        print(f"{name:40} {results[name]['median_ms']:10.2f} ms")
+
+    if not args.no_ui:
+        cleanup = []
+        try:
+            for name, fn in _ui_benches(cleanup).items():
+                results[name] = _time(fn, args.repeat)
+                print(f"{name:40} {results[name]['median_ms']:10.2f} ms")
+        except Exception as e:  # typically no display
+            print("UI benchmarks skipped:", e)
+            results["ui"] = {"skipped": str(e)}
+        finally:
+            for undo in cleanup: undo()
+
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                   f"{_git_commit() or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump({
+            "meta": {"commit": _git_commit(), "python": platform.python_version(),
+                     "platform": platform.platform(), "when": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                     "folders": args.folders, "tasks": args.tasks, "sessions": args.sessions,
+                     "seed": args.seed, "repeat": args.repeat},
+            "results": results,
+        }, fh, indent=2)
+    print("Results written to", out)
+
+    if args.compare:
+        worse = _compare(results, args.compare)
+        if worse:
+            print(f"{worse} benchmark(s) more than {REGRESSION_RATIO:.2f}x slower")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
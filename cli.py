@@ -0,0 +1,233 @@
+# cli.py
+# Headless `focusflow` command line, for scripts and cron. Only services and
+# database are imported here (never tkinter / ui), so a command starts fast.
+#
+#   python cli.py add "Write report" --due 2026-11-02 --priority High --folder Work
+#   python cli.py list --filter overdue
+#   python cli.py list --search "quarterly rep"
+#   python cli.py list --pending --sort due
+#   python cli.py done 12 15
+#   python cli.py batch < commands.txt     # one command per line, one transaction
+import argparse
+import json
+import shlex
+import sys
+from datetime import date, datetime, timedelta
+
+from database import init_db, run_batch, session
+from models import PRIORITIES, Task, TaskFilter, TaskTable
+from services import io_service
+from services import task_service as ts
+
+FILTER_MODES = ["all", "today", "week", "overdue", "done", "p_not", "p_in", "p_done"]
+SEARCH_LIMIT = 500  # matches shown by list --search without --limit
+SORT_COLUMNS = {"due": "due", "start": "start", "priority": "priority", "progress": "progress", "title": "titles"}
+
+class CliError(Exception):
+    """Bad input found while running a command (unknown folder, bad id, ...)."""
+
+class _Parser(argparse.ArgumentParser):
+    # In batch mode a bad line must not exit the process half-way through
+    def error(self, message):
+        raise CliError(message)
+
+# ---------- Helpers ----------
+def _day(s: str) -> date:
+    try:
+        return date.fromisoformat(s)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a date (YYYY-MM-DD): {s!r}")
+
+def _when(s: str) -> datetime:
+    try:
+        return datetime.fromisoformat(s)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a date/time (YYYY-MM-DD HH:MM): {s!r}")
+
+def _folder_id(name_or_id: str | None) -> int | None:
+    """Folder by id or (case-insensitive) name; None stays None."""
+    if name_or_id is None:
+        return None
+    folders = ts.list_folders()
+    if name_or_id.isdigit() and any(fid == int(name_or_id) for fid, _ in folders):
+        return int(name_or_id)
+    for fid, name in folders:
+        if name.casefold() == name_or_id.casefold():
+            return fid
+    raise CliError(f"no folder {name_or_id!r}")
+
+def _check_found(ids, found: int):
+    """CliError naming the ids that matched no task (call inside the write's session, so it rolls back)."""
+    if found < len(set(ids)):
+        known = {row[0] for row in ts.list_tasks_by_ids(ids)}
+        raise CliError("no task " + ", ".join(str(i) for i in sorted(set(ids) - known)))
+
+def _task_line(t: Task) -> str:
+    return "\t".join([str(t.id), "x" if t.is_done else " ", t.priority or "", t.progress or "",
+                      t.due_date.isoformat() if t.due_date else "-", t.title])
+
+def _task_json(t: Task) -> str:
+    return json.dumps({"id": t.id, "title": t.title, "notes": t.notes,
+                       "start_date": t.start_date.isoformat() if t.start_date else None,
+                       "due_date": t.due_date.isoformat() if t.due_date else None,
+                       "priority": t.priority, "progress": t.progress, "done": bool(t.is_done)})
+
+# ---------- Commands ----------
+# Each returns the text to print (or None). Output is only printed once the
+# transaction has committed, so a failed batch prints nothing but the error.
+def cmd_add(a):
+    # Tasks need a folder to show up in the app
+    task_id = ts.add_task(a.title, a.notes, a.due, a.priority, _folder_id(a.folder or "Inbox"))
+    return str(task_id)
+
+def cmd_list(a):
+    filters = TaskFilter.from_mode(a.filter, a.priority or "All")
+    if a.search:
+        # One-shot: ask the DB (FULLTEXT on MySQL) rather than build the in-memory index
+        table = TaskTable.from_rows(ts.search_tasks(a.search, a.limit or SEARCH_LIMIT, include_done=not a.pending,
+                                                    folder_id=_folder_id(a.folder), filters=filters, in_db=True))
+    else:
+        table = ts.list_tasks(include_done=not a.pending, folder_id=_folder_id(a.folder), filters=filters,
+                              as_table=True)
+    if a.sort:
+        table = table.order_by(SORT_COLUMNS[a.sort], descending=a.desc)
+    if a.limit:
+        table = table.take(range(min(a.limit, len(table))))
+    return "\n".join(map(_task_json if a.json else _task_line, table)) or None
+
+def cmd_done(a):
+    with session():
+        _check_found(a.ids, ts.toggle_done_many(a.ids, not a.undo))
+    return None
+
+def cmd_move(a):
+    with session():
+        _check_found(a.ids, ts.move_task_to_folder_many(a.ids, _folder_id(a.folder)))
+    return None
+
+def cmd_stats(a):
+    done_today, week_minutes = ts.get_mini_stats()
+    lines = [f"Done today: {done_today}", f"Focus this week: {week_minutes} min"]
+    if a.days:
+        today = date.today()
+        lines += [f"{day.isoformat()}\t{done}\t{minutes}"
+                  for day, done, minutes in ts.get_daily_stats(today - timedelta(days=a.days - 1), today)]
+    return "\n".join(lines)
+
+def cmd_log_session(a):
+    started = a.at or datetime.now().replace(microsecond=0) - timedelta(minutes=a.minutes)
+    ts.log_focus_session(a.task, started, started + timedelta(minutes=a.minutes), a.minutes)
+    return None
+
+def cmd_export(a):
+    if a.table:
+        return f"{a.table}: {io_service.export_table(a.table, a.path, a.format)}"
+    counts = io_service.export_all(a.path, a.format or "jsonl")
+    return "\n".join(f"{t}: {n}" for t, n in counts.items())
+
+def cmd_import(a):
+    if a.table:
+        return f"{a.table}: {io_service.import_table(a.table, a.path, a.format)}"
+    counts = io_service.import_all(a.path, a.format or "jsonl")
+    return "\n".join(f"{t}: {n}" for t, n in counts.items()) or "nothing to import"
+
+def _build_parser() -> argparse.ArgumentParser:
+    p = _Parser(prog="focusflow", description="FocusFlow from the command line")
+    sub = p.add_subparsers(dest="command", required=True, parser_class=_Parser)
+
+    s = sub.add_parser("add", help="add a task and print its id")
+    s.add_argument("title")
+    s.add_argument("--notes")
+    s.add_argument("--due", type=_day)
+    s.add_argument("--priority", choices=PRIORITIES, default="Low")
+    s.add_argument("--folder", help="folder name or id (default: Inbox)")
+    s.set_defaults(fn=cmd_add)
+
+    s = sub.add_parser("list", help="list tasks (id, done, priority, progress, due, title)")
+    s.add_argument("--folder", help="folder name or id (default: all folders)")
+    s.add_argument("--filter", choices=FILTER_MODES, default="all")
+    s.add_argument("--priority", choices=PRIORITIES)
+    s.add_argument("--pending", action="store_true", help="hide completed tasks")
+    s.add_argument("--search", metavar="TEXT", help="only tasks matching TEXT, best match first")
+    s.add_argument("--sort", choices=list(SORT_COLUMNS), help="order by this column (default: newest first)")
+    s.add_argument("--desc", action="store_true", help="reverse --sort; undated tasks still come last")
+    s.add_argument("--limit", type=int)
+    s.add_argument("--json", action="store_true", help="one JSON object per line")
+    s.set_defaults(fn=cmd_list)
+
+    s = sub.add_parser("done", help="mark tasks done")
+    s.add_argument("ids", type=int, nargs="+")
+    s.add_argument("--undo", action="store_true", help="mark them not done instead")
+    s.set_defaults(fn=cmd_done)
+
+    s = sub.add_parser("move", help="move tasks to a folder")
+    s.add_argument("ids", type=int, nargs="+")
+    s.add_argument("folder", help="folder name or id")
+    s.set_defaults(fn=cmd_move)
+
+    s = sub.add_parser("stats", help="done today / focus this week")
+    s.add_argument("--days", type=int, default=0, help="also print the last N days (day, done, minutes)")
+    s.set_defaults(fn=cmd_stats)
+
+    s = sub.add_parser("log-session", help="record a focus session")
+    s.add_argument("--task", type=int, help="task id (optional)")
+    s.add_argument("--minutes", type=int, required=True)
+    s.add_argument("--at", type=_when, help="start time (default: now minus --minutes)")
+    s.set_defaults(fn=cmd_log_session)
+
+    for name, fn, verb in (("export", cmd_export, "write"), ("import", cmd_import, "read")):
+        s = sub.add_parser(name, help=f"{verb} tables as CSV / JSONL")
+        s.add_argument("path", help="folder (all tables) or file (with --table)")
+        s.add_argument("--table", choices=list(io_service.TABLE_COLUMNS))
+        s.add_argument("--format", choices=["csv", "jsonl"])
+        s.set_defaults(fn=fn)
+
+    s = sub.add_parser("batch", help="run commands from stdin (or a file) in one transaction")
+    s.add_argument("file", nargs="?", default="-")
+    return p
+
+# ---------- Batch ----------
+def _read_batch(parser, fh) -> list:
+    """Parse every line up front, so a typo on line 90 fails before line 1 runs."""
+    calls = []
+    for n, line in enumerate(fh, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            args = parser.parse_args(shlex.split(line))
+        except (CliError, ValueError) as e:
+            raise CliError(f"line {n}: {e}")
+        if args.command == "batch":
+            raise CliError(f"line {n}: batch cannot be nested")
+        calls.append((args.fn, (args,)))
+    return calls
+
+def main(argv=None) -> int:
+    parser = _build_parser()
+    try:
+        args = parser.parse_args(argv)
+        init_db()
+        if args.command == "batch":
+            if args.file == "-":
+                calls = _read_batch(parser, sys.stdin)
+            else:
+                with open(args.file, encoding="utf-8") as fh:
+                    calls = _read_batch(parser, fh)
+            # One pooled connection, one transaction: all commands commit or none do
+            outputs = run_batch(calls)
+        else:
+            outputs = [args.fn(args)]
+    except CliError as e:
+        print(f"focusflow: error: {e}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"focusflow: {e}", file=sys.stderr)
+        return 1
+    for out in outputs:
+        if out is not None:
+            print(out)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,11 +4,43 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Storage backend: "mysql" (needs a server) or "sqlite" (embedded, single file)
+DB_BACKEND  = os.getenv("FOCUSFLOW_BACKEND", "mysql")
+SQLITE_PATH = os.getenv("FOCUSFLOW_SQLITE_PATH",
+                        os.path.join(os.path.expanduser("~"), ".focusflow", "focusflow.db"))
+
 DB_NAME  = os.getenv("FOCUSFLOW_DB", "focusflow")
 DB_HOST  = os.getenv("FOCUSFLOW_HOST", "localhost")
 DB_USER  = os.getenv("FOCUSFLOW_USER", "root")
 DB_PASS  = os.getenv("FOCUSFLOW_PASSWORD", "")
 
+# Connection pool: size, wait for a free slot, ping after idle, recycle after idle (seconds)
+DB_POOL_SIZE      = int(os.getenv("FOCUSFLOW_POOL_SIZE", 4))
+DB_POOL_TIMEOUT_S = float(os.getenv("FOCUSFLOW_POOL_TIMEOUT", 10))
+DB_POOL_PING_S    = float(os.getenv("FOCUSFLOW_POOL_PING", 30))
+DB_POOL_RECYCLE_S = float(os.getenv("FOCUSFLOW_POOL_RECYCLE", 600))
+
+# Query instrumentation (metrics.py): statements slower than SLOW_QUERY_MS go to
+# SLOW_QUERY_LOG; if METRICS_DUMP is set the registry is written there on exit
+# (.json -> JSON, anything else -> Prometheus text). DEBUG adds a Debug menu.
+DB_METRICS     = os.getenv("FOCUSFLOW_METRICS", "1") == "1"
+SLOW_QUERY_MS  = float(os.getenv("FOCUSFLOW_SLOW_QUERY_MS", 200))
+SLOW_QUERY_LOG = os.getenv("FOCUSFLOW_SLOW_QUERY_LOG",
+                           os.path.join(os.path.expanduser("~"), ".focusflow", "slow_queries.log"))
+METRICS_DUMP   = os.getenv("FOCUSFLOW_METRICS_DUMP", "")
+DEBUG          = os.getenv("FOCUSFLOW_DEBUG", "0") == "1"
+
+# Local JSON API (server.py). Writes from other processes reach it through
+# sync_service polling; API_CACHE_TTL_S only bounds staleness for what change
+# versions don't track (focus sessions and the stats built from them).
+API_HOST        = os.getenv("FOCUSFLOW_API_HOST", "127.0.0.1")
+API_PORT        = int(os.getenv("FOCUSFLOW_API_PORT", 8765))
+API_CACHE_TTL_S = float(os.getenv("FOCUSFLOW_API_CACHE_TTL", 2))
+
+# Delta sync (services/sync_service.py): deletes are remembered this long; a
+# client that last synced before that reloads everything instead
+TOMBSTONE_MAX_AGE_DAYS = int(os.getenv("FOCUSFLOW_TOMBSTONE_DAYS", 30))
+
 WORK_MIN        = int(os.getenv("WORK_MIN", 25))
 SHORT_BREAK_MIN = int(os.getenv("SHORT_BREAK_MIN", 5))
 LONG_BREAK_MIN  = int(os.getenv("LONG_BREAK_MIN", 15))
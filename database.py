@@ -126,8 +126,29 @@
 #     cn.close()
 
 
-import mysql.connector as mysql
-from config import DB_NAME, DB_HOST, DB_USER, DB_PASS
+import atexit
+import functools
+import json
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from config import (DB_BACKEND, DB_NAME, DB_HOST, DB_USER, DB_PASS, SQLITE_PATH,
+                    DB_POOL_SIZE, DB_POOL_TIMEOUT_S, DB_POOL_PING_S, DB_POOL_RECYCLE_S,
+                    DB_METRICS, SLOW_QUERY_MS, SLOW_QUERY_LOG, METRICS_DUMP)
+from metrics import REGISTRY
+
+# "mysql" (server) or "sqlite" (embedded file). Services write MySQL-style "%s"
+# placeholders; the SQLite adapter below rewrites them.
+BACKEND = DB_BACKEND.lower()
+if BACKEND not in ("mysql", "sqlite"):
+    raise ValueError(f"Unknown FOCUSFLOW_BACKEND: {DB_BACKEND!r}")
 
 TABLES = {
     "folders": (
@@ -168,33 +189,640 @@ TABLES = {
         "  v VARCHAR(255) NOT NULL"
         ") ENGINE=InnoDB"
     ),
+    # Rollups kept current by task_service (see rebuild_daily_stats)
+    "daily_stats": (
+        "CREATE TABLE IF NOT EXISTS daily_stats ("
+        "  day DATE PRIMARY KEY,"
+        "  done_count INT NOT NULL DEFAULT 0,"
+        "  focus_minutes INT NOT NULL DEFAULT 0"
+        ") ENGINE=InnoDB"
+    ),
+    "daily_task_focus": (
+        "CREATE TABLE IF NOT EXISTS daily_task_focus ("
+        "  day DATE NOT NULL,"
+        "  task_id INT NOT NULL,"
+        "  minutes INT NOT NULL DEFAULT 0,"
+        "  PRIMARY KEY (day, task_id)"
+        ") ENGINE=InnoDB"
+    ),
+    # One row per applied migration (see MIGRATIONS)
+    "schema_version": (
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "  version INT PRIMARY KEY,"
+        "  applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+        ") ENGINE=InnoDB"
+    ),
+    # Delta sync: one global change counter, plus a row per deleted task / folder
+    "sync_state": (
+        "CREATE TABLE IF NOT EXISTS sync_state ("
+        "  id INT PRIMARY KEY,"
+        "  version BIGINT NOT NULL,"
+        "  pruned_version BIGINT NOT NULL DEFAULT 0"
+        ") ENGINE=InnoDB"
+    ),
+    "tombstones": (
+        "CREATE TABLE IF NOT EXISTS tombstones ("
+        "  entity VARCHAR(16) NOT NULL,"
+        "  row_id INT NOT NULL,"
+        "  row_version BIGINT NOT NULL,"
+        "  deleted_at DATETIME NULL,"
+        "  PRIMARY KEY (entity, row_id)"
+        ") ENGINE=InnoDB"
+    ),
+}
+
+SQLITE_TABLES = {
+    "folders": (
+        "CREATE TABLE IF NOT EXISTS folders ("
+        "  id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "  name VARCHAR(80) NOT NULL UNIQUE"
+        ")"
+    ),
+    "tasks": (
+        "CREATE TABLE IF NOT EXISTS tasks ("
+        "  id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "  title VARCHAR(255) NOT NULL,"
+        "  notes TEXT,"
+        "  start_date DATE NULL,"
+        "  due_date DATE NULL,"
+        "  priority TEXT DEFAULT 'Medium' CHECK (priority IN ('Low','Medium','High')),"
+        "  progress TEXT DEFAULT 'Not started' CHECK (progress IN ('Not started','In progress','Completed')),"
+        "  is_done INTEGER DEFAULT 0,"
+        "  completed_at TIMESTAMP NULL,"
+        "  folder_id INTEGER NULL REFERENCES folders(id) ON DELETE SET NULL,"
+        "  created_at TIMESTAMP DEFAULT (datetime('now','localtime'))"
+        ")"
+    ),
+    "focus_sessions": (
+        "CREATE TABLE IF NOT EXISTS focus_sessions ("
+        "  id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "  task_id INTEGER NULL REFERENCES tasks(id) ON DELETE SET NULL,"
+        "  started_at TIMESTAMP NOT NULL,"
+        "  ended_at TIMESTAMP NOT NULL,"
+        "  duration_minutes INTEGER NOT NULL"
+        ")"
+    ),
+    "settings": (
+        "CREATE TABLE IF NOT EXISTS settings ("
+        "  k VARCHAR(64) PRIMARY KEY,"
+        "  v VARCHAR(255) NOT NULL"
+        ")"
+    ),
+    "daily_stats": (
+        "CREATE TABLE IF NOT EXISTS daily_stats ("
+        "  day DATE PRIMARY KEY,"
+        "  done_count INTEGER NOT NULL DEFAULT 0,"
+        "  focus_minutes INTEGER NOT NULL DEFAULT 0"
+        ")"
+    ),
+    "daily_task_focus": (
+        "CREATE TABLE IF NOT EXISTS daily_task_focus ("
+        "  day DATE NOT NULL,"
+        "  task_id INTEGER NOT NULL,"
+        "  minutes INTEGER NOT NULL DEFAULT 0,"
+        "  PRIMARY KEY (day, task_id)"
+        ")"
+    ),
+    "schema_version": (
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "  version INTEGER PRIMARY KEY,"
+        "  applied_at TIMESTAMP DEFAULT (datetime('now','localtime'))"
+        ")"
+    ),
+    "sync_state": (
+        "CREATE TABLE IF NOT EXISTS sync_state ("
+        "  id INTEGER PRIMARY KEY,"
+        "  version INTEGER NOT NULL,"
+        "  pruned_version INTEGER NOT NULL DEFAULT 0"
+        ")"
+    ),
+    "tombstones": (
+        "CREATE TABLE IF NOT EXISTS tombstones ("
+        "  entity VARCHAR(16) NOT NULL,"
+        "  row_id INTEGER NOT NULL,"
+        "  row_version INTEGER NOT NULL,"
+        "  deleted_at DATETIME NULL,"
+        "  PRIMARY KEY (entity, row_id)"
+        ")"
+    ),
 }
 
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",      # readers never block the writer
+    "PRAGMA synchronous=NORMAL",    # fsync at checkpoints only; safe with WAL
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",     # ~16 MB page cache
+    "PRAGMA mmap_size=134217728",
+]
+
+def _mysql():
+    import mysql.connector as mysql
+    return mysql
+
 def _server_connection():
-    return mysql.connect(host=DB_HOST, user=DB_USER, password=DB_PASS)
+    return _mysql().connect(host=DB_HOST, user=DB_USER, password=DB_PASS)
 
 def _db_connection():
-    return mysql.connect(host=DB_HOST, user=DB_USER, password=DB_PASS, database=DB_NAME)
+    if BACKEND == "sqlite":
+        cn = _sqlite_connection()
+    else:
+        cn = _mysql().connect(host=DB_HOST, user=DB_USER, password=DB_PASS, database=DB_NAME)
+    return _InstrumentedConnection(cn) if DB_METRICS else cn
+
+# ---------- SQLite adapter ----------
+# DATE columns come back as date and TIMESTAMP columns as datetime (PARSE_DECLTYPES).
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda dt: dt.isoformat(" ", "seconds"))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda b: datetime.fromisoformat(b.decode()))
+
+class _SqliteCursor:
+    """mysql.connector-shaped cursor over sqlite3 ("%s" placeholders)."""
+    def __init__(self, cur: sqlite3.Cursor):
+        self._cur = cur
+
+    def execute(self, sql, params=()):
+        self._cur.execute(sql.replace("%s", "?"), params)
+        return self
+
+    def executemany(self, sql, seq_params):
+        self._cur.executemany(sql.replace("%s", "?"), seq_params)
+        return self
+
+    def fetchone(self): return self._cur.fetchone()
+    def fetchall(self): return self._cur.fetchall()
+    def fetchmany(self, size=None): return self._cur.fetchmany(size or self._cur.arraysize)
+    def close(self): self._cur.close()
+
+    @property
+    def lastrowid(self): return self._cur.lastrowid
+
+    @property
+    def rowcount(self): return self._cur.rowcount
+
+    def __iter__(self): return iter(self._cur)
+
+class _SqliteConnection:
+    def __init__(self, cn: sqlite3.Connection):
+        self._cn = cn
+
+    def cursor(self): return _SqliteCursor(self._cn.cursor())
+    def commit(self): self._cn.commit()
+    def rollback(self): self._cn.rollback()
+    def close(self): self._cn.close()
+
+    def ping(self, reconnect=False):
+        self._cn.execute("SELECT 1").fetchone()
+
+def _sqlite_connection():
+    folder = os.path.dirname(SQLITE_PATH)
+    if folder: os.makedirs(folder, exist_ok=True)
+    cn = sqlite3.connect(SQLITE_PATH, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    for pragma in SQLITE_PRAGMAS:
+        cn.execute(pragma)
+    return _SqliteConnection(cn)
+
+# ---------- Connection pool ----------
+def _close_quietly(cn):
+    try: cn.close()
+    except Exception: pass
+
+# ---------- Instrumentation ----------
+# Every pooled connection is wrapped so each statement is timed (execute plus
+# its fetches), counted against the service function that ran it, and logged
+# if slower than SLOW_QUERY_MS. Results land in metrics.REGISTRY.
+REGISTRY.describe("focusflow_db_queries_total", "Statements run, by calling service function")
+REGISTRY.describe("focusflow_db_query_seconds", "Statement latency (execute + fetches), by function")
+REGISTRY.describe("focusflow_db_rows_total", "Rows returned or affected, by function")
+REGISTRY.describe("focusflow_db_statement_seconds_total", "Time spent per normalized statement")
+REGISTRY.describe("focusflow_db_statement_calls_total", "Calls per normalized statement")
+REGISTRY.describe("focusflow_db_slow_queries_total", f"Statements slower than {SLOW_QUERY_MS:g} ms")
+REGISTRY.describe("focusflow_db_acquire_seconds", "Wait for a pooled connection")
+
+_SKIP_CODES = set()  # wrapper / session() frames, filled in below
+_SQL_SPACE = re.compile(r"\s+")
+_SQL_PARAM_LIST = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")                     # IN (%s,%s,...)
+_SQL_ROW_LIST = re.compile(r"(\((?:\s*%s\s*,)*\s*%s\s*\))(?:\s*,\s*\1)+")  # VALUES (..), (..)
+_slow_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1024)
+def _statement(sql: str) -> str:
+    """SQL with whitespace and variable-length %s lists collapsed, for labels / the slow log."""
+    sql = _SQL_SPACE.sub(" ", sql).strip()
+    sql = _SQL_ROW_LIST.sub(r"\1, ...", sql)
+    sql = _SQL_PARAM_LIST.sub("(...)", sql)
+    return sql[:200]
+
+def _caller() -> str:
+    """module.function of the service code that issued the statement."""
+    f = sys._getframe(2)
+    while f is not None and (f.f_code in _SKIP_CODES or f.f_globals.get("__name__") == "contextlib"):
+        f = f.f_back
+    # Private helpers (_update_many, _uncount_done) count toward the public function calling them
+    while f is not None and f.f_code.co_name.startswith("_") and f.f_back is not None \
+            and f.f_back.f_globals is f.f_globals:
+        f = f.f_back
+    if f is None:
+        return "unknown"
+    module = f.f_globals.get("__name__", "?").rpartition(".")[2]
+    return f"{module}.{f.f_code.co_name}"
+
+def _record(sql: str, func: str, seconds: float, rows: int):
+    stmt = _statement(sql)
+    REGISTRY.inc("focusflow_db_queries_total", func=func)
+    REGISTRY.observe("focusflow_db_query_seconds", seconds, func=func)
+    REGISTRY.inc("focusflow_db_rows_total", rows, func=func)
+    REGISTRY.inc("focusflow_db_statement_seconds_total", seconds, statement=stmt)
+    REGISTRY.inc("focusflow_db_statement_calls_total", statement=stmt)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        REGISTRY.inc("focusflow_db_slow_queries_total", func=func)
+        _log_slow(stmt, func, seconds, rows)
+
+def _log_slow(stmt: str, func: str, seconds: float, rows: int):
+    # Parameters are left out on purpose: they hold task titles and notes
+    line = json.dumps({"at": datetime.now().isoformat(" ", "seconds"), "ms": round(seconds * 1000, 1),
+                       "rows": rows, "func": func, "sql": stmt})
+    try:
+        with _slow_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(SLOW_QUERY_LOG)), exist_ok=True)
+            with open(SLOW_QUERY_LOG, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+    except OSError as e:
+        print("Slow query log failed:", e)
+
+class _InstrumentedCursor:
+    """Cursor proxy; a statement's time runs from execute() to the next execute() or
+    close(), counting only time spent inside the driver (fetches included)."""
+    def __init__(self, cur):
+        self._cur = cur
+        self._sql = None
+
+    def _start(self, sql):
+        self._finish()
+        self._sql, self._func, self._seconds, self._rows = sql, _caller(), 0.0, 0
+        self._counts_fetches = sql.lstrip()[:6].upper() == "SELECT"
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        if not self._counts_fetches:
+            self._rows = max(self._cur.rowcount or 0, 0)
+        _record(self._sql, self._func, self._seconds, self._rows)
+        self._sql = None
+
+    def _timed(self, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self._seconds += time.perf_counter() - t0
+
+    def execute(self, sql, params=()):
+        self._start(sql)
+        return self._timed(self._cur.execute, sql, params)
+
+    def executemany(self, sql, seq_params):
+        self._start(sql)
+        return self._timed(self._cur.executemany, sql, seq_params)
+
+    def fetchone(self):
+        row = self._timed(self._cur.fetchone)
+        if row is not None: self._rows += 1
+        return row
+
+    def fetchall(self):
+        rows = self._timed(self._cur.fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def fetchmany(self, size=None):
+        rows = self._timed(self._cur.fetchmany, *([size] if size else []))
+        self._rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._finish()
+        self._cur.close()
+
+    @property
+    def lastrowid(self): return self._cur.lastrowid
+
+    @property
+    def rowcount(self): return self._cur.rowcount
+
+class _InstrumentedConnection:
+    def __init__(self, cn):
+        self._cn = cn
+
+    def cursor(self):
+        return _InstrumentedCursor(self._cn.cursor())
+
+    def commit(self):
+        t0 = time.perf_counter()
+        self._cn.commit()
+        _record("COMMIT", _caller(), time.perf_counter() - t0, 0)
+
+    def __getattr__(self, name):  # rollback, ping, close, autocommit, ...
+        return getattr(self._cn, name)
+
+_SKIP_CODES.update(fn.__code__ for cls in (_InstrumentedCursor, _InstrumentedConnection)
+                   for fn in vars(cls).values() if hasattr(fn, "__code__"))
+_SKIP_CODES.update(p.fget.__code__ for p in vars(_InstrumentedCursor).values() if isinstance(p, property))
+
+if METRICS_DUMP:
+    atexit.register(lambda: REGISTRY.dump(METRICS_DUMP))
+
+class ConnectionPool:
+    """Keeps up to `size` open connections and hands them out LIFO.
+
+    Connections idle longer than `ping_s` are pinged before reuse, and ones idle
+    longer than `recycle_s` are closed and replaced (the server may have dropped them).
+    """
+    def __init__(self, factory, size: int = 4, timeout_s: float = 10,
+                 ping_s: float = 30, recycle_s: float = 600):
+        self._factory = factory
+        self._timeout_s = timeout_s
+        self._ping_s = ping_s
+        self._recycle_s = recycle_s
+        self._idle = queue.LifoQueue()          # (connection, last_used)
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self._timeout_s):
+            raise RuntimeError("Database connection pool exhausted")
+        try:
+            while True:
+                try:
+                    cn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._factory()
+                idle = time.monotonic() - last_used
+                if idle > self._recycle_s:
+                    _close_quietly(cn); continue
+                if idle > self._ping_s and not self._healthy(cn):
+                    _close_quietly(cn); continue
+                return cn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, cn, broken: bool = False):
+        try:
+            if broken: _close_quietly(cn)
+            else: self._idle.put((cn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        while True:
+            try: cn, _ = self._idle.get_nowait()
+            except queue.Empty: return
+            _close_quietly(cn)
+
+    @staticmethod
+    def _healthy(cn) -> bool:
+        try:
+            cn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_db_connection, size=DB_POOL_SIZE, timeout_s=DB_POOL_TIMEOUT_S,
+                                       ping_s=DB_POOL_PING_S, recycle_s=DB_POOL_RECYCLE_S)
+    return _pool
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all(); _pool = None
+
+atexit.register(close_pool)
+
+_local = threading.local()  # the session open on this thread, if any
+
+@contextmanager
+def session():
+    """Borrow a pooled connection and yield a cursor.
+
+    Commits when the block exits cleanly and rolls back on error. Reads commit
+    too, so the next borrower never sees a stale REPEATABLE READ snapshot.
+    A session() opened inside another on the same thread joins the outer
+    transaction, so service calls can be grouped (see run_batch).
+    """
+    outer = getattr(_local, "cur", None)
+    if outer is not None:
+        yield outer
+        return
+    pool = get_pool()
+    t0 = time.perf_counter()
+    cn = pool.acquire()
+    if DB_METRICS:
+        REGISTRY.observe("focusflow_db_acquire_seconds", time.perf_counter() - t0)
+    broken = False
+    try:
+        cur = cn.cursor()
+    except Exception:
+        pool.release(cn, broken=True)
+        raise
+    _local.cur = cur
+    _local.version = None  # see change_version()
+    _local.on_commit = []  # see after_commit()
+    try:
+        yield cur
+        cn.commit()
+        on_commit = _local.on_commit
+    except Exception:
+        try: cn.rollback()
+        except Exception: broken = True
+        raise
+    finally:
+        _local.cur = _local.version = _local.on_commit = None
+        try: cur.close()
+        except Exception: broken = True
+        pool.release(cn, broken)
+    for fn, args in on_commit:
+        fn(*args)
+
+_SKIP_CODES.add(session.__wrapped__.__code__)
+
+def after_commit(fn, *args):
+    """Run fn(*args) once the open transaction commits, or now if none is open.
+
+    For in-process caches: a write made inside run_batch must not show up in
+    them before the batch commits, nor at all if it rolls back.
+    """
+    if getattr(_local, "cur", None) is None:
+        fn(*args)
+    else:
+        _local.on_commit.append((fn, args))
+
+# MySQL: lock wait timeout, deadlock, server gone away / lost connection
+_TRANSIENT_MYSQL_ERRNOS = {1205, 1213, 2006, 2013}
+
+def is_transient(exc: Exception) -> bool:
+    """True for errors worth retrying (locks, dropped connections)."""
+    if isinstance(exc, sqlite3.OperationalError):
+        return "locked" in str(exc) or "busy" in str(exc)
+    if BACKEND == "mysql":
+        errors = _mysql().errors
+        return isinstance(exc, (errors.OperationalError, errors.InterfaceError)) or \
+            getattr(exc, "errno", None) in _TRANSIENT_MYSQL_ERRNOS
+    return False
+
+def is_integrity_error(exc: Exception) -> bool:
+    """True for constraint violations (duplicate key, missing foreign key row)."""
+    if isinstance(exc, sqlite3.IntegrityError):
+        return True
+    return BACKEND == "mysql" and isinstance(exc, _mysql().errors.IntegrityError)
+
+def run_batch(calls, retries: int = 3, backoff_s: float = 0.2):
+    """Run [(fn, args), ...] in one transaction and return their results.
+
+    The whole batch is retried with exponential backoff on transient errors;
+    anything else (or running out of retries) re-raises after rollback.
+    """
+    for attempt in range(retries + 1):
+        try:
+            with session():
+                return [fn(*args) for fn, args in calls]
+        except Exception as e:
+            if attempt == retries or not is_transient(e):
+                raise
+            time.sleep(backoff_s * 2 ** attempt)
+
+# ---------- Change versions ----------
+VERSIONED_TABLES = ("tasks", "folders", "settings")
+
+def change_version(cur) -> int:
+    """Version to stamp on rows written in the current session() (see sync_service).
+
+    The counter is bumped once per transaction, on first use. The UPDATE holds
+    the sync_state row lock until commit, so versions become visible in
+    increasing order: whoever has read version N has every change <= N.
+    """
+    version = getattr(_local, "version", None)
+    if version is None:
+        cur.execute("UPDATE sync_state SET version = version + 1 WHERE id = 1")
+        cur.execute("SELECT version FROM sync_state WHERE id = 1")
+        (version,) = cur.fetchone()
+        _local.version = version
+    return version
+
+def add_tombstones(cur, entity: str, ids: list[int]):
+    """Record deleted task / folder ids so other clients can drop them."""
+    if not ids:
+        return
+    version, now = change_version(cur), datetime.now()
+    # Spelled out as one statement: mysql.connector only batches executemany() for INSERT
+    cur.execute("REPLACE INTO tombstones (entity, row_id, row_version, deleted_at) VALUES " +
+                ", ".join(["(%s, %s, %s, %s)"] * len(ids)), [x for i in ids for x in (entity, i, version, now)])
 
 def init_db():
-    cn = _server_connection(); cn.autocommit = True
-    cur = cn.cursor()
-    cur.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME} DEFAULT CHARACTER SET 'utf8mb4'")
-    cur.close(); cn.close()
-
-    cn = _db_connection(); cur = cn.cursor()
-    # Order matters (folders first for FK)
-    for name in ["folders", "tasks", "focus_sessions", "settings"]:
-        cur.execute(TABLES[name])
-    cn.commit(); cur.close(); cn.close()
-
+    # An up-to-date database costs a single query; the rest only runs on
+    # first launch or after an upgrade that added migrations.
+    if schema_version() >= LATEST_VERSION:
+        return
+    if BACKEND == "mysql":
+        cn = _server_connection(); cn.autocommit = True
+        cur = cn.cursor()
+        cur.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME} DEFAULT CHARACTER SET 'utf8mb4'")
+        cur.close(); cn.close()
     migrate()
 
-def migrate():
-    """Backfill new columns / tables for older installs."""
-    cn = _db_connection(); cur = cn.cursor()
-
-    def add_if_missing(table: str, column: str, col_def: str):
+def upsert_add_sql(table: str, keys: list[str], counters: list[str]) -> str:
+    """INSERT of keys + counters that adds the counters onto an existing row."""
+    cols = keys + counters
+    q = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))}) "
+    if BACKEND == "sqlite":
+        return q + f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET " + \
+            ", ".join(f"{c} = {c} + excluded.{c}" for c in counters)
+    return q + "ON DUPLICATE KEY UPDATE " + ", ".join(f"{c} = {c} + VALUES({c})" for c in counters)
+
+def insert_ignore_sql(table: str, cols: list[str]) -> str:
+    """INSERT that skips rows clashing with a primary / unique key.
+
+    On MySQL this is a no-op ON DUPLICATE KEY UPDATE rather than INSERT IGNORE:
+    it only swallows key clashes, and mysql.connector still folds executemany()
+    into one multi-row INSERT (it doesn't for INSERT IGNORE).
+    """
+    q = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['%s'] * len(cols))}) "
+    if BACKEND == "sqlite":
+        return q + "ON CONFLICT DO NOTHING"
+    return q + f"ON DUPLICATE KEY UPDATE {cols[0]}={cols[0]}"
+
+def rebuild_daily_stats(cur):
+    """Recompute daily_stats / daily_task_focus from tasks and focus_sessions."""
+    cur.execute("DELETE FROM daily_stats")
+    cur.execute("DELETE FROM daily_task_focus")
+    cur.execute(
+        "INSERT INTO daily_stats (day, done_count, focus_minutes) "
+        "SELECT day, SUM(done), SUM(mins) FROM ("
+        "  SELECT DATE(completed_at) AS day, 1 AS done, 0 AS mins FROM tasks"
+        "  WHERE is_done=1 AND completed_at IS NOT NULL"
+        "  UNION ALL"
+        "  SELECT DATE(started_at), 0, duration_minutes FROM focus_sessions"
+        ") x GROUP BY day"
+    )
+    cur.execute(
+        "INSERT INTO daily_task_focus (day, task_id, minutes) "
+        "SELECT DATE(started_at), task_id, SUM(duration_minutes) FROM focus_sessions "
+        "WHERE task_id IS NOT NULL GROUP BY DATE(started_at), task_id"
+    )
+
+def _backfill_daily_stats(cur):
+    # First run after upgrading: the rollup is empty but history may not be
+    cur.execute("SELECT COUNT(*) FROM daily_stats")
+    (count,) = cur.fetchone()
+    if count == 0:
+        rebuild_daily_stats(cur)
+
+# Secondary indexes (name, table, columns), created by migrate() when missing
+INDEXES = [
+    ("ix_tasks_folder_created", "tasks", "folder_id, created_at"),  # keyset paging
+    ("ix_tasks_folder_done_due", "tasks", "folder_id, is_done, due_date"),  # today/week/overdue/done
+    ("ix_tasks_folder_priority", "tasks", "folder_id, priority"),
+    ("ix_tasks_folder_progress", "tasks", "folder_id, progress"),
+    ("ix_tasks_done_completed", "tasks", "is_done, completed_at"),         # Done today
+    ("ix_sessions_started", "focus_sessions", "started_at"),               # Focus this week
+]
+
+def _create_index(cur, name: str, table: str, cols: str):
+    if BACKEND == "sqlite":
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})")
+        return
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA=%s AND TABLE_NAME=%s AND INDEX_NAME=%s",
+        (DB_NAME, table, name),
+    )
+    (count,) = cur.fetchone()
+    if count == 0:
+        cur.execute(f"CREATE INDEX {name} ON {table} ({cols})")
+
+def _ensure_indexes(cur):
+    for name, table, cols in INDEXES:
+        _create_index(cur, name, table, cols)
+
+# ---------- Migrations ----------
+def _add_column_if_missing(cur, table: str, column: str, col_def: str):
+    if BACKEND == "sqlite":
+        cur.execute(f"PRAGMA table_info({table})")
+        count = sum(1 for row in cur.fetchall() if row[1] == column)
+    else:
         cur.execute(
             """
             SELECT COUNT(*)
@@ -204,30 +832,108 @@ def migrate():
             (DB_NAME, table, column),
         )
         (count,) = cur.fetchone()
-        if count == 0:
-            cur.execute(f"ALTER TABLE {table} ADD COLUMN {col_def}")
-
-    # Ensure folders table exists (and default Inbox)
-    cur.execute("CREATE TABLE IF NOT EXISTS folders (id INT AUTO_INCREMENT PRIMARY KEY, name VARCHAR(80) NOT NULL UNIQUE) ENGINE=InnoDB")
-
-    # Add missing columns on tasks
-    add_if_missing("tasks", "start_date", "start_date DATE NULL")
-    add_if_missing("tasks", "progress", "progress ENUM('Not started','In progress','Completed') DEFAULT 'Not started'")
-    add_if_missing("tasks", "completed_at", "completed_at TIMESTAMP NULL")
-    add_if_missing("tasks", "folder_id", "folder_id INT NULL")
+    if count == 0:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {col_def}")
 
-    # Try to create FK if not present
-    try:
+def _m1_base_tables(cur):
+    """Create the tables and bring pre-versioning MySQL installs up to date."""
+    tables = SQLITE_TABLES if BACKEND == "sqlite" else TABLES
+    # Order matters (folders first for FK)
+    for name in ["folders", "tasks", "focus_sessions", "settings", "daily_stats", "daily_task_focus"]:
+        cur.execute(tables[name])
+    if BACKEND == "sqlite":
+        return  # the SQLite schema has always had every column
+
+    # Columns added to tasks after the first release
+    _add_column_if_missing(cur, "tasks", "start_date", "start_date DATE NULL")
+    _add_column_if_missing(cur, "tasks", "progress", "progress ENUM('Not started','In progress','Completed') DEFAULT 'Not started'")
+    _add_column_if_missing(cur, "tasks", "completed_at", "completed_at TIMESTAMP NULL")
+    _add_column_if_missing(cur, "tasks", "folder_id", "folder_id INT NULL")
+
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.TABLE_CONSTRAINTS "
+        "WHERE TABLE_SCHEMA=%s AND TABLE_NAME='tasks' AND CONSTRAINT_NAME='fk_tasks_folder'",
+        (DB_NAME,),
+    )
+    (count,) = cur.fetchone()
+    if count == 0:
         cur.execute(
             "ALTER TABLE tasks ADD CONSTRAINT fk_tasks_folder "
             "FOREIGN KEY (folder_id) REFERENCES folders(id) ON DELETE SET NULL"
         )
-    except Exception:
-        pass  # already exists or older MySQL variant
-
-    # Ensure 'Inbox' folder
-    cur.execute("INSERT IGNORE INTO folders (name) VALUES ('Inbox')")
 
-    cn.commit()
-    cur.close(); cn.close()
+def _m4_inbox(cur):
+    cur.execute(insert_ignore_sql("folders", ["name"]), ("Inbox",))
+
+def _m5_tasks_fulltext(cur):
+    # MySQL only: on SQLite, search_db() ranks LIKE hits in Python (services/search_service.py)
+    if BACKEND == "sqlite":
+        return
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA=%s AND TABLE_NAME='tasks' AND INDEX_NAME='ft_tasks_title_notes'",
+        (DB_NAME,),
+    )
+    (count,) = cur.fetchone()
+    if count == 0:
+        cur.execute("ALTER TABLE tasks ADD FULLTEXT INDEX ft_tasks_title_notes (title, notes)")
+
+def _m6_change_versions(cur):
+    """row_version on tasks / folders / settings, the sync_state counter and tombstones."""
+    tables = SQLITE_TABLES if BACKEND == "sqlite" else TABLES
+    cur.execute(tables["sync_state"])
+    cur.execute(tables["tombstones"])
+    cur.execute(insert_ignore_sql("sync_state", ["id", "version"]), (1, 0))
+    for table in VERSIONED_TABLES:
+        _add_column_if_missing(cur, table, "row_version", "row_version BIGINT NOT NULL DEFAULT 0")
+        _create_index(cur, f"ix_{table}_version", table, "row_version")
+    _create_index(cur, "ix_tombstones_version", "tombstones", "row_version")
+    # Existing rows become version 1, so changes_since(0) is a full snapshot
+    cur.execute("UPDATE sync_state SET version = 1 WHERE id = 1 AND version = 0")
+    for table in VERSIONED_TABLES:
+        cur.execute(f"UPDATE {table} SET row_version = 1 WHERE row_version = 0")
+
+def _m7_tombstone_retention(cur):
+    """deleted_at on tombstones and the version pruning has reached (sync_service.prune_tombstones)."""
+    _add_column_if_missing(cur, "tombstones", "deleted_at", "deleted_at DATETIME NULL")
+    _add_column_if_missing(cur, "sync_state", "pruned_version", "pruned_version BIGINT NOT NULL DEFAULT 0")
+    _create_index(cur, "ix_tombstones_deleted_at", "tombstones", "deleted_at")
+    # Existing tombstones start their retention period now
+    cur.execute("UPDATE tombstones SET deleted_at = %s WHERE deleted_at IS NULL", (datetime.now(),))
+
+# (version, description, step) in apply order. Steps must be safe to re-run:
+# databases created before versioning start at 0 and replay all of them.
+# Append new steps here; never renumber or edit an applied one.
+MIGRATIONS = [
+    (1, "base tables and late task columns", _m1_base_tables),
+    (2, "secondary indexes", _ensure_indexes),
+    (3, "daily_stats backfill", _backfill_daily_stats),
+    (4, "default Inbox folder", _m4_inbox),
+    (5, "FULLTEXT index on task title / notes", _m5_tasks_fulltext),
+    (6, "change versions and tombstones for delta sync", _m6_change_versions),
+    (7, "tombstone retention", _m7_tombstone_retention),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def schema_version() -> int:
+    """Highest applied migration; 0 for a new or pre-versioning database."""
+    try:
+        with session() as cur:
+            cur.execute("SELECT MAX(version) FROM schema_version")
+            (version,) = cur.fetchone()
+        return version or 0
+    except Exception:
+        return 0  # no database / no schema_version table yet
 
+def migrate():
+    """Apply pending MIGRATIONS in order, each in its own transaction."""
+    tables = SQLITE_TABLES if BACKEND == "sqlite" else TABLES
+    with session() as cur:
+        cur.execute(tables["schema_version"])
+    current = schema_version()
+    for version, _, step in MIGRATIONS:
+        if version <= current:
+            continue
+        with session() as cur:
+            step(cur)
+            cur.execute(insert_ignore_sql("schema_version", ["version"]), (version,))
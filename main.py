@@ -1,32 +1,92 @@
 # main.py
+import time
+_T0 = time.perf_counter()
+
+import sys
+import threading
 import tkinter as tk
 from tkinter import messagebox
-from database import init_db
-from ui import create_ui
+
+# Startup phase -> ms since launch (printed as each phase finishes)
+STARTUP_PHASES = {}
+
+def _phase(name: str):
+    STARTUP_PHASES[name] = ms = (time.perf_counter() - _T0) * 1000
+    print(f"⏱ {name}: {ms:.0f} ms")
+    from metrics import REGISTRY
+    REGISTRY.set("focusflow_startup_phase_ms", round(ms, 1), phase=name)
 
 def main():
     print("Starting FocusFlow…")
 
-    # Database init
-    try:
-        init_db()
-        print("✅ Database initialized.")
-    except Exception as e:
-        print("❌ Database init failed:", e)
-        messagebox.showerror("Database Error", f"{e}")
+    # `python main.py --rebuild-stats` backfills the daily_stats rollup and exits
+    if "--rebuild-stats" in sys.argv[1:]:
+        from database import init_db
+        from services.task_service import rebuild_daily_stats
+        try:
+            init_db()
+        except Exception as e:
+            print("❌ Database init failed:", e)
+            return
+        rebuild_daily_stats()
+        print("✅ Daily stats rebuilt.")
         return
 
-    # Launch UI
-    try:
-        root = tk.Tk()
-        root.title("FocusFlow")
-        app = create_ui(root)
-        root.minsize(640, 480)
-        print("✅ UI launched. Showing window...")
-        root.mainloop()
-    except Exception as e:
-        print("❌ UI Error:", e)
-        messagebox.showerror("UI Error", f"{e}")
+    # Stage 1: paint an empty shell before anything slow happens
+    root = tk.Tk()
+    root.title("FocusFlow")
+    root.minsize(640, 480)
+    splash = tk.Label(root, text="Loading FocusFlow…")
+    splash.pack(expand=True)
+    root.update()
+    _phase("first paint")
+
+    # Stage 2: database init on a thread while the UI module imports here
+    init_error = []
+    def init():
+        try:
+            from database import init_db
+            from services.settings_service import all_settings
+            init_db()
+            all_settings()  # warm the settings cache here, so App() doesn't query on the Tk thread
+        except Exception as e:
+            init_error.append(e); return
+        try:
+            from services.sync_service import prune_tombstones
+            prune_tombstones()
+        except Exception as e:
+            print("Tombstone pruning failed:", e)
+    db_thread = threading.Thread(target=init, daemon=True)
+    db_thread.start()
+    from ui import create_ui
+    _phase("ui imported")
+
+    # Stage 3: build the real UI once the database is ready; data loads async from there
+    app = None
+    def build():
+        nonlocal app
+        if db_thread.is_alive():
+            root.after(10, build); return
+        if init_error:
+            print("❌ Database init failed:", init_error[0])
+            messagebox.showerror("Database Error", f"{init_error[0]}")
+            root.destroy(); return
+        print("✅ Database initialized.")
+        _phase("database ready")
+        try:
+            splash.destroy()
+            app = create_ui(root, on_loaded=lambda: _phase("tasks loaded"))
+            _phase("ui built")
+            print("✅ UI launched.")
+        except Exception as e:
+            print("❌ UI Error:", e)
+            messagebox.showerror("UI Error", f"{e}")
+            root.destroy()
+
+    root.after(0, build)
+    root.mainloop()
+    if app:
+        app.close()  # no-op after a normal window close; covers other ways out of mainloop
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,122 @@
+# metrics.py
+# In-process metrics registry: counters, gauges and histograms keyed by
+# name + labels, dumpable as JSON or Prometheus text exposition format.
+import bisect
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+# Seconds; suits both DB statements and pool waits
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _key(name: str, labels: dict) -> Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * (n_buckets + 1)  # last = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+class Registry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[Key, float] = {}
+        self._gauges: Dict[Key, float] = {}
+        self._hists: Dict[Key, _Histogram] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        k = _key(name, labels)
+        with self._lock:
+            self._counters[k] = self._counters.get(k, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        k = _key(name, labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            h = self._hists.get(k)
+            if h is None:
+                h = self._hists[k] = _Histogram(len(self.buckets))
+            h.counts[i] += 1
+            h.sum += value
+            h.count += 1
+            if value > h.max: h.max = value
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear(); self._gauges.clear(); self._hists.clear()
+
+    # ---------- Export ----------
+    def snapshot(self) -> dict:
+        """{"counters": [...], "gauges": [...], "histograms": [...]} with plain values."""
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._counters.items()]
+            gauges = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._gauges.items()]
+            hists = [{"name": n, "labels": dict(l), "count": h.count, "sum": h.sum, "max": h.max,
+                      "buckets": dict(zip([*map(str, self.buckets), "+Inf"], h.counts))}
+                     for (n, l), h in self._hists.items()]
+        for group in (counters, gauges, hists):
+            group.sort(key=lambda m: (m["name"], sorted(m["labels"].items())))
+        return {"counters": counters, "gauges": gauges, "histograms": hists}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        snap = self.snapshot()
+        lines, seen = [], set()
+        def header(name, kind):
+            if (name, kind) in seen: return
+            seen.add((name, kind))
+            if name in self._help: lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+        for m in snap["counters"]:
+            header(m["name"], "counter")
+            lines.append(f"{m['name']}{_labels(m['labels'])} {_num(m['value'])}")
+        for m in snap["gauges"]:
+            header(m["name"], "gauge")
+            lines.append(f"{m['name']}{_labels(m['labels'])} {_num(m['value'])}")
+        for m in snap["histograms"]:
+            header(m["name"], "histogram")
+            running = 0
+            for le, n in m["buckets"].items():
+                running += n
+                lines.append(f"{m['name']}_bucket{_labels({**m['labels'], 'le': le})} {running}")
+            lines.append(f"{m['name']}_sum{_labels(m['labels'])} {_num(m['sum'])}")
+            lines.append(f"{m['name']}_count{_labels(m['labels'])} {m['count']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str, fmt: Optional[str] = None):
+        """Write to `path`; fmt "json" or "prometheus" (default: from the extension)."""
+        fmt = fmt or ("json" if path.endswith(".json") else "prometheus")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(self.to_json() if fmt == "json" else self.to_prometheus())
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+REGISTRY = Registry()
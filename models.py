@@ -1,21 +1,190 @@
 # models.py
+import itertools
+import operator
+from array import array
 from dataclasses import dataclass
-from datetime import datetime, date
-from typing import Optional
+from datetime import datetime, date, timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence
 
-@dataclass
+PRIORITIES = ("Low", "Medium", "High")                     # code = index
+PROGRESS_STATES = ("Not started", "In progress", "Completed")
+_PRIORITY_CODES = {p: i for i, p in enumerate(PRIORITIES)}
+_PROGRESS_CODES = {p: i for i, p in enumerate(PROGRESS_STATES)}
+_NO_CODE = -1  # NULL (or unknown) priority / progress in a TaskTable column
+
+@dataclass(slots=True)
 class Task:
+    """One row of list_tasks() (TASK_COLS order)."""
     id: int
     title: str
-    notes: str
+    notes: Optional[str]
+    start_date: Optional[date]
     due_date: Optional[date]
     priority: str
+    progress: str
     is_done: bool
 
-@dataclass
+    @classmethod
+    def from_row(cls, row: Sequence) -> "Task":
+        tid, title, notes, start_date, due_date, priority, progress, is_done = row
+        return cls(tid, title, notes, start_date, due_date, priority, progress, bool(is_done))
+
+@dataclass(slots=True)
 class FocusSession:
     id: int
     task_id: Optional[int]
     started_at: datetime
     ended_at: datetime
     duration_minutes: int
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> "FocusSession":
+        return cls(*row)
+
+def _ordinal(d: Optional[date]) -> int:
+    return d.toordinal() if d else 0  # 0 = no date
+
+def _from_ordinal(n: int) -> Optional[date]:
+    return date.fromordinal(n) if n else None
+
+def _from_code(names: tuple, code: int) -> Optional[str]:
+    return None if code == _NO_CODE else names[code]
+
+class TaskTable:
+    """list_tasks() rows stored column by column.
+
+    Ids, dates (as ordinals, 0 = none), priority / progress codes (-1 = none)
+    and the done flag live in typed arrays; only titles and notes stay Python
+    objects. That is several times smaller than a list of tuples of date
+    objects, and where() / order_by() work on whole columns with C-level
+    helpers instead of per-row Python code. Rows come back out as Task or as
+    plain tuples.
+    """
+    __slots__ = ("ids", "titles", "notes", "start", "due", "priority", "progress", "done")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.titles: List[str] = []
+        self.notes: List[Optional[str]] = []
+        self.start = array("l")
+        self.due = array("l")
+        self.priority = array("b")
+        self.progress = array("b")
+        self.done = array("b")
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence]) -> "TaskTable":
+        t = cls()
+        t.extend(rows)
+        return t
+
+    def extend(self, rows: Iterable[Sequence]):
+        prio, prog = _PRIORITY_CODES, _PROGRESS_CODES
+        for tid, title, notes, start_date, due_date, priority, progress, is_done in rows:
+            self.ids.append(tid); self.titles.append(title); self.notes.append(notes)
+            self.start.append(_ordinal(start_date)); self.due.append(_ordinal(due_date))
+            self.priority.append(prio.get(priority, _NO_CODE)); self.progress.append(prog.get(progress, _NO_CODE))
+            self.done.append(1 if is_done else 0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, i: int) -> tuple:
+        return (self.ids[i], self.titles[i], self.notes[i], _from_ordinal(self.start[i]),
+                _from_ordinal(self.due[i]), _from_code(PRIORITIES, self.priority[i]),
+                _from_code(PROGRESS_STATES, self.progress[i]), bool(self.done[i]))
+
+    def task(self, i: int) -> Task:
+        return Task.from_row(self.row(i))
+
+    def rows(self) -> Iterator[tuple]:
+        return map(self.row, range(len(self)))
+
+    def __iter__(self) -> Iterator[Task]:
+        return map(self.task, range(len(self)))
+
+    def take(self, indices: Iterable[int]) -> "TaskTable":
+        """New table holding rows `indices`, in that order."""
+        idx = list(indices)
+        # itemgetter(*idx) gathers in one C call; it returns a bare item for a single index
+        gather = operator.itemgetter(*idx) if len(idx) > 1 else (lambda col: tuple(col[i] for i in idx))
+        t = TaskTable()
+        for name in self.__slots__:
+            col = getattr(self, name)
+            picked = gather(col)
+            setattr(t, name, array(col.typecode, picked) if isinstance(col, array) else list(picked))
+        return t
+
+    def where(self, flt: "TaskFilter") -> "TaskTable":
+        """Rows flt.matches(), tested a column at a time."""
+        masks, rep = [], itertools.repeat
+        if flt.done is not None:
+            masks.append(map(operator.eq, self.done, rep(1 if flt.done else 0)))
+        if flt.due_to is not None or flt.due_before is not None:
+            masks.append(map(bool, self.due))  # undated rows fail any date bound
+        if flt.due_from is not None:
+            masks.append(map(operator.ge, self.due, rep(flt.due_from.toordinal())))
+        if flt.due_to is not None:
+            masks.append(map(operator.le, self.due, rep(flt.due_to.toordinal())))
+        if flt.due_before is not None:
+            masks.append(map(operator.lt, self.due, rep(flt.due_before.toordinal())))
+        if flt.progress:
+            masks.append(map(operator.eq, self.progress, rep(_PROGRESS_CODES[flt.progress])))
+        if flt.priority:
+            masks.append(map(operator.eq, self.priority, rep(_PRIORITY_CODES[flt.priority])))
+        if not masks:
+            return self.take(range(len(self)))
+        mask = map(all, zip(*masks)) if len(masks) > 1 else masks[0]
+        return self.take(itertools.compress(range(len(self)), mask))
+
+    def order_by(self, column: str, descending: bool = False) -> "TaskTable":
+        """Stable sort on one column: ids, titles, start, due, priority, progress or done.
+        Rows without a date sort last either way."""
+        col = getattr(self, column)
+        if column in ("start", "due"):
+            undated = date.max.toordinal() + 1
+            keys = [(-n if descending else n) if n else undated for n in col]
+            return self.take(sorted(range(len(self)), key=keys.__getitem__))
+        return self.take(sorted(range(len(self)), key=col.__getitem__, reverse=descending))
+
+@dataclass(frozen=True)
+class TaskFilter:
+    """Which tasks list_tasks() returns; fields left as None don't filter."""
+    done: Optional[bool] = None
+    due_from: Optional[date] = None     # inclusive
+    due_to: Optional[date] = None       # inclusive
+    due_before: Optional[date] = None   # exclusive (overdue)
+    progress: Optional[str] = None
+    priority: Optional[str] = None
+
+    @classmethod
+    def from_mode(cls, mode: str, priority: str = "All", today: Optional[date] = None) -> "TaskFilter":
+        """Filter for a UI filter key: all, today, week, overdue, done, p_not, p_in, p_done."""
+        today = today or date.today()
+        prio = None if priority in (None, "", "All") else priority
+        if mode == "today":
+            return cls(due_from=today, due_to=today, priority=prio)
+        if mode == "week":
+            start = today - timedelta(days=today.weekday())
+            return cls(due_from=start, due_to=start + timedelta(days=6), priority=prio)
+        if mode == "overdue":
+            return cls(due_before=today, done=False, priority=prio)
+        if mode == "done":
+            return cls(done=True, priority=prio)
+        progress = {"p_not": "Not started", "p_in": "In progress", "p_done": "Completed"}.get(mode)
+        return cls(progress=progress, priority=prio)
+
+    def matches(self, t: Task) -> bool:
+        """The same test list_tasks() runs in SQL, for one task already in memory."""
+        if self.done is not None and t.is_done != self.done:
+            return False
+        due = t.due_date
+        if self.due_from is not None and (due is None or due < self.due_from):
+            return False
+        if self.due_to is not None and (due is None or due > self.due_to):
+            return False
+        if self.due_before is not None and (due is None or due >= self.due_before):
+            return False
+        if self.progress and t.progress != self.progress:
+            return False
+        return not self.priority or t.priority == self.priority
@@ -0,0 +1,536 @@
+# server.py
+# Local HTTP/JSON API, so several clients (scripts, a browser extension, other
+# windows) share one database and one connection pool instead of each opening
+# their own connections.
+#
+#   python server.py [--host 127.0.0.1] [--port 8765]
+#
+# asyncio owns the sockets; every service call is offloaded to a thread pool
+# sized to the connection pool. GET responses are cached per path + query and
+# dropped as soon as a mutation touches a region they read, or when a poll of
+# sync_service shows another process (the Tk app, the CLI) wrote to it.
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qsl, urlsplit
+
+from config import API_HOST, API_PORT, API_CACHE_TTL_S, DB_POOL_SIZE
+from database import init_db, run_batch, is_integrity_error
+from metrics import REGISTRY
+from models import PRIORITIES, PROGRESS_STATES, FocusSession, Task, TaskFilter
+from services import settings_service as ss
+from services import task_service as ts
+from services.search_service import index_task, unindex_tasks, drop_index
+from services.sync_service import changes_since, current_version, prune_tombstones
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+SYNC_POLL_S = 1.0  # how often other processes' writes are picked up
+FILTER_MODES = {"all", "today", "week", "overdue", "done", "p_not", "p_in", "p_done"}
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+JSON_TYPE = "application/json"
+TEXT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY.describe("focusflow_api_requests_total", "API requests, by route and status")
+REGISTRY.describe("focusflow_api_request_seconds", "API latency (parse to response), by route")
+REGISTRY.describe("focusflow_api_cache_hits_total", "GETs answered from the response cache, by route")
+REGISTRY.describe("focusflow_api_errors_total", "API requests that failed with a server error, by route and exception")
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+# ---------- JSON ----------
+def _default(o):
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+def _task(row) -> dict:
+    t = Task.from_row(row)
+    return {"id": t.id, "title": t.title, "notes": t.notes, "start_date": t.start_date, "due_date": t.due_date,
+            "priority": t.priority, "progress": t.progress, "done": t.is_done}
+
+def _session(row) -> dict:
+    s = FocusSession.from_row(row)
+    return {"id": s.id, "task_id": s.task_id, "started_at": s.started_at, "ended_at": s.ended_at,
+            "minutes": s.duration_minutes}
+
+# ---------- Response cache ----------
+class ResponseCache:
+    """Serialized GET bodies keyed by path + query and tagged with the regions they read.
+
+    Only used from the event loop thread, so there is no locking. A body is
+    only stored if none of its regions was invalidated while it was being
+    computed, so a read racing a write never caches pre-write data. Entries
+    also expire after `ttl_s`, for data change versions don't cover (focus
+    sessions logged by other processes).
+    """
+    def __init__(self, max_entries: int = 1024, ttl_s: float = API_CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()  # key -> (expires, tags, content_type, body)
+        self._by_tag = {}              # region -> {keys}
+        self._gen = {}                 # region -> invalidation count
+
+    def get(self, key: str):
+        e = self._entries.get(key)
+        if e is None:
+            return None
+        if e[0] < time.monotonic():
+            self._drop(key); return None
+        self._entries.move_to_end(key)
+        return e[2], e[3]
+
+    def generation(self, tags) -> tuple:
+        return tuple(self._gen.get(t, 0) for t in tags)
+
+    def put(self, key: str, tags, gen: tuple, content_type: str, body: bytes):
+        if self.generation(tags) != gen:
+            return  # invalidated mid-flight
+        self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl_s, tags, content_type, body)
+        for t in tags:
+            self._by_tag.setdefault(t, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        for t in tags:
+            self._gen[t] = self._gen.get(t, 0) + 1
+            for key in self._by_tag.pop(t, ()):
+                self._drop(key)
+
+    def clear(self):
+        self.invalidate(list(self._by_tag))
+
+    def _drop(self, key: str):
+        e = self._entries.pop(key, None)
+        if e is not None:
+            for t in e[1]:
+                keys = self._by_tag.get(t)
+                if keys: keys.discard(key)
+
+# ---------- Routes ----------
+# reads:  regions a GET depends on (makes it cacheable)
+# writes: regions a mutation invalidates once it has run
+Route = namedtuple("Route", "method pattern fn reads writes status")
+ROUTES = []
+
+def route(method: str, pattern: str, reads=(), writes=(), status: int = 200):
+    def register(fn):
+        ROUTES.append(Route(method, re.compile(pattern), fn, tuple(reads), tuple(writes), status))
+        return fn
+    return register
+
+def _int(value, name: str):
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"{name} must be an integer")
+
+def _date(value, name: str):
+    if value in (None, ""):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"{name} must be YYYY-MM-DD")
+
+def _datetime(value, name: str):
+    if value in (None, ""):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"{name} must be an ISO date/time")
+
+def _choice(value, name: str, choices):
+    if value is not None and value not in choices:
+        raise HttpError(400, f"{name} must be one of {', '.join(sorted(choices))}")
+    return value
+
+def _enum(value, name: str, choices):
+    # For fields that must be set: unlike _choice, None is rejected too
+    if value not in choices:
+        raise HttpError(400, f"{name} must be one of {', '.join(sorted(choices))}")
+    return value
+
+def _bool(value, name: str):
+    if not isinstance(value, bool):
+        raise HttpError(400, f"{name} must be true or false")
+    return value
+
+def _required(body, name: str):
+    value = (body or {}).get(name)
+    if value in (None, ""):
+        raise HttpError(400, f"{name} is required")
+    return value
+
+@route("GET", r"/health")
+def api_health(query, body):
+    return {"ok": True}
+
+@route("GET", r"/metrics")
+def api_metrics(query, body):
+    return REGISTRY.to_prometheus()
+
+# Folders
+@route("GET", r"/folders", reads=["folders"])
+def api_list_folders(query, body):
+    return [{"id": fid, "name": name} for fid, name in ts.list_folders()]
+
+@route("POST", r"/folders", writes=["folders"], status=201)
+def api_create_folder(query, body):
+    return {"id": ts.create_folder(str(_required(body, "name")))}
+
+@route("PATCH", r"/folders/(\d+)", writes=["folders"])
+def api_rename_folder(query, body, folder_id):
+    ts.rename_folder(folder_id, str(_required(body, "name")))
+    return {"id": folder_id}
+
+@route("DELETE", r"/folders/(\d+)", writes=["folders", "tasks"], status=204)
+def api_delete_folder(query, body, folder_id):
+    ts.delete_folder(folder_id)  # its tasks move to Inbox
+
+# Tasks
+@route("GET", r"/tasks", reads=["tasks"])
+def api_list_tasks(query, body):
+    """?folder=ID&filter=MODE&priority=P&pending=1&q=TEXT&limit=N"""
+    folder_id = _int(query.get("folder"), "folder")
+    filters = TaskFilter.from_mode(_choice(query.get("filter", "all"), "filter", FILTER_MODES),
+                                   _choice(query.get("priority"), "priority", PRIORITIES) or "All")
+    include_done = query.get("pending") not in ("1", "true")
+    limit = _int(query.get("limit"), "limit")
+    if limit is not None and limit <= 0:
+        raise HttpError(400, "limit must be positive")
+    if query.get("q"):
+        rows = ts.search_tasks(query["q"], limit or 500, include_done, folder_id, filters)
+    elif limit:
+        rows, _after = ts.list_tasks_page(include_done, folder_id, filters, limit=limit)  # LIMIT in SQL
+    else:
+        rows = ts.list_tasks(include_done, folder_id, filters)
+    return [_task(r) for r in rows]
+
+@route("GET", r"/tasks/(\d+)", reads=["tasks"])
+def api_get_task(query, body, task_id):
+    row = ts.get_task(task_id)
+    if row is None:
+        raise HttpError(404, f"no task {task_id}")
+    return _task(row)
+
+@route("POST", r"/tasks", writes=["tasks"], status=201)
+def api_add_task(query, body):
+    folder_id = _int(body.get("folder_id"), "folder_id")
+    task_id = ts.add_task(str(_required(body, "title")), body.get("notes"), _date(body.get("due_date"), "due_date"),
+                          _enum(body.get("priority", "Low"), "priority", PRIORITIES),
+                          ts.inbox_id() if folder_id is None else folder_id)  # the app lists by folder
+    return _task(ts.get_task(task_id))
+
+# PATCH field -> (parse, service call); all fields in one request commit together
+_TASK_FIELDS = {
+    "title": (lambda v: str(_required({"title": v}, "title")), ts.rename_task),
+    "priority": (lambda v: _enum(v, "priority", PRIORITIES), ts.update_priority),
+    "progress": (lambda v: _enum(v, "progress", PROGRESS_STATES), ts.set_progress),
+    "done": (lambda v: _bool(v, "done"), ts.toggle_done),
+    "start_date": (lambda v: _date(v, "start_date"), ts.set_start_date),       # null clears
+    "due_date": (lambda v: _date(v, "due_date"), ts.set_due_date),
+    "folder_id": (lambda v: _int(_required({"folder_id": v}, "folder_id"), "folder_id"), ts.move_task_to_folder),
+}
+
+@route("PATCH", r"/tasks/(\d+)", writes=["tasks", "stats"])
+def api_update_task(query, body, task_id):
+    unknown = set(body or {}) - set(_TASK_FIELDS)
+    if unknown:
+        raise HttpError(400, f"unknown fields: {', '.join(sorted(unknown))}")
+    calls = [(fn, (task_id, parse(body[name]))) for name, (parse, fn) in _TASK_FIELDS.items() if name in body]
+    if ts.get_task(task_id) is None:
+        raise HttpError(404, f"no task {task_id}")
+    run_batch(calls)
+    return _task(ts.get_task(task_id))
+
+@route("DELETE", r"/tasks/(\d+)", writes=["tasks", "stats", "sessions"], status=204)
+def api_delete_task(query, body, task_id):
+    ts.delete_task(task_id)
+
+# Focus sessions / stats
+@route("GET", r"/sessions", reads=["sessions"])
+def api_list_sessions(query, body):
+    """?since=ISO&task=ID&limit=N (default 500), newest first."""
+    return [_session(r) for r in ts.list_focus_sessions(_datetime(query.get("since"), "since"),
+                                                        _int(query.get("task"), "task"),
+                                                        _int(query.get("limit"), "limit") or 500)]
+
+@route("POST", r"/sessions", writes=["sessions", "stats"], status=201)
+def api_log_session(query, body):
+    """{"task_id", "started_at", and "ended_at" or "minutes"}"""
+    started = _datetime(_required(body, "started_at"), "started_at")
+    ended = _datetime(body.get("ended_at"), "ended_at")
+    minutes = _int(body.get("minutes"), "minutes")
+    if ended is None and minutes is None:
+        raise HttpError(400, "ended_at or minutes is required")
+    if minutes is None:
+        minutes = max(int((ended - started).total_seconds() // 60), 0)
+    ts.log_focus_session(_int(body.get("task_id"), "task_id"), started,
+                         ended or started + timedelta(minutes=minutes), minutes)
+    return {"task_id": body.get("task_id"), "started_at": started, "minutes": minutes}
+
+@route("GET", r"/stats", reads=["stats"])
+def api_stats(query, body):
+    done_today, week_minutes = ts.get_mini_stats()
+    return {"done_today": done_today, "week_minutes": week_minutes}
+
+@route("GET", r"/stats/daily", reads=["stats"])
+def api_daily_stats(query, body):
+    """?start=YYYY-MM-DD&end=YYYY-MM-DD (default: the last 7 days)"""
+    end = _date(query.get("end"), "end") or date.today()
+    start = _date(query.get("start"), "start") or end - timedelta(days=6)
+    return [{"day": d, "done": done, "minutes": m} for d, done, m in ts.get_daily_stats(start, end)]
+
+# Settings
+@route("GET", r"/settings", reads=["settings"])
+def api_get_settings(query, body):
+    """?keys=a,b (default: all)"""
+    keys = [k for k in query.get("keys", "").split(",") if k]
+    return ss.get_settings(keys) if keys else ss.all_settings()
+
+@route("PUT", r"/settings", writes=["settings"])
+def api_put_settings(query, body):
+    if not isinstance(body, dict) or not body:
+        raise HttpError(400, "expected an object of settings")
+    run_batch([(ss.set_setting, (str(k), str(v))) for k, v in body.items()])
+    return ss.get_settings(body.keys())
+
+# Delta sync (never cached: the version in the query changes every poll)
+@route("GET", r"/changes")
+def api_changes(query, body):
+    """?since=VERSION -> what changed after it; pass the returned "version" next time."""
+    ch = changes_since(_int(query.get("since"), "since") or 0)
+    return {**ch, "tasks": [{**_task(r[:8]), "folder_id": r[8], "created_at": r[9]} for r in ch["tasks"]],
+            "folders": [{"id": fid, "name": name} for fid, name in ch["folders"]]}
+
+# ---------- Sync ----------
+# Delta region -> response-cache regions it invalidates
+_SYNC_REGIONS = {"folders": ("folders",), "tasks": ("tasks", "stats"), "settings": ("settings",)}
+
+def _fetch_changes(version: int) -> dict:
+    # Worker thread: patch this process's settings cache and search index with other writers' changes
+    ch = changes_since(version)
+    if ch["reset"]:
+        ss.invalidate_settings(); drop_index()
+        return ch
+    if ch["settings"]:
+        ss.merge_settings(ch["settings"])
+    for row in ch["tasks"]:
+        index_task(row[0], row[1], row[2])
+    unindex_tasks(ch["deleted"]["tasks"])
+    return ch
+
+# ---------- Server ----------
+class ApiServer:
+    def __init__(self, cache: ResponseCache | None = None, workers: int = DB_POOL_SIZE):
+        self.cache = cache or ResponseCache()
+        # One thread per pooled connection: offloaded calls never queue on the pool
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="focusflow-api")
+        self._server = None
+        self._sync = None  # poll task, see _poll_changes
+
+    async def offload(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def _match(self, method: str, path: str):
+        allowed = []
+        for r in ROUTES:
+            m = r.pattern.fullmatch(path)
+            if m:
+                if r.method == method:
+                    return r, [int(g) for g in m.groups()]
+                allowed.append(r.method)
+        raise HttpError(405 if allowed else 404, f"{method} not allowed" if allowed else f"no route for {path}")
+
+    @staticmethod
+    def _call(r: Route, args, query, body):
+        # Runs on a worker thread: the handler and the serialization both stay off the loop
+        result = r.fn(query, body, *args)
+        if result is None:
+            return "", b""
+        if isinstance(result, str):
+            return TEXT_TYPE, result.encode()
+        return JSON_TYPE, _dumps(result)
+
+    async def handle(self, r: Route, args: list, url, raw_body: bytes):
+        """-> (status, content type, body) for a matched request."""
+        path = url.path.rstrip("/") or "/"
+        key = None
+        if r.reads:
+            key = path + "?" + "&".join(sorted(url.query.split("&"))) if url.query else path
+            hit = self.cache.get(key)
+            if hit is not None:
+                REGISTRY.inc("focusflow_api_cache_hits_total", route=r.fn.__name__)
+                return r.status, *hit
+            gen = self.cache.generation(r.reads)
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            raise HttpError(400, "body is not valid JSON")
+        if not isinstance(body, dict):
+            raise HttpError(400, "body must be a JSON object")
+        try:
+            ctype, out = await self.offload(self._call, r, args, dict(parse_qsl(url.query)), body)
+        finally:
+            if r.writes:
+                self.cache.invalidate(r.writes)
+        if key is not None:
+            self.cache.put(key, r.reads, gen, ctype, out)
+        return r.status, ctype, out
+
+    async def _respond(self, method: str, target: str, raw_body: bytes):
+        t0 = time.perf_counter()
+        name = "unmatched"
+        try:
+            url = urlsplit(target)
+            r, args = self._match(method, url.path.rstrip("/") or "/")
+            name = r.fn.__name__
+            status, ctype, out = await self.handle(r, args, url, raw_body)
+        except HttpError as e:
+            status, ctype, out = e.status, JSON_TYPE, _dumps({"error": str(e)})
+        except ValueError as e:  # bad values that got past the parsers (e.g. a CHECK constraint)
+            status, ctype, out = 400, JSON_TYPE, _dumps({"error": str(e)})
+        except Exception as e:
+            if is_integrity_error(e):  # duplicate name, folder_id / task_id that doesn't exist
+                status, ctype, out = 409, JSON_TYPE, _dumps({"error": str(e)})
+            else:
+                REGISTRY.inc("focusflow_api_errors_total", route=name, error=type(e).__name__)
+                status, ctype, out = 500, JSON_TYPE, _dumps({"error": str(e)})
+        REGISTRY.inc("focusflow_api_requests_total", route=name, status=status)
+        REGISTRY.observe("focusflow_api_request_seconds", time.perf_counter() - t0, route=name)
+        return status, ctype, out
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # HTTP/1.1 with keep-alive; requests on one connection are answered in order
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break  # client closed
+                except asyncio.LimitOverrunError:
+                    self._write(writer, 431, JSON_TYPE, _dumps({"error": "headers too large"}), False)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    self._write(writer, 400, JSON_TYPE, _dumps({"error": "bad request line"}), False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if value:
+                        headers[name.strip().lower()] = value.strip()
+                conn = headers.get("connection", "").lower()
+                keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self._write(writer, 400, JSON_TYPE, _dumps({"error": "bad Content-Length"}), False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    self._write(writer, 413, JSON_TYPE, _dumps({"error": "body too large"}), False)
+                    break
+                raw_body = await reader.readexactly(length) if length else b""
+                status, ctype, out = await self._respond(method, target, raw_body)
+                self._write(writer, status, ctype, out, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write(writer, status: int, ctype: str, body: bytes, keep_alive: bool):
+        head = f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Length: {len(body)}\r\n"
+        if body:
+            head += f"Content-Type: {ctype}\r\n"
+        if not keep_alive:
+            head += "Connection: close\r\n"
+        writer.write(head.encode() + b"\r\n" + body)
+
+    async def _poll_changes(self, version: int):
+        """Pick up writes from other processes every SYNC_POLL_S; this server's own show up too (harmless)."""
+        while True:
+            await asyncio.sleep(SYNC_POLL_S)
+            try:
+                ch = await self.offload(_fetch_changes, version)
+            except Exception as e:
+                REGISTRY.inc("focusflow_api_errors_total", route="sync", error=type(e).__name__)
+                continue
+            version = ch["version"]
+            if ch["reset"]:
+                self.cache.clear(); continue
+            regions = {r for name, tags in _SYNC_REGIONS.items() if ch[name] or ch["deleted"].get(name)
+                       for r in tags}
+            if regions:
+                self.cache.invalidate(regions)
+
+    async def start(self, host: str = API_HOST, port: int = API_PORT):
+        # Read the version before serving: every later write is then seen by the poll
+        version = await self.offload(current_version)
+        self._sync = asyncio.create_task(self._poll_changes(version))
+        self._server = await asyncio.start_server(self._client, host, port, limit=MAX_HEADER_BYTES)
+        return self._server
+
+    async def serve_forever(self, host: str = API_HOST, port: int = API_PORT):
+        server = await self.start(host, port)
+        addrs = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+        print(f"FocusFlow API listening on http://{addrs}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self._sync is not None:
+            self._sync.cancel()
+        if self._server is not None:
+            self._server.close()
+        self.executor.shutdown(wait=True)
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="focusflow-server", description="FocusFlow local JSON API")
+    p.add_argument("--host", default=API_HOST)
+    p.add_argument("--port", type=int, default=API_PORT)
+    args = p.parse_args(argv)
+    try:
+        init_db()
+        prune_tombstones()
+    except Exception as e:
+        print("❌ Database init failed:", e)
+        return 1
+    api = ApiServer()
+    try:
+        asyncio.run(api.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
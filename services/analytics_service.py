@@ -0,0 +1,154 @@
+# services/analytics_service.py
+# Focus analytics over focus_sessions, computed on columnar NumPy arrays.
+# NumPy is optional: without it the rest of the app works and these raise.
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from database import session
+
+FETCH_CHUNK = 10000
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()  # day numbers below are days since 1970-01-01
+
+def day_number(d: date) -> int:
+    return d.toordinal() - EPOCH_ORDINAL
+
+def day_from_number(n: int) -> date:
+    return date.fromordinal(n + EPOCH_ORDINAL)
+
+def _require_numpy():
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("Focus analytics need NumPy (pip install numpy)")
+
+# ---------- Loading ----------
+def load_sessions() -> dict:
+    """focus_sessions as columns: start minute, duration, task and folder (-1 = none)."""
+    _require_numpy()
+    started, minutes, tasks, folders = [], [], [], []
+    with session() as cur:
+        cur.execute(
+            "SELECT s.started_at, s.duration_minutes, s.task_id, t.folder_id "
+            "FROM focus_sessions s LEFT JOIN tasks t ON t.id = s.task_id"
+        )
+        while True:
+            rows = cur.fetchmany(FETCH_CHUNK)
+            if not rows:
+                break
+            for st, mins, tid, fid in rows:
+                started.append(st); minutes.append(mins)
+                tasks.append(-1 if tid is None else tid)
+                folders.append(-1 if fid is None else fid)
+    start_min = np.array(started, dtype="datetime64[m]").astype(np.int64)
+    return {
+        "start_min": start_min,
+        "minutes": np.array(minutes, dtype=np.int64),
+        "task_id": np.array(tasks, dtype=np.int64),
+        "folder_id": np.array(folders, dtype=np.int64),
+    }
+
+# ---------- Aggregation (pure; runs in the worker process) ----------
+def _totals_by(keys, minutes) -> dict:
+    mask = keys >= 0
+    ids, inverse = np.unique(keys[mask], return_inverse=True)
+    sums = np.bincount(inverse, weights=minutes[mask], minlength=len(ids))
+    order = np.argsort(-sums, kind="stable")
+    return {int(ids[i]): int(sums[i]) for i in order}
+
+def _runs(active) -> tuple:
+    """(longest run of True, run of True ending at the last element)."""
+    if not active.any():
+        return 0, 0
+    padded = np.concatenate(([False], active, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    starts, ends = edges[0::2], edges[1::2]
+    longest = int((ends - starts).max())
+    current = int(ends[-1] - starts[-1]) if ends[-1] == len(active) else 0
+    return longest, current
+
+def compute_analytics(cols: dict, today: int, window: int = 7) -> dict:
+    """Aggregate load_sessions() columns; `today` is a day number (days since 1970-01-01).
+
+    Returns plain Python values:
+      heatmap[weekday][hour]  minutes (Monday = 0)
+      daily                   {"start": day number, "minutes": [...]} up to today
+      rolling_avg             `window`-day mean of daily minutes, same length as daily
+      per_task / per_folder   {id: minutes}, largest first
+      longest_streak / current_streak   consecutive days with any focus
+    """
+    start_min, minutes = cols["start_min"], cols["minutes"]
+    if len(minutes) == 0:
+        return {"heatmap": [[0] * 24 for _ in range(7)], "daily": {"start": today, "minutes": []},
+                "rolling_avg": [], "per_task": {}, "per_folder": {}, "total_minutes": 0,
+                "longest_streak": 0, "current_streak": 0}
+
+    day = start_min // 1440
+    hour = (start_min % 1440) // 60
+    weekday = (day + 3) % 7  # 1970-01-01 was a Thursday
+
+    heat = np.bincount(weekday * 24 + hour, weights=minutes, minlength=7 * 24).reshape(7, 24)
+
+    first = int(day.min())
+    span = max(today, int(day.max())) - first + 1
+    daily = np.bincount(day - first, weights=minutes, minlength=span)
+
+    # Rolling mean from a cumulative sum; the first window-1 days average what exists
+    csum = np.concatenate(([0.0], np.cumsum(daily)))
+    end = np.arange(1, span + 1)
+    begin = np.maximum(end - window, 0)
+    rolling = (csum[end] - csum[begin]) / (end - begin)
+
+    active = daily[: max(today - first + 1, 0)] > 0  # days up to today (none if all sessions are later)
+    longest, current = _runs(active)
+    if current == 0 and len(active) > 1:
+        # Nothing logged yet today: a streak that ran through yesterday still counts
+        current = _runs(active[:-1])[1]
+
+    return {
+        "heatmap": heat.astype(np.int64).tolist(),
+        "daily": {"start": first, "minutes": daily.astype(np.int64).tolist()},
+        "rolling_avg": np.round(rolling, 1).tolist(),
+        "per_task": _totals_by(cols["task_id"], minutes),
+        "per_folder": _totals_by(cols["folder_id"], minutes),
+        "total_minutes": int(minutes.sum()),
+        "longest_streak": longest,
+        "current_streak": current,
+    }
+
+# ---------- Process pool ----------
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: forking a process that runs Tk and DB threads isn't safe
+            _pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True); _pool = None
+
+atexit.register(shutdown_pool)
+
+def get_focus_analytics(today: Optional[date] = None, window: int = 7) -> dict:
+    """Load sessions here and aggregate them in the worker process.
+
+    Blocks the calling thread until the result is back: call it from a
+    background thread (DbWorker), never from Tk.
+    """
+    cols = load_sessions()
+    return _get_pool().submit(compute_analytics, cols, day_number(today or date.today()), window).result()
@@ -0,0 +1,177 @@
+# services/io_service.py
+# Streaming CSV / JSONL import and export for folders, tasks and focus_sessions.
+import csv
+import json
+import os
+from datetime import date, datetime
+from typing import Callable, Iterable, Iterator, Optional
+
+from database import session, rebuild_daily_stats, insert_ignore_sql, change_version, after_commit, VERSIONED_TABLES
+from services.search_service import drop_index
+
+# Exported columns per table; ids are kept so references survive a round trip
+TABLE_COLUMNS = {
+    "folders": ["id", "name"],
+    "tasks": ["id", "title", "notes", "start_date", "due_date", "priority", "progress",
+              "is_done", "completed_at", "folder_id", "created_at"],
+    "focus_sessions": ["id", "task_id", "started_at", "ended_at", "duration_minutes"],
+}
+# Import / export order (parents before children)
+TABLE_ORDER = ["folders", "tasks", "focus_sessions"]
+
+DATE_COLS = {"start_date", "due_date"}
+DATETIME_COLS = {"completed_at", "created_at", "started_at", "ended_at"}
+INT_COLS = {"id", "is_done", "folder_id", "task_id", "duration_minutes"}
+
+CHUNK = 5000  # rows per fetchmany / executemany / transaction
+
+Progress = Optional[Callable[[str, int], None]]  # (table, rows so far)
+
+def _fmt(path: str, fmt: Optional[str]) -> str:
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported format {fmt!r} (use csv or jsonl)")
+    return fmt
+
+def _check_table(table: str):
+    if table not in TABLE_COLUMNS:
+        raise ValueError(f"Unknown table {table!r}")
+
+# ---------- Export ----------
+def _fetch_rows(cur, table: str, chunk: int = CHUNK) -> Iterator[tuple]:
+    """Stream a table in id order off `cur`, `chunk` rows at a time.
+
+    The default mysql.connector cursor is unbuffered, so rows come off the
+    server as they are fetched rather than being loaded up front. The caller
+    owns the session, so it is closed even if the consumer stops early.
+    """
+    cur.execute(f"SELECT {', '.join(TABLE_COLUMNS[table])} FROM {table} ORDER BY id")
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            return
+        yield from rows
+
+def _to_text(v):
+    if isinstance(v, (date, datetime)):
+        return v.isoformat(" ") if isinstance(v, datetime) else v.isoformat()
+    return v
+
+def _csv_lines(cols, rows) -> Iterator[list]:
+    yield cols
+    for row in rows:
+        yield ["" if v is None else _to_text(v) for v in row]
+
+def _jsonl_lines(cols, rows) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps({c: _to_text(v) for c, v in zip(cols, row)}, ensure_ascii=False) + "\n"
+
+def export_table(table: str, path: str, fmt: Optional[str] = None, progress: Progress = None) -> int:
+    """Write `table` to a .csv or .jsonl file; returns the row count."""
+    _check_table(table)
+    fmt = _fmt(path, fmt)
+    cols = TABLE_COLUMNS[table]
+    count = 0
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            yield row
+            count += 1
+            if progress and count % CHUNK == 0: progress(table, count)
+    with session() as cur, open(path, "w", encoding="utf-8", newline="") as fh:
+        rows = counted(_fetch_rows(cur, table))
+        if fmt == "csv":
+            csv.writer(fh).writerows(_csv_lines(cols, rows))
+        else:
+            fh.writelines(_jsonl_lines(cols, rows))
+    if progress: progress(table, count)
+    return count
+
+def export_all(folder: str, fmt: str = "jsonl", progress: Progress = None) -> dict:
+    """Export every table to <folder>/<table>.<fmt>; returns {table: rows}."""
+    os.makedirs(folder, exist_ok=True)
+    return {t: export_table(t, os.path.join(folder, f"{t}.{fmt}"), fmt, progress) for t in TABLE_ORDER}
+
+# ---------- Import ----------
+def _parse(col: str, v):
+    if v is None or v == "":
+        return None
+    if col in DATE_COLS:
+        return date.fromisoformat(v) if isinstance(v, str) else v
+    if col in DATETIME_COLS:
+        return datetime.fromisoformat(v) if isinstance(v, str) else v
+    if col in INT_COLS:
+        return int(v)
+    return v
+
+def _read_records(path: str, fmt: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8", newline="") as fh:
+        if fmt == "csv":
+            yield from csv.DictReader(fh)
+        else:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+def _batches(rows: Iterable[tuple], size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch; batch = []
+    if batch:
+        yield batch
+
+def import_table(table: str, path: str, fmt: Optional[str] = None, progress: Progress = None,
+                 rebuild_stats: bool = True) -> int:
+    """Insert rows from a .csv or .jsonl file, CHUNK rows per transaction.
+
+    Columns missing from the file fall back to the table defaults. Ids are
+    kept and rows whose id (or folder name) already exists are skipped, so
+    re-running an import is harmless. Returns the number of rows read.
+    """
+    _check_table(table)
+    fmt = _fmt(path, fmt)
+    records = _read_records(path, fmt)
+    first = next(records, None)
+    if first is None:
+        return 0
+    cols = [c for c in TABLE_COLUMNS[table] if c in first]
+    versioned = table in VERSIONED_TABLES
+    sql = insert_ignore_sql(table, cols + ["row_version"] if versioned else cols)
+
+    def rows():
+        for rec in _chain(first, records):
+            yield tuple(_parse(c, rec.get(c)) for c in cols)
+
+    count = 0
+    for batch in _batches(rows(), CHUNK):
+        with session() as cur:
+            if versioned:  # stamped so delta sync picks the rows up
+                version = change_version(cur)
+                batch = [row + (version,) for row in batch]
+            cur.executemany(sql, batch)
+        count += len(batch)
+        if progress: progress(table, count)
+    if table == "tasks":
+        after_commit(drop_index)  # rebuilt from the DB on the next search
+    if rebuild_stats and table in ("tasks", "focus_sessions"):
+        with session() as cur:
+            rebuild_daily_stats(cur)
+    return count
+
+def import_all(folder: str, fmt: str = "jsonl", progress: Progress = None) -> dict:
+    """Import <folder>/<table>.<fmt> for each table that has a file."""
+    counts = {}
+    for t in TABLE_ORDER:
+        path = os.path.join(folder, f"{t}.{fmt}")
+        if os.path.exists(path):
+            counts[t] = import_table(t, path, fmt, progress, rebuild_stats=False)
+    if counts.get("tasks") or counts.get("focus_sessions"):
+        with session() as cur:
+            rebuild_daily_stats(cur)
+    return counts
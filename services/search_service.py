@@ -0,0 +1,183 @@
+# services/search_service.py
+# Prefix-as-you-type task search.
+#
+# Long-running processes (the UI) keep an in-memory inverted index over task
+# titles and notes: built once from the DB, then kept current by task_service
+# calling index_task() / unindex_tasks() after each commit. One-shot callers
+# (cli.py) use search_db(), which goes through the FULLTEXT index on MySQL.
+# Both match every query word as a word prefix; task_service.search_tasks
+# applies the folder / filters on top.
+import bisect
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import database
+from database import session
+
+TITLE_WEIGHT, NOTES_WEIGHT = 2, 1
+EXACT_BONUS = 0.5        # a whole-word hit outranks a prefix-only one
+BUILD_CHUNK = 5000
+
+_WORD = re.compile(r"\w+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _WORD.findall(text.casefold()) if text else []
+
+class TaskIndex:
+    """Inverted index: token -> (ids with it in the title, ids with it in the notes),
+    plus a sorted token list so every token starting with a prefix is one bisect away."""
+    def __init__(self):
+        self._postings: Dict[str, Tuple[Set[int], Set[int]]] = {}
+        self._tokens: List[str] = []                    # sorted keys of _postings
+        self._docs: Dict[int, Tuple[str, Optional[str]]] = {}  # task_id -> (title, notes)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, task_id: int, title: str, notes: Optional[str] = None):
+        self.remove(task_id)
+        self._docs[task_id] = (title, notes)
+        for field, text in ((0, title), (1, notes)):
+            for tok in set(tokenize(text)):
+                posting = self._postings.get(tok)
+                if posting is None:
+                    posting = self._postings[tok] = (set(), set())
+                    bisect.insort(self._tokens, tok)
+                posting[field].add(task_id)
+
+    def remove(self, task_id: int):
+        doc = self._docs.pop(task_id, None)
+        if doc is None:
+            return
+        for tok in set(tokenize(doc[0]) + tokenize(doc[1])):
+            posting = self._postings.get(tok)
+            if posting is None:
+                continue
+            posting[0].discard(task_id); posting[1].discard(task_id)
+            if not posting[0] and not posting[1]:
+                del self._postings[tok]
+                i = bisect.bisect_left(self._tokens, tok)
+                if i < len(self._tokens) and self._tokens[i] == tok:
+                    del self._tokens[i]
+
+    def doc(self, task_id: int):
+        return self._docs.get(task_id)
+
+    def _term_scores(self, term: str) -> Dict[int, float]:
+        """{task_id: best weight} over every token starting with `term`."""
+        lo = bisect.bisect_left(self._tokens, term)
+        hi = bisect.bisect_left(self._tokens, term + "\U0010ffff")
+        prefixed = [self._postings[tok] for tok in self._tokens[lo:hi]]
+        exact = self._postings.get(term)
+        # Lowest weight first so each later update() keeps the best one (dict.update runs in C)
+        scores: Dict[int, float] = {}
+        for field, weight in ((1, NOTES_WEIGHT), (0, TITLE_WEIGHT)):
+            for posting in prefixed:
+                scores.update(dict.fromkeys(posting[field], weight))
+            if exact:
+                scores.update(dict.fromkeys(exact[field], weight + EXACT_BONUS))
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = 200) -> List[Tuple[int, float]]:
+        """Tasks matching every query word as a prefix, best first: [(task_id, score)].
+        limit=None returns every match."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        # Longest terms first: they match the fewest tokens, keeping the intersection small
+        terms.sort(key=len, reverse=True)
+        total = self._term_scores(terms[0])
+        for term in terms[1:]:
+            if not total:
+                break
+            scores = self._term_scores(term)
+            total = {tid: s + scores[tid] for tid, s in total.items() if tid in scores}
+        # Higher score first, then newer (higher id) first: two stable C-level sorts
+        # beat a Python key function by ~3x on a 100k-hit one-letter prefix
+        ranked = sorted(sorted(total, reverse=True), key=total.__getitem__, reverse=True)[:limit]
+        return [(tid, total[tid]) for tid in ranked]
+
+# ---------- Shared index ----------
+_index: Optional[TaskIndex] = None
+_lock = threading.Lock()
+
+def _build() -> TaskIndex:
+    index = TaskIndex()
+    with session() as cur:
+        cur.execute("SELECT id, title, notes FROM tasks")
+        while True:
+            rows = cur.fetchmany(BUILD_CHUNK)
+            if not rows:
+                break
+            for tid, title, notes in rows:
+                index.add(tid, title, notes)
+    return index
+
+def get_index() -> TaskIndex:
+    """The shared index, built from the DB on first use."""
+    global _index
+    with _lock:
+        # Built under the lock: hooks from the writer wait, then re-apply on top
+        if _index is None:
+            _index = _build()
+        return _index
+
+def search(query: str, limit: Optional[int] = 200) -> List[int]:
+    """Ranked task ids for `query` from the in-memory index (None = all matches)."""
+    index = get_index()
+    with _lock:
+        return [tid for tid, _score in index.search(query, limit)]
+
+def index_task(task_id: int, title: Optional[str] = None, notes: Optional[str] = None):
+    """Call after a task is added or its text changes; None keeps the old value."""
+    with _lock:
+        if _index is None:
+            return  # not built in this process; it will read the DB when it is
+        old = _index.doc(task_id) or ("", None)
+        _index.add(task_id, old[0] if title is None else title, old[1] if notes is None else notes)
+
+def unindex_tasks(ids: Iterable[int]):
+    with _lock:
+        if _index is None:
+            return
+        for tid in ids:
+            _index.remove(int(tid))
+
+def drop_index():
+    """Forget the index (after bulk loads); the next search rebuilds it."""
+    global _index
+    with _lock:
+        _index = None
+
+# ---------- DB-side search ----------
+def _boolean_query(terms: List[str]) -> str:
+    # +word* = must contain a word starting with `word`
+    return " ".join(f"+{t}*" for t in terms)
+
+def search_db(query: str, limit: Optional[int] = 200) -> List[int]:
+    """Ranked task ids straight from the DB, with the same word-prefix matching as search().
+
+    MySQL uses the FULLTEXT index. SQLite has none: LIKE narrows the rows to
+    substring hits and a throwaway TaskIndex keeps the word-prefix ones and
+    ranks them exactly as search() would.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+    with session() as cur:
+        if database.BACKEND == "mysql":
+            q = ("SELECT id FROM tasks WHERE MATCH(title, notes) AGAINST (%s IN BOOLEAN MODE) "
+                 "ORDER BY MATCH(title, notes) AGAINST (%s IN BOOLEAN MODE) DESC, id DESC")
+            params = [_boolean_query(terms), _boolean_query(terms)]
+            if limit is not None:
+                q += " LIMIT %s"; params.append(int(limit))
+            cur.execute(q, tuple(params))
+            return [r[0] for r in cur.fetchall()]
+        conds = " AND ".join(["(title LIKE %s OR notes LIKE %s)"] * len(terms))
+        cur.execute(f"SELECT id, title, notes FROM tasks WHERE {conds}",
+                    tuple(p for t in terms for p in (f"%{t}%", f"%{t}%")))
+        index = TaskIndex()
+        for tid, title, notes in cur.fetchall():
+            index.add(tid, title, notes)
+    return [tid for tid, _score in index.search(query, limit)]
@@ -1,16 +1,99 @@
-# services/settings_service.py
-from typing import Optional
-from database import _db_connection
+import atexit
+import threading
+from typing import Dict, Iterable, Mapping, Optional
+from database import session, change_version, after_commit
+
+# Whole settings table, loaded in one query on first access and kept in sync
+# by set_setting (write-through, on commit). Call invalidate_settings() to force a reload.
+_cache: Optional[Dict[str, str]] = None
+_lock = threading.Lock()
+
+# Write-behind buffer for rapid-fire changes (timer pickers): last value per key
+# wins, and everything is flushed in one transaction after a quiet period.
+FLUSH_DELAY_S = 0.75
+_pending: Dict[str, str] = {}
+_flush_timer: Optional[threading.Timer] = None
+
+def _settings() -> Dict[str, str]:
+    global _cache
+    with _lock:
+        if _cache is None:
+            with session() as cur:
+                cur.execute("SELECT k, v FROM settings")
+                _cache = dict(cur.fetchall())
+        return _cache
+
+def invalidate_settings() -> None:
+    global _cache
+    with _lock:
+        _cache = None
 
 def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("SELECT v FROM settings WHERE k=%s", (key,))
-    row = cur.fetchone()
-    cur.close(); cn.close()
-    return row[0] if row else default
+    return _settings().get(key, default)
+
+def all_settings() -> Dict[str, str]:
+    return dict(_settings())
+
+def get_settings(keys: Iterable[str], defaults: Optional[Mapping[str, str]] = None) -> Dict[str, Optional[str]]:
+    """Return {key: value} for `keys`, falling back to `defaults` (or None)."""
+    values = _settings(); defaults = defaults or {}
+    return {k: values.get(k, defaults.get(k)) for k in keys}
 
 def set_setting(key: str, value: str) -> None:
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("REPLACE INTO settings (k, v) VALUES (%s, %s)", (key, value))
-    cn.commit()
-    cur.close(); cn.close()
+    with session() as cur:
+        cur.execute("REPLACE INTO settings (k, v, row_version) VALUES (%s, %s, %s)",
+                    (key, value, change_version(cur)))
+        after_commit(_written, key, value)  # inside run_batch: only once the batch commits
+
+def _written(key: str, value: str) -> None:
+    with _lock:
+        _pending.pop(key, None)  # an immediate write supersedes a buffered one
+        if _cache is not None:
+            _cache[key] = value
+
+def merge_settings(values: Mapping[str, str]) -> None:
+    """Fold in settings another client wrote (sync_service); unflushed local edits win."""
+    with _lock:
+        if _cache is not None:
+            _cache.update((k, v) for k, v in values.items() if k not in _pending)
+
+def set_setting_deferred(key: str, value: str) -> None:
+    """Buffer a write; readers see it at once, the DB after FLUSH_DELAY_S of quiet."""
+    global _flush_timer
+    with _lock:
+        _pending[key] = value
+        if _cache is not None:
+            _cache[key] = value
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+        _flush_timer = threading.Timer(FLUSH_DELAY_S, _flush_in_background)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+def flush_settings() -> None:
+    """Write all buffered settings as one multi-row REPLACE in a single transaction."""
+    global _flush_timer
+    with _lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel(); _flush_timer = None
+        items = list(_pending.items())
+        _pending.clear()
+    if not items:
+        return
+    try:
+        with session() as cur:
+            # Spelled out as one statement: mysql.connector only batches executemany() for INSERT
+            version = change_version(cur)
+            cur.execute("REPLACE INTO settings (k, v, row_version) VALUES " + ", ".join(["(%s, %s, %s)"] * len(items)),
+                        [x for k, v in items for x in (k, v, version)])
+    except Exception:
+        with _lock:
+            for k, v in items:
+                _pending.setdefault(k, v)  # keep newer values queued meanwhile
+        raise
+
+def _flush_in_background() -> None:
+    try: flush_settings()
+    except Exception as e: print("Settings flush failed:", e)
+
+atexit.register(_flush_in_background)
@@ -0,0 +1,82 @@
+# services/sync_service.py
+# Delta sync between clients sharing one database. Every write stamps the rows
+# it touches with a change version (database.change_version) and deletes leave
+# tombstones, so a client can ask for just what changed since it last looked.
+from datetime import datetime, timedelta
+
+from config import TOMBSTONE_MAX_AGE_DAYS
+from database import session
+from services.task_service import TASK_COLS
+
+# Task rows carry folder_id and created_at too, so a client can place them in its view
+SYNC_TASK_COLS = TASK_COLS + ", folder_id, created_at"
+
+def current_version() -> int:
+    """Latest committed change version; read it before a full load, then poll from it."""
+    with session() as cur:
+        cur.execute("SELECT version FROM sync_state WHERE id = 1")
+        (version,) = cur.fetchone()
+    return version
+
+def _empty(version: int, reset: bool = False) -> dict:
+    return {"version": version, "reset": reset, "folders": [], "tasks": [], "settings": {},
+            "deleted": {"folders": [], "tasks": []}}
+
+def changes_since(version: int) -> dict:
+    """Everything written after `version`:
+
+      version   high-water mark to pass next time
+      reset     True if `version` is ahead of the database (restored / recreated),
+                or older than the tombstones kept (see prune_tombstones): drop
+                the cached view and reload everything
+      folders   [(id, name)]
+      tasks     [SYNC_TASK_COLS rows], oldest first
+      settings  {key: value}
+      deleted   {"folders": [ids], "tasks": [ids]}
+
+    With nothing new this is a single primary-key read. Rows may come back
+    again on the next call; applying a delta twice is harmless. Version 0 is
+    always a full snapshot: a client with nothing cached needs no deletes.
+    """
+    with session() as cur:
+        # Read the counter first: everything <= it has committed (see change_version),
+        # so returning it as the mark can't skip a change, only repeat one.
+        cur.execute("SELECT version, pruned_version FROM sync_state WHERE id = 1")
+        now, pruned = cur.fetchone()
+        if now <= version or 0 < version < pruned:
+            return _empty(now, reset=now != version)
+        out = _empty(now)
+        cur.execute("SELECT id, name FROM folders WHERE row_version > %s ORDER BY name", (version,))
+        out["folders"] = cur.fetchall()
+        cur.execute(f"SELECT {SYNC_TASK_COLS} FROM tasks WHERE row_version > %s ORDER BY created_at, id",
+                    (version,))
+        out["tasks"] = cur.fetchall()
+        cur.execute("SELECT k, v FROM settings WHERE row_version > %s", (version,))
+        out["settings"] = dict(cur.fetchall())
+        cur.execute("SELECT entity, row_id FROM tombstones WHERE row_version > %s", (version,))
+        tombstones = cur.fetchall()
+    # An id deleted and then written again (import with ids) is live, not deleted
+    live = {"folders": {r[0] for r in out["folders"]}, "tasks": {r[0] for r in out["tasks"]}}
+    for entity, row_id in tombstones:
+        if entity in live and row_id not in live[entity]:
+            out["deleted"][entity].append(row_id)
+    return out
+
+def prune_tombstones(max_age_days: int = TOMBSTONE_MAX_AGE_DAYS) -> int:
+    """Forget deletes older than `max_age_days`; returns how many tombstones went.
+
+    Everything up to the newest expired tombstone's version is dropped, and that
+    version is recorded: changes_since() answers reset=True to anyone older.
+    Run at startup (main.py, server.py).
+    """
+    cutoff = datetime.now() - timedelta(days=max_age_days)
+    with session() as cur:
+        cur.execute("SELECT MAX(row_version) FROM tombstones WHERE deleted_at < %s", (cutoff,))
+        (horizon,) = cur.fetchone()
+        if horizon is None:
+            return 0
+        cur.execute("DELETE FROM tombstones WHERE row_version <= %s", (horizon,))
+        pruned = cur.rowcount
+        cur.execute("UPDATE sync_state SET pruned_version = %s WHERE id = 1 AND pruned_version < %s",
+                    (horizon, horizon))
+    return pruned
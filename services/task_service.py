@@ -106,137 +106,320 @@
 
 
 
-from datetime import date, datetime
-from database import _db_connection
+from datetime import date, datetime, timedelta
+import database
+from database import session, upsert_add_sql, change_version, add_tombstones, after_commit
+from models import TaskFilter, TaskTable
+from services.search_service import index_task, unindex_tasks, search, search_db
 
 # ---------- Folders ----------
 def list_folders():
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("SELECT id, name FROM folders ORDER BY name ASC")
-    rows = cur.fetchall()
-    cur.close(); cn.close()
-    return rows  # [(id, name), ...]
+    with session() as cur:
+        cur.execute("SELECT id, name FROM folders ORDER BY name ASC")
+        return cur.fetchall()  # [(id, name), ...]
+
+def inbox_id() -> int | None:
+    with session() as cur:
+        cur.execute("SELECT id FROM folders WHERE name='Inbox' LIMIT 1")
+        row = cur.fetchone()
+    return row[0] if row else None
 
 def create_folder(name: str) -> int:
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("INSERT INTO folders (name) VALUES (%s)", (name,))
-    cn.commit()
-    fid = cur.lastrowid
-    cur.close(); cn.close()
-    return fid
+    with session() as cur:
+        cur.execute("INSERT INTO folders (name, row_version) VALUES (%s, %s)", (name, change_version(cur)))
+        return cur.lastrowid
 
 def rename_folder(folder_id: int, new_name: str):
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("UPDATE folders SET name=%s WHERE id=%s", (new_name, folder_id))
-    cn.commit(); cur.close(); cn.close()
+    with session() as cur:
+        cur.execute("UPDATE folders SET name=%s, row_version=%s WHERE id=%s",
+                    (new_name, change_version(cur), folder_id))
 
 def delete_folder(folder_id: int):
     """Move tasks to Inbox then delete folder."""
-    cn = _db_connection(); cur = cn.cursor()
-    # Get Inbox id
-    cur.execute("SELECT id FROM folders WHERE name='Inbox' LIMIT 1")
-    row = cur.fetchone()
-    inbox_id = row[0] if row else None
-    if inbox_id is None:
-        cur.execute("INSERT INTO folders (name) VALUES ('Inbox')")
-        inbox_id = cur.lastrowid
-    # Reassign tasks
-    cur.execute("UPDATE tasks SET folder_id=%s WHERE folder_id=%s", (inbox_id, folder_id))
-    # Delete folder
-    cur.execute("DELETE FROM folders WHERE id=%s", (folder_id,))
-    cn.commit(); cur.close(); cn.close()
+    with session() as cur:
+        # Get Inbox id
+        cur.execute("SELECT id FROM folders WHERE name='Inbox' LIMIT 1")
+        row = cur.fetchone()
+        inbox_id = row[0] if row else None
+        version = change_version(cur)
+        if inbox_id is None:
+            cur.execute("INSERT INTO folders (name, row_version) VALUES ('Inbox', %s)", (version,))
+            inbox_id = cur.lastrowid
+        # Reassign tasks
+        cur.execute("UPDATE tasks SET folder_id=%s, row_version=%s WHERE folder_id=%s", (inbox_id, version, folder_id))
+        # Delete folder
+        cur.execute("DELETE FROM folders WHERE id=%s", (folder_id,))
+        add_tombstones(cur, "folders", [folder_id])
 
 def move_task_to_folder(task_id: int, folder_id: int | None):
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("UPDATE tasks SET folder_id=%s WHERE id=%s", (folder_id, task_id))
-    cn.commit(); cur.close(); cn.close()
+    _update_many([task_id], "folder_id=%s", (folder_id,))
 
 # ---------- Tasks ----------
 def add_task(title: str, notes=None, due_date=None, priority="Low", folder_id: int | None = None):
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute(
-        "INSERT INTO tasks (title, notes, due_date, priority, folder_id) VALUES (%s,%s,%s,%s,%s)",
-        (title, notes, due_date, priority, folder_id),
-    )
-    cn.commit()
-    tid = cur.lastrowid
-    cur.close(); cn.close()
-    return tid
-
-def list_tasks(include_done=True, folder_id: int | None = None):
-    cn = _db_connection(); cur = cn.cursor()
-    q = ("SELECT id, title, notes, start_date, due_date, priority, progress, is_done "
-         "FROM tasks ")
+    with session() as cur:
+        cur.execute(
+            "INSERT INTO tasks (title, notes, due_date, priority, folder_id, row_version) VALUES (%s,%s,%s,%s,%s,%s)",
+            (title, notes, due_date, priority, folder_id, change_version(cur)),
+        )
+        task_id = cur.lastrowid
+        after_commit(index_task, task_id, title, notes)
+    return task_id
+
+TASK_COLS = "id, title, notes, start_date, due_date, priority, progress, is_done"
+
+def _task_conditions(include_done, folder_id, filters: TaskFilter | None = None):
+    """WHERE terms for the task listing (matches the ix_tasks_* indexes)."""
     conds = []
     params = []
-    if not include_done:
-        conds.append("is_done=0")
     if folder_id is not None:
         conds.append("folder_id=%s"); params.append(folder_id)
+    f = filters or TaskFilter()
+    if f.done is not None:
+        conds.append("is_done=%s"); params.append(1 if f.done else 0)
+    elif not include_done:
+        conds.append("is_done=0")
+    if f.due_from is not None:
+        conds.append("due_date >= %s"); params.append(f.due_from)
+    if f.due_to is not None:
+        conds.append("due_date <= %s"); params.append(f.due_to)
+    if f.due_before is not None:
+        conds.append("due_date < %s"); params.append(f.due_before)
+    if f.progress:
+        conds.append("progress=%s"); params.append(f.progress)
+    if f.priority:
+        conds.append("priority=%s"); params.append(f.priority)
+    return conds, params
+
+def get_task(task_id: int, folder_id: int | None = None, filters: TaskFilter | None = None):
+    """One task in the list_tasks() row shape, or None if it doesn't match."""
+    conds, params = _task_conditions(True, folder_id, filters)
+    q = f"SELECT {TASK_COLS} FROM tasks WHERE " + " AND ".join(["id=%s"] + conds)
+    with session() as cur:
+        cur.execute(q, tuple([task_id] + params))
+        return cur.fetchone()
+
+def list_tasks(include_done=True, folder_id: int | None = None, filters: TaskFilter | None = None,
+               as_table: bool = False):
+    """Task rows (TASK_COLS tuples), newest first; as_table=True returns a columnar TaskTable."""
+    q = f"SELECT {TASK_COLS} FROM tasks "
+    conds, params = _task_conditions(include_done, folder_id, filters)
+    if conds:
+        q += "WHERE " + " AND ".join(conds) + " "
+    q += "ORDER BY created_at DESC, id DESC"
+    with session() as cur:
+        cur.execute(q, tuple(params))
+        if not as_table:
+            return cur.fetchall()
+        table = TaskTable()
+        while True:
+            rows = cur.fetchmany(5000)
+            if not rows:
+                return table
+            table.extend(rows)
+
+def list_tasks_page(include_done=True, folder_id: int | None = None, filters: TaskFilter | None = None,
+                    after=None, limit: int = 200):
+    """One page of list_tasks(), newest first, using a (created_at, id) keyset.
+
+    Returns (rows, cursor). Pass cursor back as `after` for the next page;
+    it is None once there are no more rows.
+    """
+    q = f"SELECT {TASK_COLS}, created_at FROM tasks "
+    conds, params = _task_conditions(include_done, folder_id, filters)
+    if after is not None:
+        created_at, last_id = after
+        conds.append("(created_at < %s OR (created_at = %s AND id < %s))")
+        params += [created_at, created_at, last_id]
     if conds:
         q += "WHERE " + " AND ".join(conds) + " "
-    q += "ORDER BY created_at DESC"
-    cur.execute(q, tuple(params))
+    q += "ORDER BY created_at DESC, id DESC LIMIT %s"
+    params.append(int(limit))
+    with session() as cur:
+        cur.execute(q, tuple(params))
+        raw = cur.fetchall()
+    cursor = (raw[-1][-1], raw[-1][0]) if len(raw) == limit else None
+    return [r[:-1] for r in raw], cursor
+
+def list_tasks_by_ids(ids, include_done=True, folder_id: int | None = None, filters: TaskFilter | None = None):
+    """list_tasks() rows for `ids` that pass the filters, in the order of `ids` (search results)."""
+    conds, params = _task_conditions(include_done, folder_id, filters)
+    rows = {}
+    with session() as cur:
+        for chunk in _chunks(ids):
+            cur.execute(f"SELECT {TASK_COLS} FROM tasks WHERE " + " AND ".join([f"id IN {_in(chunk)}"] + conds),
+                        tuple(chunk + params))
+            rows.update((r[0], r) for r in cur.fetchall())
+    return [rows[i] for i in dict.fromkeys(int(i) for i in ids) if i in rows]
+
+def search_tasks(query: str, limit: int = 200, include_done=True, folder_id: int | None = None,
+                 filters: TaskFilter | None = None, in_db: bool = False):
+    """Best `limit` matches for `query` among the tasks list_tasks() would return.
+
+    Ranked ids are checked against the folder / filters IN_CHUNK at a time
+    until the page is full, so a prefix common across a large database still
+    fills the current folder's page. in_db=True ranks with search_db()
+    (one-shot callers) instead of the in-memory index.
+    """
+    ids = search_db(query, None) if in_db else search(query, None)
+    rows = []
+    for i in range(0, len(ids), IN_CHUNK):
+        rows += list_tasks_by_ids(ids[i:i + IN_CHUNK], include_done, folder_id, filters)
+        if len(rows) >= limit:
+            break
+    return rows[:limit]
+
+def _bump_done_count(cur, day: date, delta: int):
+    cur.execute(upsert_add_sql("daily_stats", ["day"], ["done_count"]), (day, delta))
+
+def _uncount_done(cur, ids: list[int]) -> int:
+    """Take completions back out of daily_stats (before undo/delete); returns rows found."""
+    lock = " FOR UPDATE" if database.BACKEND == "mysql" else ""
+    cur.execute(f"SELECT is_done, completed_at FROM tasks WHERE id IN {_in(ids)}{lock}", tuple(ids))
     rows = cur.fetchall()
-    cur.close(); cn.close()
-    return rows
+    per_day = {}
+    for is_done, completed_at in rows:
+        if is_done and completed_at:
+            per_day[completed_at.date()] = per_day.get(completed_at.date(), 0) + 1
+    for day, n in per_day.items():
+        _bump_done_count(cur, day, -n)
+    return len(rows)
 
 def toggle_done(task_id: int, done: bool):
-    cn = _db_connection(); cur = cn.cursor()
-    if done:
-        cur.execute("UPDATE tasks SET is_done=1, completed_at=NOW() WHERE id=%s", (task_id,))
-    else:
-        cur.execute("UPDATE tasks SET is_done=0, completed_at=NULL WHERE id=%s", (task_id,))
-    cn.commit(); cur.close(); cn.close()
+    toggle_done_many([task_id], done)
 
 def delete_task(task_id: int):
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("DELETE FROM tasks WHERE id=%s", (task_id,))
-    cn.commit(); cur.close(); cn.close()
+    delete_task_many([task_id])
 
 def update_priority(task_id: int, level: str):
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("UPDATE tasks SET priority=%s WHERE id=%s", (level, task_id))
-    cn.commit(); cur.close(); cn.close()
+    _update_many([task_id], "priority=%s", (level,))
 
 def set_progress(task_id: int, state: str):
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("UPDATE tasks SET progress=%s WHERE id=%s", (state, task_id))
-    cn.commit(); cur.close(); cn.close()
+    _update_many([task_id], "progress=%s", (state,))
 
 def rename_task(task_id: int, new_title: str):
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("UPDATE tasks SET title=%s WHERE id=%s", (new_title, task_id))
-    cn.commit(); cur.close(); cn.close()
+    with session():
+        _update_many([task_id], "title=%s", (new_title,))
+        after_commit(index_task, task_id, new_title)
 
 def set_start_date(task_id: int, dt):
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("UPDATE tasks SET start_date=%s WHERE id=%s", (dt, task_id))
-    cn.commit(); cur.close(); cn.close()
+    _update_many([task_id], "start_date=%s", (dt,))
 
 def set_due_date(task_id: int, dt):
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("UPDATE tasks SET due_date=%s WHERE id=%s", (dt, task_id))
-    cn.commit(); cur.close(); cn.close()
+    _update_many([task_id], "due_date=%s", (dt,))
+
+# ---------- Bulk (multi-select) ----------
+# Each runs `WHERE id IN (...)` in chunks of IN_CHUNK ids, all in one transaction,
+# and stamps the rows with the transaction's change version (sync_service).
+# Updates return how many of the ids exist.
+IN_CHUNK = 500
+
+def _chunks(ids):
+    ids = list(dict.fromkeys(int(i) for i in ids))  # de-dupe, keep order
+    for i in range(0, len(ids), IN_CHUNK):
+        yield ids[i:i + IN_CHUNK]
+
+def _in(ids) -> str:
+    return "(" + ",".join(["%s"] * len(ids)) + ")"
+
+def _update_many(ids, assignment: str, params: tuple) -> int:
+    found = 0
+    with session() as cur:
+        params += (change_version(cur),)
+        for chunk in _chunks(ids):
+            cur.execute(f"UPDATE tasks SET {assignment}, row_version=%s WHERE id IN {_in(chunk)}", params + tuple(chunk))
+            found += cur.rowcount  # every matched row changes: row_version is new
+    return found
+
+def toggle_done_many(ids, done: bool) -> int:
+    now = datetime.now()
+    total = 0
+    with session() as cur:
+        version = change_version(cur)
+        for chunk in _chunks(ids):
+            found = _uncount_done(cur, chunk)
+            total += found
+            if done:
+                cur.execute(f"UPDATE tasks SET is_done=1, completed_at=%s, row_version=%s WHERE id IN {_in(chunk)}",
+                            (now, version) + tuple(chunk))
+                if found: _bump_done_count(cur, now.date(), found)
+            else:
+                cur.execute(f"UPDATE tasks SET is_done=0, completed_at=NULL, row_version=%s WHERE id IN {_in(chunk)}",
+                            (version,) + tuple(chunk))
+    return total
+
+def delete_task_many(ids):
+    with session() as cur:
+        for chunk in _chunks(ids):
+            _uncount_done(cur, chunk)
+            cur.execute(f"DELETE FROM daily_task_focus WHERE task_id IN {_in(chunk)}", tuple(chunk))
+            cur.execute(f"DELETE FROM tasks WHERE id IN {_in(chunk)}", tuple(chunk))
+            add_tombstones(cur, "tasks", chunk)
+        after_commit(unindex_tasks, ids)
+
+def update_priority_many(ids, level: str) -> int:
+    return _update_many(ids, "priority=%s", (level,))
+
+def set_progress_many(ids, state: str) -> int:
+    return _update_many(ids, "progress=%s", (state,))
+
+def set_start_date_many(ids, dt) -> int:
+    return _update_many(ids, "start_date=%s", (dt,))
+
+def set_due_date_many(ids, dt) -> int:
+    return _update_many(ids, "due_date=%s", (dt,))
+
+def move_task_to_folder_many(ids, folder_id: int | None) -> int:
+    return _update_many(ids, "folder_id=%s", (folder_id,))
 
 # ---------- Stats / Sessions ----------
+def get_daily_stats(start: date, end: date):
+    """[(day, done_count, focus_minutes), ...] for start..end inclusive, days with activity only."""
+    with session() as cur:
+        cur.execute(
+            "SELECT day, done_count, focus_minutes FROM daily_stats "
+            "WHERE day >= %s AND day <= %s ORDER BY day",
+            (start, end),
+        )
+        return cur.fetchall()
+
 def get_mini_stats():
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute("SELECT COUNT(*) FROM tasks WHERE is_done=1 AND DATE(completed_at)=CURDATE()")
-    (done_today,) = cur.fetchone()
-    cur.execute("""
-        SELECT COALESCE(SUM(duration_minutes), 0)
-        FROM focus_sessions
-        WHERE YEARWEEK(started_at, 1) = YEARWEEK(CURDATE(), 1)
-    """)
-    (week_minutes,) = cur.fetchone()
-    cur.close(); cn.close()
+    """(done today, focus minutes this ISO week), summed from at most 7 rollup rows."""
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())  # ISO week (Monday)
+    rows = get_daily_stats(week_start, week_start + timedelta(days=6))
+    done_today = sum(done for (day, done, _m) in rows if day == today)
+    week_minutes = sum(minutes for (_d, _c, minutes) in rows)
     return int(done_today or 0), int(week_minutes or 0)
 
+def rebuild_daily_stats():
+    """Backfill the daily_stats rollup from raw tasks / focus_sessions."""
+    with session() as cur:
+        database.rebuild_daily_stats(cur)
+
+def list_focus_sessions(since: datetime | None = None, task_id: int | None = None, limit: int = 500):
+    """Focus session rows (id, task_id, started_at, ended_at, duration_minutes), newest first."""
+    conds, params = [], []
+    if since is not None:
+        conds.append("started_at >= %s"); params.append(since)
+    if task_id is not None:
+        conds.append("task_id=%s"); params.append(task_id)
+    q = "SELECT id, task_id, started_at, ended_at, duration_minutes FROM focus_sessions "
+    if conds:
+        q += "WHERE " + " AND ".join(conds) + " "
+    q += "ORDER BY started_at DESC, id DESC LIMIT %s"
+    params.append(int(limit))
+    with session() as cur:
+        cur.execute(q, tuple(params))
+        return cur.fetchall()
+
 def log_focus_session(task_id: int | None, started_at: datetime, ended_at: datetime, duration_minutes: int):
-    cn = _db_connection(); cur = cn.cursor()
-    cur.execute(
-        "INSERT INTO focus_sessions (task_id, started_at, ended_at, duration_minutes) VALUES (%s,%s,%s,%s)",
-        (task_id, started_at, ended_at, int(duration_minutes))
-    )
-    cn.commit(); cur.close(); cn.close()
+    with session() as cur:
+        cur.execute(
+            "INSERT INTO focus_sessions (task_id, started_at, ended_at, duration_minutes) VALUES (%s,%s,%s,%s)",
+            (task_id, started_at, ended_at, int(duration_minutes))
+        )
+        day = started_at.date()
+        cur.execute(upsert_add_sql("daily_stats", ["day"], ["focus_minutes"]), (day, int(duration_minutes)))
+        if task_id is not None:
+            cur.execute(upsert_add_sql("daily_task_focus", ["day", "task_id"], ["minutes"]),
+                        (day, task_id, int(duration_minutes)))
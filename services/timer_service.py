@@ -0,0 +1,147 @@
+# services/timer_service.py
+# UI-independent Pomodoro engine. Time is kept as a deadline on a monotonic
+# clock, so a busy event loop or a suspended machine never makes it drift;
+# callers just poll snapshot() as often as they want to redraw.
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+WORK, BREAK = "work", "break"
+IDLE, RUNNING, PAUSED = "idle", "running", "paused"
+
+@dataclass(frozen=True)
+class TimerState:
+    mode: str          # work / break
+    status: str        # idle / running / paused
+    remaining_s: int   # whole seconds left, rounded up (shows 25:00 at the start, 00:00 at the end)
+    total_s: int
+    cycles: int        # work phases completed so far
+
+    @property
+    def running(self) -> bool:
+        return self.status == RUNNING
+
+    @property
+    def fraction_done(self) -> float:
+        return 1 - self.remaining_s / self.total_s if self.total_s > 0 else 0.0
+
+@dataclass(frozen=True)
+class CompletedPhase:
+    mode: str
+    started_at: datetime  # wall clock, for logging
+    ended_at: datetime
+    active_s: float       # time actually spent running (pauses excluded)
+
+class PomodoroTimer:
+    """Work/break countdown with pause/resume and optional auto-start.
+
+    Nothing here runs on its own: call tick() periodically to pick up a finished
+    phase, and snapshot() to draw. `clock` (monotonic seconds) and `wall_clock`
+    can be swapped out for tests.
+    """
+    def __init__(self, work_s: int = 25 * 60, break_s: int = 5 * 60, mode: str = WORK,
+                 auto_start_break: bool = False, auto_start_work: bool = False,
+                 clock: Callable[[], float] = time.monotonic,
+                 wall_clock: Callable[[], datetime] = datetime.now):
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._durations = {WORK: max(int(work_s), 0), BREAK: max(int(break_s), 0)}
+        self.auto_start_break = auto_start_break
+        self.auto_start_work = auto_start_work
+        self.cycles = 0
+        self._mode = mode if mode in self._durations else WORK
+        self._reset_phase()
+
+    def _reset_phase(self):
+        self._status = IDLE
+        self._total = self._durations[self._mode]
+        self._left = float(self._total)     # seconds left while idle / paused
+        self._deadline: Optional[float] = None
+        self._run_from: Optional[float] = None
+        self._active = 0.0                  # running seconds banked before the last pause
+        self._started_at: Optional[datetime] = None
+
+    # ---------- Control ----------
+    def set_durations(self, work_s: int, break_s: int):
+        """New lengths apply to idle phases now and to running ones from the next phase."""
+        self._durations = {WORK: max(int(work_s), 0), BREAK: max(int(break_s), 0)}
+        if self._status == IDLE:
+            self._reset_phase()
+
+    def set_mode(self, mode: str):
+        """Switch phase; a paused countdown is kept, anything else restarts at full length."""
+        if mode not in self._durations:
+            raise ValueError(f"Unknown timer mode {mode!r}")
+        if self._status == PAUSED:
+            self._mode = mode; return
+        running = self._status == RUNNING
+        self._mode = mode
+        self._reset_phase()
+        if running:
+            self.start()
+
+    def start(self, at: Optional[float] = None):
+        """Start from idle or resume from pause. `at` backdates the start (phase chaining)."""
+        now = self._clock() if at is None else at
+        if self._status == RUNNING:
+            return
+        if self._status == IDLE:
+            if self._total <= 0:
+                return
+            self._started_at = self._wall_clock() - timedelta(seconds=self._clock() - now)
+        self._status = RUNNING
+        self._run_from = now
+        self._deadline = now + self._left
+
+    def pause(self):
+        if self._status != RUNNING:
+            return
+        now = self._clock()
+        self._left = max(self._deadline - now, 0.0)
+        self._active += now - self._run_from
+        self._status = PAUSED
+        self._deadline = self._run_from = None
+
+    def reset(self):
+        self._reset_phase()
+
+    # ---------- Polling ----------
+    def tick(self) -> Optional[CompletedPhase]:
+        """Finish the current phase if its deadline has passed; returns it if so.
+
+        The next phase is queued (and started, if its auto-start flag is set) as
+        of the old deadline, so late polling doesn't shorten or stretch it.
+        """
+        if self._status != RUNNING:
+            return None
+        now = self._clock()
+        if now < self._deadline:
+            return None
+        deadline = self._deadline
+        done = CompletedPhase(
+            mode=self._mode,
+            started_at=self._started_at,
+            ended_at=self._wall_clock() - timedelta(seconds=now - deadline),
+            active_s=self._active + (deadline - self._run_from),
+        )
+        if self._mode == WORK:
+            self.cycles += 1
+        self._mode = BREAK if self._mode == WORK else WORK
+        self._reset_phase()
+        auto = self.auto_start_break if self._mode == BREAK else self.auto_start_work
+        # If the gap is longer than the whole next phase (machine asleep), start it fresh
+        if auto and now - deadline < self._total:
+            self.start(at=deadline)
+        elif auto:
+            self.start()
+        return done
+
+    def snapshot(self) -> TimerState:
+        if self._status == RUNNING:
+            left = max(self._deadline - self._clock(), 0.0)
+        else:
+            left = self._left
+        # The epsilon keeps float noise (1500.0000001) from showing as an extra second
+        return TimerState(self._mode, self._status, math.ceil(left - 1e-6), self._total, self.cycles)
@@ -0,0 +1,26 @@
+# Tests run on the embedded SQLite backend, so they need no MySQL server.
+# The environment is set here, before anything imports config.
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="focusflow-tests-")
+os.environ["FOCUSFLOW_BACKEND"] = "sqlite"
+os.environ["FOCUSFLOW_SQLITE_PATH"] = os.path.join(_TMP, "focusflow.db")
+os.environ["FOCUSFLOW_SLOW_QUERY_LOG"] = os.path.join(_TMP, "slow_queries.log")
+
+import pytest
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, fully migrated SQLite database; in-process caches start cold."""
+    import database
+    from services import search_service, settings_service
+    database.close_pool()
+    monkeypatch.setattr(database, "SQLITE_PATH", str(tmp_path / "focusflow.db"))
+    settings_service.invalidate_settings()
+    search_service.drop_index()
+    database.init_db()
+    yield database
+    database.close_pool()
+    settings_service.invalidate_settings()
+    search_service.drop_index()
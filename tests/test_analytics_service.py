@@ -0,0 +1,50 @@
+from datetime import date, datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.analytics_service import compute_analytics, day_number
+
+SESSIONS = [  # started, minutes, task, folder (-1 = none)
+    (datetime(2026, 1, 2, 8, 0), 10, -1, -1),   # Friday
+    (datetime(2026, 1, 5, 9, 0), 30, 1, 1),     # Monday
+    (datetime(2026, 1, 5, 9, 30), 20, 2, 1),
+    (datetime(2026, 1, 6, 14, 10), 25, 1, 1),   # Tuesday
+]
+
+def _cols(sessions=SESSIONS):
+    started, minutes, tasks, folders = zip(*sessions)
+    return {
+        "start_min": np.array(started, dtype="datetime64[m]").astype(np.int64),
+        "minutes": np.array(minutes, dtype=np.int64),
+        "task_id": np.array(tasks, dtype=np.int64),
+        "folder_id": np.array(folders, dtype=np.int64),
+    }
+
+def test_heatmap_daily_and_totals():
+    a = compute_analytics(_cols(), day_number(date(2026, 1, 7)))
+    heat = a["heatmap"]
+    assert heat[0][9] == 50 and heat[1][14] == 25 and heat[4][8] == 10
+    assert sum(map(sum, heat)) == a["total_minutes"] == 85
+    assert a["daily"] == {"start": day_number(date(2026, 1, 2)), "minutes": [10, 0, 0, 50, 25, 0]}
+    assert a["per_task"] == {1: 55, 2: 20} and a["per_folder"] == {1: 75}
+
+def test_rolling_average_averages_what_exists_at_the_start():
+    a = compute_analytics(_cols(), day_number(date(2026, 1, 7)), window=3)
+    assert a["rolling_avg"] == [10.0, 5.0, 3.3, 16.7, 25.0, 25.0]
+
+def test_streak_through_yesterday_still_counts():
+    a = compute_analytics(_cols(), day_number(date(2026, 1, 7)))
+    assert (a["longest_streak"], a["current_streak"]) == (2, 2)
+    a = compute_analytics(_cols(), day_number(date(2026, 1, 8)))
+    assert (a["longest_streak"], a["current_streak"]) == (2, 0)
+
+def test_sessions_after_today_do_not_wrap_into_streaks():
+    a = compute_analytics(_cols(), day_number(date(2025, 12, 28)))
+    assert (a["longest_streak"], a["current_streak"]) == (0, 0)
+
+def test_no_sessions():
+    empty = {k: np.array([], dtype=np.int64) for k in ("start_min", "minutes", "task_id", "folder_id")}
+    a = compute_analytics(empty, day_number(date(2026, 1, 7)))
+    assert a["total_minutes"] == 0 and a["current_streak"] == 0 and a["daily"]["minutes"] == []
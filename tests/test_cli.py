@@ -0,0 +1,37 @@
+import io
+
+import cli
+from services import task_service as ts
+
+def _inbox():
+    return next(fid for fid, name in ts.list_folders() if name == "Inbox")
+
+def test_add_defaults_to_inbox(db, capsys):
+    assert cli.main(["add", "Write report"]) == 0
+    tid = int(capsys.readouterr().out)
+    assert [r[0] for r in ts.list_tasks(folder_id=_inbox())] == [tid]
+
+def test_done_with_unknown_id_fails_and_changes_nothing(db, capsys):
+    tid = ts.add_task("a", folder_id=_inbox())
+    assert cli.main(["done", str(tid), "99999"]) == 2
+    assert "no task 99999" in capsys.readouterr().err
+    assert not ts.get_task(tid)[7]
+    assert cli.main(["done", str(tid)]) == 0 and ts.get_task(tid)[7]
+
+def test_move_with_unknown_id_fails(db, capsys):
+    assert cli.main(["move", "99999", "Inbox"]) == 2
+    assert "no task 99999" in capsys.readouterr().err
+
+def test_batch_is_all_or_nothing(db, monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", io.StringIO('add "one"\ndone 99999\n'))
+    assert cli.main(["batch"]) == 2
+    assert ts.list_tasks() == []
+
+def test_list_sort_and_limit(db, capsys):
+    for title, due in [("a", "2026-01-09"), ("b", None), ("c", "2026-01-02")]:
+        cli.main(["add", title] + (["--due", due] if due else []))
+    capsys.readouterr()
+    assert cli.main(["list", "--sort", "due", "--limit", "2"]) == 0
+    assert [line.split("\t")[-1] for line in capsys.readouterr().out.splitlines()] == ["c", "a"]
+    assert cli.main(["list", "--sort", "title", "--desc"]) == 0
+    assert [line.split("\t")[-1] for line in capsys.readouterr().out.splitlines()] == ["c", "b", "a"]
@@ -0,0 +1,101 @@
+import json
+from datetime import date
+
+import pytest
+
+import database
+
+def test_slow_query_log_accepts_bare_filename(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "SLOW_QUERY_LOG", "slow.log")
+    database._log_slow("SELECT * FROM tasks WHERE id = ?", "task_service.get_task", 0.25, 1)
+    (entry,) = [json.loads(line) for line in (tmp_path / "slow.log").read_text().splitlines()]
+    assert entry["ms"] == 250.0 and entry["func"] == "task_service.get_task"
+
+def test_slow_query_log_creates_missing_folder(tmp_path, monkeypatch):
+    path = tmp_path / "logs" / "slow.log"
+    monkeypatch.setattr(database, "SLOW_QUERY_LOG", str(path))
+    database._log_slow("SELECT 1", "x", 0.3, 0)
+    assert path.exists()
+
+# ---------- SQLite backend ----------
+def test_fresh_database_is_fully_migrated(db):
+    assert db.schema_version() == db.LATEST_VERSION
+    with db.session() as cur:
+        cur.execute("SELECT name FROM folders")
+        assert cur.fetchall() == [("Inbox",)]
+        cur.execute("SELECT version, pruned_version FROM sync_state WHERE id = 1")
+        assert cur.fetchone() == (1, 0)
+
+def test_migrations_are_safe_to_replay(db):
+    with db.session() as cur:
+        cur.execute("DELETE FROM schema_version")
+    assert db.schema_version() == 0
+    db.migrate()
+    assert db.schema_version() == db.LATEST_VERSION
+    with db.session() as cur:
+        cur.execute("SELECT COUNT(*) FROM folders WHERE name = 'Inbox'")
+        assert cur.fetchone() == (1,)
+
+def test_placeholders_are_rewritten_for_sqlite(db):
+    with db.session() as cur:
+        cur.execute("SELECT %s + %s, %s", (1, 2, "x"))
+        assert cur.fetchone() == (3, "x")
+        cur.executemany("INSERT INTO folders (name) VALUES (%s)", [("A",), ("B",)])
+        cur.execute("SELECT COUNT(*) FROM folders WHERE name IN (%s, %s)", ("A", "B"))
+        assert cur.fetchone() == (2,)
+
+def test_upsert_add_sql_adds_onto_existing_row(db):
+    day = date(2026, 1, 5)
+    q = db.upsert_add_sql("daily_stats", ["day"], ["done_count", "focus_minutes"])
+    with db.session() as cur:
+        cur.execute(q, (day, 1, 25))
+        cur.execute(q, (day, 2, 5))
+        cur.execute("SELECT day, done_count, focus_minutes FROM daily_stats")
+        assert cur.fetchall() == [(day, 3, 30)]
+
+def test_insert_ignore_sql_skips_key_clashes(db):
+    with db.session() as cur:
+        cur.execute(db.insert_ignore_sql("folders", ["name"]), ("Inbox",))
+        cur.execute("SELECT COUNT(*) FROM folders")
+        assert cur.fetchone() == (1,)
+
+def test_session_rolls_back_on_error(db):
+    with pytest.raises(RuntimeError):
+        with db.session() as cur:
+            cur.execute("INSERT INTO folders (name) VALUES (%s)", ("Gone",))
+            raise RuntimeError("boom")
+    with db.session() as cur:
+        cur.execute("SELECT COUNT(*) FROM folders WHERE name = 'Gone'")
+        assert cur.fetchone() == (0,)
+
+def test_run_batch_is_one_transaction(db):
+    def add(name):
+        with db.session() as cur:
+            cur.execute("INSERT INTO folders (name) VALUES (%s)", (name,))
+    def fail():
+        raise ValueError("bad line")
+    with pytest.raises(ValueError):
+        db.run_batch([(add, ("A",)), (fail, ())])
+    assert db.run_batch([(add, ("B",)), (add, ("C",))]) == [None, None]
+    with db.session() as cur:
+        cur.execute("SELECT name FROM folders WHERE name != 'Inbox' ORDER BY name")
+        assert cur.fetchall() == [("B",), ("C",)]
+
+def test_after_commit_waits_for_the_outer_commit(db):
+    seen = []
+    def write(tag):
+        with db.session():
+            db.after_commit(seen.append, tag)
+    db.after_commit(seen.append, "no session")
+    with pytest.raises(ValueError):
+        db.run_batch([(write, ("rolled back",)), (lambda: int("x"), ())])
+    db.run_batch([(write, ("a",)), (write, ("b",))])
+    assert seen == ["no session", "a", "b"]
+
+def test_integrity_errors_are_recognised(db):
+    import sqlite3
+    with pytest.raises(sqlite3.IntegrityError) as e:
+        with db.session() as cur:
+            cur.execute("INSERT INTO folders (name) VALUES (%s)", ("Inbox",))
+    assert db.is_integrity_error(e.value) and not db.is_transient(e.value)
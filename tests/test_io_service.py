@@ -0,0 +1,24 @@
+from datetime import date
+
+import pytest
+
+from database import session
+from services import io_service
+from services import task_service as ts
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_export_import_round_trip(db, tmp_path, fmt):
+    tid = ts.add_task("Write report", notes="a, \"b\"", priority="High", folder_id=ts.inbox_id())
+    ts.set_start_date(tid, date(2026, 1, 5)); ts.set_due_date(tid, date(2026, 1, 9))
+    before = ts.list_tasks()
+    assert io_service.export_all(str(tmp_path), fmt)["tasks"] == 1
+    with session() as cur:
+        cur.execute("DELETE FROM tasks")
+    assert io_service.import_table("tasks", str(tmp_path / f"tasks.{fmt}")) == 1
+    assert ts.list_tasks() == before
+
+def test_export_releases_its_session(db, tmp_path):
+    for title in "abc":
+        ts.add_task(title, folder_id=ts.inbox_id())
+    assert io_service.export_table("tasks", str(tmp_path / "t.jsonl")) == 3
+    assert getattr(db._local, "cur", None) is None
@@ -0,0 +1,49 @@
+from datetime import date
+
+import pytest
+
+from models import TaskFilter, TaskTable
+
+def test_task_table_round_trips_rows():
+    rows = [
+        (1, "Write report", "draft", date(2026, 1, 5), date(2026, 1, 9), "High", "In progress", 1),
+        (2, "Groceries", None, None, None, None, None, 0),  # NULL priority / progress
+    ]
+    table = TaskTable.from_rows(rows)
+    assert len(table) == 2
+    assert list(table.rows()) == [r[:7] + (bool(r[7]),) for r in rows]
+    assert table.row(0)[7] is True and table.row(1)[7] is False
+    assert table.task(1).priority is None
+
+def _table():
+    return TaskTable.from_rows([
+        (1, "b", None, None, date(2026, 1, 9), "High", "In progress", 0),
+        (2, "a", None, None, None, "Low", "Not started", 0),
+        (3, "c", None, None, date(2026, 1, 2), "High", "Completed", 1),
+        (4, "d", None, None, date(2026, 1, 5), "Medium", "In progress", 0),
+    ])
+
+@pytest.mark.parametrize("flt", [
+    TaskFilter(),
+    TaskFilter.from_mode("overdue", today=date(2026, 1, 6)),
+    TaskFilter.from_mode("week", today=date(2026, 1, 6)),
+    TaskFilter.from_mode("done"),
+    TaskFilter.from_mode("p_in", "High"),
+    TaskFilter(due_to=date(2026, 1, 5)),
+])
+def test_where_agrees_with_matches(flt):
+    table = _table()
+    assert list(table.where(flt).ids) == [t.id for t in table if flt.matches(t)]
+
+def test_order_by_puts_undated_last_both_ways():
+    table = _table()
+    assert list(table.order_by("due").ids) == [3, 4, 1, 2]
+    assert list(table.order_by("due", descending=True).ids) == [1, 4, 3, 2]
+    assert list(table.order_by("titles").ids) == [2, 1, 3, 4]
+    assert list(table.order_by("priority", descending=True).ids) == [1, 3, 4, 2]  # stable within High
+
+def test_take_keeps_every_column():
+    table = _table()
+    assert list(table.take([]).rows()) == []
+    assert list(table.take([2]).rows()) == [table.row(2)]
+    assert list(table.take([3, 0]).rows()) == [table.row(3), table.row(0)]
@@ -0,0 +1,74 @@
+import pytest
+
+from database import run_batch
+from services import search_service as search
+from services import task_service as ts
+from services.search_service import TaskIndex
+
+def test_index_matches_every_word_as_a_prefix():
+    index = TaskIndex()
+    index.add(1, "Write quarterly report", "for Anna")
+    index.add(2, "Repaint the fence", None)
+    index.add(3, "Paint samples", "quarterly budget")
+    assert [tid for tid, _ in index.search("quart rep")] == [1]
+    assert [tid for tid, _ in index.search("paint")] == [3]         # not "Repaint"
+    assert [tid for tid, _ in index.search("QUARTERLY")] == [1, 3]  # title hit outranks notes
+    assert index.search("  ") == []
+
+def test_index_ranks_whole_words_first_then_newest():
+    index = TaskIndex()
+    index.add(1, "plan", None)
+    index.add(2, "planning", None)
+    index.add(3, "planet", None)
+    assert [tid for tid, _ in index.search("plan")] == [1, 3, 2]
+    assert [tid for tid, _ in index.search("plan", limit=2)] == [1, 3]
+
+def test_index_remove_and_readd():
+    index = TaskIndex()
+    index.add(1, "alpha", "beta")
+    index.add(1, "gamma", None)  # re-adding replaces the old text
+    assert index.search("alpha") == [] and index.search("beta") == []
+    index.remove(1)
+    assert index.search("gamma") == [] and len(index) == 0
+
+def test_service_writes_keep_the_shared_index_current(db):
+    search.get_index()
+    tid = ts.add_task("alpha", "notes here")
+    assert search.search("alpha") == [tid]
+    ts.rename_task(tid, "omega")
+    assert search.search("alpha") == [] and search.search("omega") == [tid]
+    assert search.search("notes") == [tid]  # rename keeps the notes
+    ts.delete_task(tid)
+    assert search.search("omega") == []
+
+def test_rolled_back_writes_leave_the_index_alone(db):
+    search.get_index()
+    tid = ts.add_task("alpha")
+    def fail():
+        raise ValueError("boom")
+    with pytest.raises(ValueError):
+        run_batch([(ts.rename_task, (tid, "omega")), (ts.delete_task, (tid,)), (fail, ())])
+    assert search.search("alpha") == [tid] and search.search("omega") == []
+
+def test_unbuilt_index_ignores_hooks_and_builds_from_db(db):
+    tid = ts.add_task("alpha")
+    search.index_task(999, "ghost")
+    search.unindex_tasks([tid])
+    assert search.search("alpha") == [tid] and search.search("ghost") == []
+
+def test_search_db_agrees_with_the_index(db):
+    rows = [("Write quarterly report", "for Anna"), ("Repaint the fence", None), ("Paint samples", "quarterly budget")]
+    ids = [ts.add_task(title, notes) for title, notes in rows]
+    for query in ("paint", "quart", "quarterly rep", "ann", "nothing", "fence re"):
+        assert search.search_db(query) == search.search(query), query
+    assert search.search_db("paint") == [ids[2]]
+
+def test_search_tasks_fills_the_page_for_the_folder(db):
+    work = ts.create_folder("Work")
+    mine = [ts.add_task(f"alpha {i}", folder_id=work) for i in range(3)]
+    for i in range(20):
+        ts.add_task(f"alpha other {i}")  # newer, so ranked first
+    got = ts.search_tasks("alpha", limit=5, folder_id=work)
+    assert sorted(r[0] for r in got) == mine
+    assert [r[0] for r in ts.search_tasks("alpha", limit=5, folder_id=work, in_db=True)] == [r[0] for r in got]
+    assert len(ts.search_tasks("alpha", limit=5)) == 5
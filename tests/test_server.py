@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import pytest
+
+import server
+from server import JSON_TYPE, ApiServer
+from services import task_service as ts
+
+async def _call(api, method, target, body=None):
+    raw = json.dumps(body).encode() if body is not None else b""
+    status, ctype, out = await api._respond(method, target, raw)
+    return status, json.loads(out) if ctype == JSON_TYPE and out else out
+
+def _run(*requests):
+    """Answer requests in order on one ApiServer; returns [(status, body), ...]."""
+    async def go():
+        api = ApiServer(workers=2)
+        try:
+            return [await _call(api, *r) for r in requests]
+        finally:
+            api.close()
+    return asyncio.run(go())
+
+def _task(**fields):
+    return _run(("POST", "/tasks", {"title": "t", **fields}))[0][1]["id"]
+
+@pytest.mark.parametrize("body", [
+    {"done": "false"}, {"done": 0}, {"done": None},
+    {"priority": None}, {"priority": "Urgent"},
+    {"progress": None}, {"progress": "Blocked"},
+    {"title": ""}, {"due_date": "tomorrow"}, {"folder_id": None}, {"colour": "red"},
+])
+def test_patch_rejects_bad_values(db, body):
+    tid = _task()
+    before = ts.get_task(tid)
+    (status, out), = _run(("PATCH", f"/tasks/{tid}", body))
+    assert status == 400 and "error" in out
+    assert ts.get_task(tid) == before
+
+def test_patch_applies_all_fields_together(db):
+    tid = _task()
+    (status, out), = _run(("PATCH", f"/tasks/{tid}", {"done": True, "priority": "High", "progress": "Completed",
+                                                     "due_date": "2026-01-09", "title": "renamed"}))
+    assert status == 200
+    assert (out["done"], out["priority"], out["progress"], out["due_date"], out["title"]) == \
+        (True, "High", "Completed", "2026-01-09", "renamed")
+    (status, out), = _run(("PATCH", f"/tasks/{tid}", {"done": False, "due_date": None}))
+    assert (out["done"], out["due_date"]) == (False, None)
+
+def test_error_statuses(db):
+    inbox = ts.list_folders()[0][0]
+    results = _run(("GET", "/tasks/999"), ("PATCH", "/tasks/999", {"done": True}), ("GET", "/nope"),
+                   ("PUT", "/tasks"), ("POST", "/tasks", {"title": "x", "folder_id": 999}),
+                   ("POST", "/folders", {"name": "Inbox"}), ("POST", "/tasks", {}),
+                   ("GET", "/tasks?limit=x"), ("GET", "/tasks?limit=0"), ("GET", f"/tasks?folder={inbox}"))
+    assert [status for status, _ in results] == [404, 404, 404, 405, 409, 409, 400, 400, 400, 200]
+
+def test_list_limit_returns_newest(db):
+    ids = [_task(title=f"t{i}") for i in range(5)]
+    (status, out), = _run(("GET", "/tasks?limit=2"))
+    assert [t["id"] for t in out] == ids[:-3:-1]
+
+def test_bad_content_length_gets_400(db):
+    async def go():
+        api = ApiServer(workers=1)
+        srv = await api.start("127.0.0.1", 0)
+        port = srv.sockets[0].getsockname()[1]
+        try:
+            replies = []
+            for length in ("abc", "-5"):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(f"POST /folders HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+                replies.append(await reader.readline())
+                writer.close()
+            return replies
+        finally:
+            api.close()
+    assert [r.split()[1] for r in asyncio.run(go())] == [b"400", b"400"]
+
+def test_writes_from_other_processes_reach_cached_reads(db, monkeypatch):
+    monkeypatch.setattr(server, "SYNC_POLL_S", 0.01)
+    async def go():
+        api = ApiServer(workers=2)
+        await api.start("127.0.0.1", 0)
+        try:
+            before = [await _call(api, "GET", "/settings?keys=theme"), await _call(api, "GET", "/tasks?q=zebra")]
+            # Written straight to the database, as the Tk app or the CLI would
+            with db.session() as cur:
+                version = db.change_version(cur)
+                cur.execute("REPLACE INTO settings (k, v, row_version) VALUES ('theme', 'dark', %s)", (version,))
+                cur.execute("INSERT INTO tasks (title, row_version) VALUES ('Zebra crossing', %s)", (version,))
+            await asyncio.sleep(0.3)
+            after = [await _call(api, "GET", "/settings?keys=theme"), await _call(api, "GET", "/tasks?q=zebra")]
+            return before, after
+        finally:
+            api.close()
+    before, after = asyncio.run(go())
+    assert before == [(200, {"theme": None}), (200, [])]
+    assert after[0] == (200, {"theme": "dark"})
+    assert [t["title"] for t in after[1][1]] == ["Zebra crossing"]
+
+def test_changes_endpoint_polls_from_since(db):
+    (_s, first), = _run(("GET", "/changes?since=0"))
+    tid = _task(title="new")
+    (_s, delta), (_s2, idle) = _run(("GET", f"/changes?since={first['version']}"), ("GET", "/changes?since=9999"))
+    assert [t["id"] for t in delta["tasks"]] == [tid] and delta["version"] > first["version"]
+    assert idle["reset"] and idle["tasks"] == []
+
+def test_post_without_folder_goes_to_inbox(db):
+    tid = _task()
+    assert [r[0] for r in ts.list_tasks(folder_id=ts.inbox_id())] == [tid]
@@ -0,0 +1,62 @@
+from services import settings_service as ss
+from services import sync_service as sync
+from services import task_service as ts
+
+def _stale_tombstones(db, ids):
+    with db.session() as cur:
+        cur.execute(f"UPDATE tombstones SET deleted_at = %s WHERE row_id IN ({','.join(['%s'] * len(ids))})",
+                    ["2000-01-01 00:00:00"] + list(ids))
+
+def test_version_zero_is_a_full_snapshot(db):
+    tid = ts.add_task("a")
+    ch = sync.changes_since(0)
+    assert not ch["reset"]
+    assert [r[0] for r in ch["tasks"]] == [tid]
+    assert [name for _fid, name in ch["folders"]] == ["Inbox"]
+
+def test_nothing_new_returns_an_empty_delta(db):
+    version = sync.current_version()
+    ch = sync.changes_since(version)
+    assert ch["version"] == version and not ch["reset"]
+    assert ch["tasks"] == [] and ch["deleted"] == {"folders": [], "tasks": []}
+
+def test_delta_holds_only_later_writes(db):
+    keep, gone = ts.add_task("keep"), ts.add_task("gone")
+    version = sync.current_version()
+    ts.rename_task(keep, "kept")
+    ts.delete_task(gone)
+    folder = ts.create_folder("Work")
+    ss.set_setting("theme", "dark")
+    ch = sync.changes_since(version)
+    assert ch["version"] > version
+    assert [(r[0], r[1]) for r in ch["tasks"]] == [(keep, "kept")]
+    assert ch["folders"] == [(folder, "Work")]
+    assert ch["settings"] == {"theme": "dark"}
+    assert ch["deleted"] == {"folders": [], "tasks": [gone]}
+    assert sync.changes_since(ch["version"])["tasks"] == []
+
+def test_one_transaction_is_one_version(db):
+    version = sync.current_version()
+    db.run_batch([(ts.add_task, ("a",)), (ts.add_task, ("b",))])
+    assert sync.current_version() == version + 1
+
+def test_version_ahead_of_the_database_resets(db):
+    ch = sync.changes_since(sync.current_version() + 10)
+    assert ch["reset"] and ch["tasks"] == []
+
+def test_prune_keeps_recent_tombstones(db):
+    ts.delete_task(ts.add_task("x"))
+    assert sync.prune_tombstones(max_age_days=30) == 0
+
+def test_clients_older_than_the_pruned_range_reset(db):
+    a, b = ts.add_task("a"), ts.add_task("b")
+    before = sync.current_version()
+    ts.delete_task(a)
+    between = sync.current_version()
+    ts.delete_task(b)
+    _stale_tombstones(db, [a])
+    assert sync.prune_tombstones(max_age_days=30) == 1
+    assert sync.changes_since(before)["reset"]  # may have missed a's delete
+    ch = sync.changes_since(between)  # saw a's delete already
+    assert not ch["reset"] and ch["deleted"]["tasks"] == [b]
+    assert not sync.changes_since(0)["reset"]
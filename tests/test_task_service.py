@@ -0,0 +1,72 @@
+from datetime import date, datetime, timedelta
+
+from models import Task, TaskFilter
+from services import task_service as ts
+
+def _inbox():
+    return next(fid for fid, name in ts.list_folders() if name == "Inbox")
+
+def test_task_crud(db):
+    tid = ts.add_task("Write report", "draft", date(2026, 1, 9), "High", _inbox())
+    ts.rename_task(tid, "Write the report")
+    ts.set_progress(tid, "In progress")
+    ts.update_priority(tid, "Medium")
+    ts.set_start_date(tid, date(2026, 1, 5))
+    t = Task.from_row(ts.get_task(tid))
+    assert (t.title, t.notes, t.start_date, t.due_date, t.priority, t.progress, t.is_done) == \
+        ("Write the report", "draft", date(2026, 1, 5), date(2026, 1, 9), "Medium", "In progress", False)
+    ts.delete_task(tid)
+    assert ts.get_task(tid) is None
+
+def test_list_tasks_newest_first_with_filters(db):
+    inbox = _inbox()
+    today = date.today()
+    old = ts.add_task("overdue", due_date=today - timedelta(days=2), folder_id=inbox)
+    due = ts.add_task("due today", due_date=today, priority="High", folder_id=inbox)
+    done = ts.add_task("finished", folder_id=inbox)
+    ts.toggle_done(done, True)
+    assert [r[0] for r in ts.list_tasks(folder_id=inbox)] == [done, due, old]
+    assert [r[0] for r in ts.list_tasks(include_done=False)] == [due, old]
+    assert [r[0] for r in ts.list_tasks(filters=TaskFilter.from_mode("overdue"))] == [old]
+    assert [r[0] for r in ts.list_tasks(filters=TaskFilter.from_mode("today", "High"))] == [due]
+    assert [r[0] for r in ts.list_tasks(filters=TaskFilter.from_mode("done"))] == [done]
+
+def test_list_tasks_page_walks_the_keyset(db):
+    ids = [ts.add_task(f"t{i}") for i in range(5)]
+    seen, after = [], None
+    while True:
+        rows, after = ts.list_tasks_page(after=after, limit=2)
+        seen += [r[0] for r in rows]
+        if after is None:
+            break
+    assert seen == ids[::-1]
+
+def test_delete_folder_moves_tasks_to_inbox(db):
+    work = ts.create_folder("Work")
+    tid = ts.add_task("x", folder_id=work)
+    ts.delete_folder(work)
+    assert [name for _fid, name in ts.list_folders()] == ["Inbox"]
+    assert [r[0] for r in ts.list_tasks(folder_id=_inbox())] == [tid]
+
+def test_done_count_rollup_follows_toggles_and_deletes(db):
+    a, b = ts.add_task("a"), ts.add_task("b")
+    ts.toggle_done_many([a, b], True)
+    ts.toggle_done_many([a, b], True)  # already done: counted once
+    assert ts.get_mini_stats()[0] == 2
+    ts.toggle_done(a, False)
+    assert ts.get_mini_stats()[0] == 1
+    ts.delete_task(b)
+    assert ts.get_mini_stats()[0] == 0
+
+def test_focus_minutes_rollup_matches_rebuild(db):
+    tid = ts.add_task("focus")
+    start = datetime.now().replace(microsecond=0)
+    ts.log_focus_session(tid, start, start + timedelta(minutes=25), 25)
+    ts.log_focus_session(None, start, start + timedelta(minutes=10), 10)
+    ts.toggle_done(tid, True)
+    before = ts.get_daily_stats(start.date(), start.date())
+    assert before == [(start.date(), 1, 35)]
+    ts.rebuild_daily_stats()
+    assert ts.get_daily_stats(start.date(), start.date()) == before
+    assert ts.get_mini_stats() == (1, 35)
+    assert [r[4] for r in ts.list_focus_sessions(task_id=tid)] == [25]
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+from services.timer_service import BREAK, IDLE, PAUSED, RUNNING, WORK, PomodoroTimer
+
+class FakeClock:
+    """Monotonic seconds and a wall clock, both moved by hand."""
+    def __init__(self):
+        self.now = 1000.0
+        self.wall = datetime(2026, 1, 5, 9, 0)
+
+    def advance(self, s: float):
+        self.now += s
+        self.wall += timedelta(seconds=s)
+
+def _timer(clock, **kw):
+    return PomodoroTimer(work_s=10, break_s=5, clock=lambda: clock.now, wall_clock=lambda: clock.wall, **kw)
+
+def test_late_tick_chains_next_phase_from_old_deadline():
+    clock = FakeClock()
+    t = _timer(clock, auto_start_break=True)
+    t.start()
+    clock.advance(13)  # polled 3 s after the work deadline
+    done = t.tick()
+    assert done.mode == WORK and done.active_s == 10
+    assert done.ended_at == clock.wall - timedelta(seconds=3)
+    s = t.snapshot()
+    assert (s.mode, s.status, s.remaining_s, s.cycles) == (BREAK, RUNNING, 2, 1)
+
+def test_late_ticks_do_not_drift_across_cycles():
+    clock = FakeClock()
+    t = _timer(clock, auto_start_break=True, auto_start_work=True)
+    t.start()
+    clock.advance(12)  # work ends at 10
+    assert t.tick().mode == WORK
+    clock.advance(4)   # break ends at 15
+    assert t.tick().mode == BREAK
+    clock.advance(10)  # work ends at 25
+    assert t.tick().mode == WORK
+    s = t.snapshot()
+    assert (s.mode, s.remaining_s, s.cycles) == (BREAK, 4, 2)
+    assert t.tick() is None
+
+def test_gap_longer_than_next_phase_starts_it_fresh():
+    clock = FakeClock()
+    t = _timer(clock, auto_start_break=True)
+    t.start()
+    clock.advance(60)  # asleep through the whole break
+    t.tick()
+    assert t.snapshot().remaining_s == 5
+
+def test_no_auto_start_leaves_next_phase_idle():
+    clock = FakeClock()
+    t = _timer(clock)
+    t.start()
+    clock.advance(12)
+    t.tick()
+    s = t.snapshot()
+    assert (s.mode, s.status, s.remaining_s) == (BREAK, IDLE, 5)
+
+def test_pause_resume_keeps_remaining_time():
+    clock = FakeClock()
+    t = _timer(clock)
+    t.start()
+    clock.advance(4)
+    t.pause()
+    clock.advance(100)
+    assert t.tick() is None
+    s = t.snapshot()
+    assert (s.status, s.remaining_s) == (PAUSED, 6)
+    t.start()
+    clock.advance(5.5)
+    assert t.tick() is None and t.snapshot().remaining_s == 1
+    clock.advance(0.5)
+    done = t.tick()
+    assert done.active_s == 10
+    assert done.started_at == datetime(2026, 1, 5, 9, 0)
+
+def test_wall_clock_jump_does_not_move_deadline():
+    clock = FakeClock()
+    t = _timer(clock)
+    t.start()
+    clock.wall += timedelta(hours=1)   # NTP / DST / manual change
+    clock.advance(3)
+    assert t.snapshot().remaining_s == 7
+    clock.wall -= timedelta(hours=2)
+    assert t.tick() is None
+    clock.advance(7)
+    assert t.tick().mode == WORK
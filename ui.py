@@ -2,23 +2,27 @@
 # ui.py
 import tkinter as tk
 from tkinter import font as tkfont
-from tkinter import ttk, messagebox, simpledialog
-from datetime import datetime, date, timedelta
+from tkinter import ttk, messagebox, simpledialog, filedialog
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import os
-
-try:
-    from PIL import Image, ImageTk
-    PIL_AVAILABLE = True
-except Exception:
-    PIL_AVAILABLE = False
+import queue
 
 from services.task_service import (
-    add_task, list_tasks, toggle_done, delete_task, update_priority,
-    rename_task, set_start_date, set_due_date, set_progress, get_mini_stats,
-    log_focus_session, list_folders, create_folder, rename_folder,
-    delete_folder, move_task_to_folder
+    add_task, get_task, list_tasks_page, list_tasks_by_ids, search_tasks, rename_task, get_mini_stats,
+    log_focus_session, list_folders, create_folder, rename_folder, delete_folder,
+    toggle_done_many, delete_task_many, update_priority_many, set_progress_many,
+    set_start_date_many, set_due_date_many, move_task_to_folder_many
 )
-from services.settings_service import get_setting, set_setting
+from config import DEBUG
+from database import run_batch
+from metrics import REGISTRY
+from models import Task, TaskFilter, TaskTable
+from services.settings_service import (all_settings, get_setting, get_settings, set_setting, set_setting_deferred,
+                                       merge_settings, invalidate_settings)
+from services.sync_service import current_version, changes_since
+from services.timer_service import PomodoroTimer
+from services.search_service import index_task, unindex_tasks, drop_index
 
 # --------- Pastel themes ----------
 THEMES = {
@@ -44,6 +48,19 @@ def pick_first_available_font(root, candidates):
 
 PRIORITY_ORDER = {"Low": 0, "Medium": 1, "High": 2}
 PROGRESS_ORDER = {"Not started": 0, "In progress": 1, "Completed": 2}
+TASK_PAGE_SIZE = 200  # rows fetched per scroll step
+SEARCH_LIMIT = 500    # best matches shown for a search
+TIMER_POLL_MS = 200   # how often a running timer is redrawn (the engine keeps time itself)
+SYNC_POLL_MS = 3000   # how often to ask for changes made by other windows / machines
+# Treeview value positions
+COL_TITLE, COL_START, COL_DUE, COL_PRIORITY, COL_PROGRESS, COL_DONE = range(6)
+
+# Settings read by App at startup (fetched together in one call)
+SETTING_DEFAULTS = {
+    "theme_name": "Sky", "filter_mode": "all", "priority_filter": "All", "weekly_goal_min": "300",
+    "timer_mode": "work", "auto_start_break": "0",
+    "work_h": "0", "work_m": "25", "work_s": "0", "break_h": "0", "break_m": "10", "break_s": "0",
+}
 
 class ThemeManager:
     def __init__(self, root):
@@ -75,18 +92,294 @@ class ThemeManager:
                      relief="flat", font=("Helvetica", 10, "bold"))
 
 
+class TableController:
+    """Keeps a ttk.Treeview in step with a list of (iid, values) rows.
+
+    Only rows that were added, changed or removed touch the widget, so the
+    scroll position and selection survive a refresh.
+    """
+    def __init__(self, tree: ttk.Treeview):
+        self.tree = tree
+        self._values: dict[str, tuple] = {}   # iid -> values on screen
+        self._order: list[str] = []           # iids in display order
+
+    def __len__(self):
+        return len(self._order)
+
+    def set_rows(self, rows):
+        tree = self.tree
+        new_values = dict(rows)
+        new_order = list(new_values)
+        top = tree.yview()[0]
+
+        gone = [iid for iid in self._order if iid not in new_values]
+        if gone: tree.delete(*gone)
+        kept_before = [iid for iid in self._order if iid in new_values]
+        kept_after = [iid for iid in new_order if iid in self._values]
+
+        for index, iid in enumerate(new_order):
+            old = self._values.get(iid)
+            if old is None:
+                tree.insert("", index, iid=iid, values=new_values[iid])
+            elif old != new_values[iid]:
+                tree.item(iid, values=new_values[iid])
+        if kept_before != kept_after:  # sort order changed: move rows into place
+            for index, iid in enumerate(new_order):
+                tree.move(iid, "", index)
+
+        self._values, self._order = new_values, new_order
+        if gone: tree.yview_moveto(top)
+
+    def append_rows(self, rows):
+        for iid, values in rows:
+            if iid in self._values: continue
+            self.tree.insert("", "end", iid=iid, values=values)
+            self._values[iid] = values; self._order.append(iid)
+
+    def update_row(self, iid: str, values: tuple) -> bool:
+        """Patch a row already on screen; False if it isn't there."""
+        if iid not in self._values: return False
+        if self._values[iid] != values:
+            self.tree.item(iid, values=values); self._values[iid] = values
+        return True
+
+    def remove_row(self, iid: str):
+        if iid in self._values:
+            self.tree.delete(iid); del self._values[iid]; self._order.remove(iid)
+
+    def snapshot(self, iid: str):
+        """(index, values) of a row on screen, or None; see restore_row."""
+        if iid not in self._values: return None
+        return self._order.index(iid), self._values[iid]
+
+    def restore_row(self, iid: str, index: int, values: tuple):
+        if not self.update_row(iid, values):
+            index = min(index, len(self._order))
+            self.tree.insert("", index, iid=iid, values=values)
+            self._values[iid] = values; self._order.insert(index, iid)
+
+
+class DbWorker:
+    """Runs service calls off the Tk thread and hands results back on it.
+
+    Reads share a small pool; writes (serial=True) run one at a time in the
+    order they were submitted. Callbacks fire from a root.after poll, never
+    from a worker thread. A job submitted with a `key` supersedes the previous
+    job with that key (it is cancelled, or its result is dropped).
+    """
+    POLL_MS = 15
+
+    def __init__(self, root, on_busy=None, readers: int = 2):
+        self.root = root
+        self.on_busy = on_busy
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        self._results = queue.Queue()   # finished futures, drained by _poll
+        self._latest = {}               # key -> newest Future for that key
+        self._inflight = 0
+        self._poll_id = None
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None, serial=False):
+        if key is not None: self.cancel(key)
+        fut = (self._writer if serial else self._readers).submit(fn, *args)
+        if key is not None: self._latest[key] = fut
+        self._set_inflight(+1)
+        fut.add_done_callback(lambda f: self._results.put((f, key, on_done, on_error)))
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.POLL_MS, self._poll)
+        return fut
+
+    def cancel(self, key):
+        """Forget the job for `key`; its callbacks will not run."""
+        fut = self._latest.pop(key, None)
+        if fut is not None: fut.cancel()
+
+    def close(self):
+        self._readers.shutdown(wait=False, cancel_futures=True)
+        self._writer.shutdown(wait=True)  # let queued writes land
+
+    def _set_inflight(self, delta: int):
+        was_busy = self._inflight > 0
+        self._inflight += delta
+        if self.on_busy and was_busy != (self._inflight > 0):
+            self.on_busy(self._inflight > 0)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try: fut, key, on_done, on_error = self._results.get_nowait()
+            except queue.Empty: break
+            self._set_inflight(-1)
+            if fut.cancelled(): continue
+            if key is not None:
+                if self._latest.get(key) is not fut: continue  # superseded
+                del self._latest[key]
+            try:
+                err = fut.exception()
+                if err is None:
+                    if on_done: on_done(fut.result())
+                elif on_error: on_error(err)
+                else: print("Background DB call failed:", err)
+            except Exception as e:
+                print("DB callback failed:", e)
+        if self._inflight:
+            self._poll_id = self.root.after(self.POLL_MS, self._poll)
+
+
+def _rename_first(tids, title):
+    # rename is single-row; adapts rename_task to the (ids, ...) shape of the queue
+    rename_task(tids[0], title)
+
+def _load_insights():
+    # Runs on a DbWorker reader; the number crunching itself happens in a worker process.
+    # Imported here so NumPy stays off the startup path.
+    from services.analytics_service import get_focus_analytics
+    stats = get_focus_analytics()
+    top = list(stats["per_task"])[:3]
+    return stats, {row[0]: row[1] for row in list_tasks_by_ids(top)}
+
+def _fetch_changes(version: int):
+    # Runs on a DbWorker reader; keeps this process's search index in step with other writers
+    changes = changes_since(version)
+    if changes["reset"]:  # restored database, or too far behind (pruned tombstones)
+        invalidate_settings(); drop_index()
+        all_settings()  # reload here, not on the Tk thread's next get_setting()
+        return changes
+    for row in changes["tasks"]:
+        index_task(row[0], row[1], row[2])
+    unindex_tasks(changes["deleted"]["tasks"])
+    return changes
+
+
+class MutationQueue:
+    """Write-behind queue for task edits.
+
+    push() shows an edit in the view at once and queues the service call.
+    BATCH_MS after the first queued edit, everything pending is committed as
+    one transaction on the DbWorker writer (run_batch retries transient
+    errors). If the batch still fails, its edits are undone newest first.
+    """
+    BATCH_MS = 300
+
+    def __init__(self, root, db: DbWorker, on_committed=None, on_failed=None):
+        self.root = root
+        self.db = db
+        self.on_committed = on_committed   # called with [(fn, args), ...]
+        self.on_failed = on_failed         # called with the exception
+        self._pending = []                 # (fn, args, undo)
+        self._in_flight = []               # calls submitted but not yet committed
+        self._after_id = None
+
+    def busy_ids(self) -> set:
+        """Task ids with edits queued or committing (their rows show the edit already)."""
+        return {tid for fn, args, *_ in self._pending + self._in_flight for tid in args[0]
+                if isinstance(args[0], list)}
+
+    def push(self, fn, *args, apply=None, undo=None):
+        if apply: apply()
+        self._pending.append((fn, args, undo))
+        if self._after_id is None:
+            self._after_id = self.root.after(self.BATCH_MS, self._on_timer)
+
+    def _on_timer(self):
+        self._after_id = None
+        self.flush()
+
+    def flush(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id); self._after_id = None
+        batch, self._pending = self._pending, []
+        if not batch: return
+        calls = [(fn, args) for fn, args, _undo in batch]
+        self._in_flight += calls
+        def settled():
+            self._in_flight = [c for c in self._in_flight if c not in calls]
+        def done(_):
+            settled()
+            if self.on_committed: self.on_committed(calls)
+        def failed(e):
+            settled()
+            for _fn, _args, undo in reversed(batch):
+                if undo: undo()
+            if self.on_failed: self.on_failed(e)
+        self.db.submit(run_batch, calls, serial=True, on_error=failed, on_done=done)
+
+    def drain(self):
+        """Commit what is still pending on the calling thread, without Tk.
+
+        For shutdown, after DbWorker.close() has let in-flight batches land;
+        the root may already be destroyed by then.
+        """
+        if self._after_id is not None:
+            try: self.root.after_cancel(self._after_id)
+            except tk.TclError: pass
+            self._after_id = None
+        batch, self._pending = self._pending, []
+        if batch: run_batch([(fn, args) for fn, args, _undo in batch])
+
+
+class RefreshScheduler:
+    """Coalesces repaints: invalidate() marks regions dirty, and each dirty
+    region's repaint runs once on the next idle pass, in registration order."""
+    def __init__(self, root):
+        self.root = root
+        self._repaint = {}   # region -> callable, in order
+        self._dirty = set()
+        self._after_id = None
+
+    def register(self, region: str, repaint):
+        self._repaint[region] = repaint
+
+    def invalidate(self, *regions: str):
+        self._dirty.update(regions)
+        if self._after_id is None:
+            self._after_id = self.root.after_idle(self._run)
+
+    def _run(self):
+        self._after_id = None
+        dirty, self._dirty = self._dirty, set()
+        for region, repaint in self._repaint.items():
+            if region in dirty: repaint()
+
+
 class App:
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: tk.Tk, on_loaded=None):
         self.root = root
         self.logo_small = None
-        self._load_logo()
+        self._on_loaded = on_loaded  # called once the first page of tasks is shown
+        # All service calls go through the worker so Tk never waits on the DB
+        self.db = DbWorker(root, on_busy=self._on_db_busy)
+        self.edits = MutationQueue(root, self.db, on_committed=self._edits_committed, on_failed=self._edits_failed)
+        # Flush queued edits while Tk is still alive, then destroy
+        root.protocol("WM_DELETE_WINDOW", self._on_close)
+        # Handlers mark regions dirty instead of reloading; folders first, since tasks depend on the pick
+        self.refresh = RefreshScheduler(root)
+        self.refresh.register("folders", self.reload_folders)
+        self.refresh.register("tasks", self.reload_tasks)
+        self.refresh.register("stats", self.refresh_stats)
+        self.refresh.register("timer", self._render_timer)
+        self._folder_to_select: int | None = None
+        self._timer_drawn = (None, None)  # (text, arc extent) on the canvas
+        self.folders = []
+        cfg = get_settings(SETTING_DEFAULTS.keys(), SETTING_DEFAULTS)  # cache warmed by main.py's init thread
 
         # Theme
         self.tm = ThemeManager(root)
-        self.theme_name = get_setting("theme_name", "Sky")
+        self.theme_name = cfg["theme_name"]
         self.palette = THEMES.get(self.theme_name, THEMES["Sky"])
         self.tm.apply(self.palette)
 
+        # FOCUSFLOW_DEBUG=1: menu to save / reset the query metrics
+        if DEBUG:
+            menubar = tk.Menu(root)
+            debug = tk.Menu(menubar, tearoff=0)
+            debug.add_command(label="Save metrics (JSON)…", command=lambda: self.on_save_metrics("json"))
+            debug.add_command(label="Save metrics (Prometheus)…", command=lambda: self.on_save_metrics("prometheus"))
+            debug.add_separator()
+            debug.add_command(label="Reset metrics", command=REGISTRY.reset)
+            menubar.add_cascade(label="Debug", menu=debug)
+            root.configure(menu=menubar)
+
         # Header (title + theme + folder picker)
         # header = ttk.Frame(root, style="TFrame"); header.pack(fill="x", padx=12, pady=(10, 6))
         # serif_stack = ["Georgia","Times New Roman","Times","Palatino Linotype","Palatino","Cambria","DejaVu Serif","Liberation Serif","Noto Serif"]
@@ -96,9 +389,9 @@ class App:
         header = ttk.Frame(root, style="TFrame")
         header.pack(fill="x", padx=12, pady=(10, 6))
 
-        # LOGO ONLY — no text label
-        if self.logo_small:
-            ttk.Label(header, image=self.logo_small, style="TLabel").pack(side="left", padx=(0, 12))
+        # LOGO ONLY — no text label (image filled in by _load_logo after first paint)
+        self.logo_label = ttk.Label(header, style="TLabel")
+        self.logo_label.pack(side="left", padx=(0, 12))
 
         # Folder picker
         folder_bar = ttk.Frame(header, style="TFrame"); folder_bar.pack(side="left")
@@ -122,7 +415,7 @@ class App:
         tools = ttk.Frame(root, style="Toolbar.TFrame"); tools.pack(fill="x", padx=12, pady=(0, 6))
 
         ttk.Label(tools, text="Filters:").pack(side="left", padx=(0,6))
-        self.filter_mode = get_setting("filter_mode", "all")
+        self.filter_mode = cfg["filter_mode"]
         self.filter_var = tk.StringVar(value=self.filter_mode)
         self.filter_combo = ttk.Combobox(
             tools, textvariable=self.filter_var, state="readonly", width=14,
@@ -132,25 +425,36 @@ class App:
         self.filter_combo.bind("<<ComboboxSelected>>", lambda e: self.on_set_filter(self.filter_var.get()))
 
         ttk.Label(tools, text="  |  Priority:", style="Muted.TLabel").pack(side="left", padx=(8, 6))
-        self.priority_filter = get_setting("priority_filter", "All")
+        self.priority_filter = cfg["priority_filter"]
         self.priority_var_filter = tk.StringVar(value=self.priority_filter)
         pcombo = ttk.Combobox(tools, textvariable=self.priority_var_filter, values=["All","High","Medium","Low"], state="readonly", width=8)
         pcombo.pack(side="left")
         pcombo.bind("<<ComboboxSelected>>", lambda e: self.on_set_priority_filter(self.priority_var_filter.get()))
 
+        # Search (right): narrows the list within the current folder + filters as you type
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(tools, textvariable=self.search_var, width=24)
+        search_entry.pack(side="right")
+        search_entry.bind("<Escape>", lambda e: self.search_var.set(""))
+        ttk.Label(tools, text="Search:").pack(side="right", padx=(0, 6))
+        self.search_var.trace_add("write", lambda *_: self.refresh.invalidate("tasks"))
+
         # Stats + goal
         stats = ttk.Frame(root, style="Toolbar.TFrame"); stats.pack(fill="x", padx=12, pady=(0, 6))
         self.done_today_var = tk.StringVar(value="Done today: 0")
         ttk.Label(stats, textvariable=self.done_today_var).pack(side="left", padx=(0, 12))
         self.week_minutes_var = tk.StringVar(value="Focus this week: 0 min")
         ttk.Label(stats, textvariable=self.week_minutes_var).pack(side="left", padx=(0, 8))
-        self.weekly_goal = int(get_setting("weekly_goal_min", "300") or "300")
+        self.weekly_goal = int(cfg["weekly_goal_min"] or "300")
         self.goal_label = ttk.Label(stats, text=f"Goal: {self.weekly_goal} min", style="Muted.TLabel")
         self.goal_label.pack(side="left", padx=(8, 8))
         ttk.Button(stats, text="Set goal", command=self.on_set_goal).pack(side="left")
+        ttk.Button(stats, text="Insights", command=self.on_show_insights).pack(side="left", padx=(6, 0))
         self.pb = ttk.Progressbar(stats, style="Accent.Horizontal.TProgressbar", orient="horizontal",
                                   length=220, mode="determinate", maximum=self.weekly_goal, value=0)
         self.pb.pack(side="left", padx=(8,0))
+        self.busy_var = tk.StringVar(value="")
+        ttk.Label(stats, textvariable=self.busy_var, style="Muted.TLabel").pack(side="right")
 
         # Add task
         card = ttk.Frame(root, style="Card.TFrame"); card.pack(fill="x", padx=12, pady=(0, 8))
@@ -167,7 +471,8 @@ class App:
 
         # Table (left)
         table_frame = ttk.Frame(content, style="TFrame"); table_frame.pack(side="left", fill="both", expand=True)
-        self.tree = ttk.Treeview(table_frame, columns=("title","start","due","priority","progress","done"), show="headings", height=14)
+        self.tree = ttk.Treeview(table_frame, columns=("title","start","due","priority","progress","done"), show="headings", height=14,
+                                 selectmode="extended")  # shift/ctrl-click for bulk actions
         # for col, txt, w in [("title","Title",320),("start","Start Date",120),("due","Due Date",120),
         #                     ("priority","Priority",110),("progress","Progress",140),("done","Done",80)]:
         #     self.tree.heading(col, text=txt)
@@ -183,8 +488,11 @@ class App:
 
         
         self.tree.pack(side="left", fill="both", expand=True)
-        sb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview); sb.pack(side="right", fill="y")
-        self.tree.configure(yscrollcommand=sb.set)
+        self.table = TableController(self.tree)
+        # Tasks stream in page by page (keyset cursor) as the list nears its end
+        self._task_cursor = None; self._tasks_exhausted = True; self._loading_more = False
+        self.tree_sb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview); self.tree_sb.pack(side="right", fill="y")
+        self.tree.configure(yscrollcommand=self._on_tree_yscroll)
 
         # Right-click menu (with Move to folder)
         self.ctx = tk.Menu(self.root, tearoff=0)
@@ -208,11 +516,11 @@ class App:
         self.tree.bind("<Button-3>", self.show_context); self.tree.bind("<Button-2>", self.show_context)
 
         # Pomodoro (right)
-        self.timer_mode = tk.StringVar(value=get_setting("timer_mode", "work"))  # work/break
-        self.auto_start_break = tk.BooleanVar(value=(get_setting("auto_start_break", "0") == "1"))
+        self.timer_mode = tk.StringVar(value=cfg["timer_mode"])  # work/break
+        self.auto_start_break = tk.BooleanVar(value=(cfg["auto_start_break"] == "1"))
 
         def _get_int(k, default):
-            try: return int(get_setting(k, str(default)) or default)
+            try: return int(cfg[k] or default)
             except: return default
         self.work_h = tk.StringVar(value=str(_get_int("work_h", 0)))
         self.work_m = tk.StringVar(value=str(_get_int("work_m", 25)))
@@ -221,9 +529,9 @@ class App:
         self.break_m = tk.StringVar(value=str(_get_int("break_m", 10)))
         self.break_s = tk.StringVar(value=str(_get_int("break_s", 0)))
 
-        self.remaining = 0; self.timer_after_id = None
-        self.timer_running = False; self.timer_paused = False
-        self.timer_started_at: datetime | None = None
+        self.timer = PomodoroTimer(self._get_duration_seconds("work"), self._get_duration_seconds("break"),
+                                   mode=self.timer_mode.get(), auto_start_break=self.auto_start_break.get())
+        self.timer_after_id = None
         self.timer_link_task_id: int | None = None
         self.timer_link_task_title = tk.StringVar(value="(no task linked)")
         self.timer_display = tk.StringVar(value="25:00")
@@ -293,9 +601,8 @@ class App:
 
         def _on_picker_change(*_):
             self._persist_durations()
-            if not self.timer_running:
-                self.remaining = self._get_duration_seconds(self.timer_mode.get())
-                self._update_timer_display()
+            self.timer.set_durations(self._get_duration_seconds("work"), self._get_duration_seconds("break"))
+            self.refresh.invalidate("timer")
         for v in [self.work_h, self.work_m, self.work_s, self.break_h, self.break_m, self.break_s]:
             v.trace_add("write", _on_picker_change)
 
@@ -346,10 +653,21 @@ class App:
         ttk.Button(actions, text="Mark Undone", command=self.mark_undone).pack(side="left", padx=6)
         ttk.Button(actions, text="Delete", command=self.delete_task_click).pack(side="left", padx=6)
 
-        self.reload_folders()  # set folder combo + selection
-        self.reload_tasks()
-        self.refresh_stats()
+        # Deltas are polled from a version read before the first load, so that
+        # load is at least as new as it; the read goes through the worker too
+        self._sync_version = None
+        self._tasks_loaded_at = datetime.now()
+        def start_sync(version):
+            self._sync_version = version
+            self.root.after(SYNC_POLL_MS, self._poll_changes)
+            self.refresh.invalidate("folders", "stats")  # folder combo + selection, then tasks
+        def sync_failed(e):
+            print("Sync failed:", e)  # no polling; the first load still runs
+            self.refresh.invalidate("folders", "stats")
+        self.db.submit(current_version, on_done=start_sync, on_error=sync_failed)
         self.on_change_mode()
+        # Decoding + resizing the logo is the slowest bit of startup; do it once the window is up
+        self.root.after(50, self._load_logo)
 
     def _load_logo(self):
         #"""Load the app icon from assets/icon and scale it for the header.
@@ -363,7 +681,12 @@ class App:
 
                 target_h = 100  # header height for the logo; tweak 28–40 to taste
 
-                if 'PIL_AVAILABLE' in globals() and PIL_AVAILABLE:
+                try:
+                    from PIL import Image, ImageTk  # imported lazily: PIL is slow to load
+                except Exception:
+                    Image = None
+
+                if Image is not None:
                     im = Image.open(icon_path).convert("RGBA")
                     target_w = round(im.width * (target_h / im.height))
                     im = im.resize((target_w, target_h), Image.LANCZOS)
@@ -375,6 +698,7 @@ class App:
                         factor = max(1, img.height() // target_h)
                         img = img.subsample(factor, factor)
                     self.logo_small = img
+                self.logo_label.configure(image=self.logo_small)
 
                 # Set window icon (has effect on Windows/Linux; limited effect on macOS)
                 try:
@@ -386,53 +710,111 @@ class App:
                 print("Logo load failed:", e)
                 self.logo_small = None
 
+    # ---------- Background DB ----------
+    def _on_db_busy(self, busy: bool):
+        self.busy_var.set("⟳ syncing…" if busy else "")
+
+    def _write(self, fn, *args, then=None, error=None):
+        """Run a mutating service call on the writer thread; `then(result)` after."""
+        self.edits.flush()  # keep queued task edits ahead of this write
+        self.db.submit(fn, *args, on_done=then, on_error=error, serial=True)
+
+    def _save_setting(self, key: str, value: str):
+        self.db.submit(set_setting, key, value, serial=True)
+
+    def close(self):
+        """Finish queued writes. Safe to call twice, and after the root is gone."""
+        self.db.close()  # writes already submitted land first
+        try:
+            self.edits.drain()
+        except Exception as e:
+            print("❌ Could not save pending edits:", e)
+
+    def _on_close(self):
+        self.close()
+        self.root.destroy()
+
+    def _edit_tasks(self, tids: list[int], fn, *args, col: int | None = None, value="", remove=False):
+        """Queue fn(tids, *args) and show its effect on those rows straight away."""
+        iids = [str(t) for t in tids]
+        before = {iid: self.table.snapshot(iid) for iid in iids}
+        def apply():
+            for iid in iids:
+                if remove:
+                    self.table.remove_row(iid)
+                elif col is not None and before[iid] is not None:
+                    vals = list(self.table.snapshot(iid)[1]); vals[col] = value
+                    self.table.update_row(iid, tuple(vals))
+        def undo():
+            # lowest index first so every row lands back in its old slot
+            for iid, snap in sorted(((i, b) for i, b in before.items() if b), key=lambda x: x[1][0]):
+                self.table.restore_row(iid, *snap)
+        self.edits.push(fn, list(tids), *args, apply=apply, undo=undo)
+
+    def _edits_committed(self, calls):
+        # Re-read the touched rows: the filter may now hide them, and the DB has the final say
+        tids = {tid for fn, args in calls if fn is not delete_task_many for tid in args[0]}
+        if len(tids) > 20:
+            self.refresh.invalidate("tasks")
+        else:
+            for tid in tids: self.refresh_task(tid)
+        if any(fn in (toggle_done_many, delete_task_many) for fn, _args in calls):
+            self.refresh.invalidate("stats")
+
+    def _edits_failed(self, e):
+        messagebox.showerror("Save failed", f"Your latest changes could not be saved:\n{e}")
+        self.refresh.invalidate("tasks")
+
     # ---------- Folders ----------
     def reload_folders(self):
-        folders = list_folders()
-        names = [name for (_id, name) in folders]
-        ids   = [fid  for (fid, _name) in folders]
-        # remember / default to Inbox
-        saved = get_setting("current_folder_id", "")
-        self.folder_map = dict(zip(names, ids))
-        self.folder_combo.configure(values=names)
-        if saved and any(fid == int(saved) for fid in ids):
-            idx = ids.index(int(saved)); self.folder_combo.set(names[idx]); self.folder_id = ids[idx]
-        else:
-            # pick Inbox or first
-            if "Inbox" in self.folder_map:
-                self.folder_combo.set("Inbox"); self.folder_id = self.folder_map["Inbox"]
-            elif names:
-                self.folder_combo.set(names[0]); self.folder_id = self.folder_map[names[0]]
+        select_id, self._folder_to_select = self._folder_to_select, None
+        def load():  # the saved pick is read here too: the settings cache may be cold after a sync reset
+            return list_folders(), get_setting("current_folder_id", "")
+        def apply(result):
+            folders, saved = result
+            self.folders = folders
+            names = [name for (_id, name) in folders]
+            ids   = [fid  for (fid, _name) in folders]
+            # remember / default to Inbox
+            saved = str(select_id) if select_id is not None else saved
+            self.folder_map = dict(zip(names, ids))
+            self.folder_combo.configure(values=names)
+            if saved and any(fid == int(saved) for fid in ids):
+                idx = ids.index(int(saved)); self.folder_combo.set(names[idx]); self.folder_id = ids[idx]
+            else:
+                # pick Inbox or first
+                if "Inbox" in self.folder_map:
+                    self.folder_combo.set("Inbox"); self.folder_id = self.folder_map["Inbox"]
+                elif names:
+                    self.folder_combo.set(names[0]); self.folder_id = self.folder_map[names[0]]
+            self.refresh.invalidate("tasks")  # the folder pick decides which tasks to show
+        self.db.submit(load, on_done=apply, key="folders")
 
     def on_folder_change(self, _evt=None):
         name = self.folder_var.get()
         self.folder_id = self.folder_map.get(name)
         if self.folder_id is not None:
-            set_setting("current_folder_id", str(self.folder_id))
-        self.reload_tasks()
+            self._save_setting("current_folder_id", str(self.folder_id))
+        self.refresh.invalidate("tasks")
 
     def on_add_folder(self):
         name = simpledialog.askstring("New folder", "Folder name:", parent=self.root)
         if not name: return
-        try:
-            fid = create_folder(name.strip())
-            self.reload_folders()
+        def created(fid):
             # select it
-            self.folder_combo.set(name.strip()); self.folder_id = fid
-            set_setting("current_folder_id", str(fid))
-            self.reload_tasks()
-        except Exception as e:
-            messagebox.showerror("Folder", f"Could not create folder:\n{e}")
+            self._save_setting("current_folder_id", str(fid))
+            self._folder_to_select = fid
+            self.refresh.invalidate("folders")
+        self._write(create_folder, name.strip(), then=created,
+                    error=lambda e: messagebox.showerror("Folder", f"Could not create folder:\n{e}"))
 
     def on_rename_folder(self):
         if not self.folder_id: return
         new = simpledialog.askstring("Rename folder", "New name:", initialvalue=self.folder_var.get(), parent=self.root)
         if not new: return
-        try:
-            rename_folder(self.folder_id, new.strip())
-            self.reload_folders(); self.reload_tasks()
-        except Exception as e:
-            messagebox.showerror("Folder", f"Could not rename folder:\n{e}")
+        self._write(rename_folder, self.folder_id, new.strip(),
+                    then=lambda _: self.refresh.invalidate("folders"),
+                    error=lambda e: messagebox.showerror("Folder", f"Could not rename folder:\n{e}"))
 
     def on_delete_folder(self):
         if not self.folder_id: return
@@ -440,20 +822,18 @@ class App:
             messagebox.showinfo("Folder", "Inbox cannot be deleted."); return
         if not messagebox.askyesno("Delete folder", "Move tasks to Inbox and delete this folder?"):
             return
-        try:
-            delete_folder(self.folder_id)
-            self.reload_folders(); self.reload_tasks()
-        except Exception as e:
-            messagebox.showerror("Folder", f"Could not delete folder:\n{e}")
+        self._write(delete_folder, self.folder_id,
+                    then=lambda _: self.refresh.invalidate("folders"),
+                    error=lambda e: messagebox.showerror("Folder", f"Could not delete folder:\n{e}"))
 
     # ---------- Filters / priority ----------
     def on_set_filter(self, key: str):
-        self.filter_mode = key; set_setting("filter_mode", key)
-        self.reload_tasks(); self.refresh_stats()
+        self.filter_mode = key; self._save_setting("filter_mode", key)
+        self.refresh.invalidate("tasks", "stats")
 
     def on_set_priority_filter(self, value: str):
-        self.priority_filter = value; set_setting("priority_filter", value)
-        self.reload_tasks()
+        self.priority_filter = value; self._save_setting("priority_filter", value)
+        self.refresh.invalidate("tasks")
 
     # ---------- Theme / stats ----------
     # def on_theme_change(self, _evt=None):
@@ -467,7 +847,7 @@ class App:
         self.palette = THEMES[name]
 
         # Save and apply theme
-        set_setting("theme_name", name)
+        self._save_setting("theme_name", name)
         self.tm.apply(self.palette)
 
         # 🎨 Update Pomodoro colors (circle, arc, timer text)
@@ -480,16 +860,53 @@ class App:
 
 
     def refresh_stats(self):
-        done_today, week_minutes = get_mini_stats()
+        self.db.submit(get_mini_stats, on_done=self._show_stats, key="stats")
+
+    def _show_stats(self, stats):
+        done_today, week_minutes = stats
         self.done_today_var.set(f"Done today: {done_today}")
         self.week_minutes_var.set(f"Focus this week: {week_minutes} min")
         self.pb.configure(maximum=self.weekly_goal, value=min(week_minutes, self.weekly_goal))
 
+    def on_show_insights(self):
+        self.db.submit(_load_insights, on_done=self._show_insights, key="insights",
+                       on_error=lambda e: messagebox.showerror("Insights", f"Could not load insights:\n{e}"))
+
+    def _show_insights(self, result):
+        stats, titles = result
+        if not stats["total_minutes"]:
+            messagebox.showinfo("Insights", "No focus sessions logged yet."); return
+        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        heat = stats["heatmap"]
+        wd, hr = max(((d, h) for d in range(7) for h in range(24)), key=lambda dh: heat[dh[0]][dh[1]])
+        folder_names = dict(self.folders)
+        lines = [
+            f"Total focus: {stats['total_minutes'] // 60} h {stats['total_minutes'] % 60} min",
+            f"Streak: {stats['current_streak']} days (best {stats['longest_streak']})",
+            f"7-day average: {stats['rolling_avg'][-1]:.0f} min/day",
+            f"Most focused: {days[wd]}s around {hr:02d}:00",
+            "", "Top tasks:",
+        ] + [f"  {titles.get(tid, f'Task #{tid}')}: {m} min" for tid, m in list(stats["per_task"].items())[:3]] + [
+            "", "Top folders:",
+        ] + [f"  {folder_names.get(fid, f'Folder #{fid}')}: {m} min" for fid, m in list(stats["per_folder"].items())[:3]]
+        messagebox.showinfo("Insights", "\n".join(lines))
+
+    def on_save_metrics(self, fmt: str):
+        ext = ".json" if fmt == "json" else ".prom"
+        path = filedialog.asksaveasfilename(parent=self.root, defaultextension=ext,
+                                            initialfile=f"focusflow-metrics{ext}")
+        if not path:
+            return
+        try:
+            REGISTRY.dump(path, fmt)
+        except OSError as e:
+            messagebox.showerror("Metrics", f"Could not save metrics:\n{e}")
+
     def on_set_goal(self):
         val = simpledialog.askinteger("Weekly goal", "Minutes per week:", initialvalue=self.weekly_goal, minvalue=30, maxvalue=10080, parent=self.root)
         if val:
             self.weekly_goal = int(val)
-            set_setting("weekly_goal_min", str(self.weekly_goal))
+            self._save_setting("weekly_goal_min", str(self.weekly_goal))
             self.goal_label.configure(text=f"Goal: {self.weekly_goal} min")
             self.pb.configure(maximum=self.weekly_goal)
 
@@ -498,67 +915,188 @@ class App:
         title = self.title_var.get().strip()
         if not title:
             messagebox.showwarning("Missing title", "Please type a task title."); return
-        add_task(title, priority=(self.priority_var.get() or "Low"), folder_id=self.folder_id)
+        priority, folder_id = (self.priority_var.get() or "Low"), self.folder_id
+        self._write(lambda: add_task(title, priority=priority, folder_id=folder_id),
+                    then=lambda _: self.refresh.invalidate("tasks"))
         self.title_var.set(""); self.priority_var.set("Low")
-        self.reload_tasks()
+
+    @staticmethod
+    def _row_values(row):
+        t = Task.from_row(row)
+        start_str = t.start_date.strftime("%Y-%m-%d") if t.start_date else ""
+        due_str   = t.due_date.strftime("%Y-%m-%d") if t.due_date else ""
+        return str(t.id), (t.title, start_str, due_str, t.priority, t.progress, "✓" if t.is_done else "")
+
+    def _request_page(self, after, limit: int, apply):
+        folder_id, filters, loaded_at = self.folder_id, self._task_filter(), datetime.now()
+        def done(result):
+            rows, self._task_cursor = result
+            self._tasks_exhausted = self._task_cursor is None
+            self._loading_more = False
+            if after is None:
+                self._tasks_loaded_at = loaded_at
+            apply(self._row_values(r) for r in rows)
+            if self._on_loaded:
+                on_loaded, self._on_loaded = self._on_loaded, None
+                on_loaded()
+        def failed(e):
+            self._loading_more = False
+            print("Loading tasks failed:", e)
+        self.db.submit(lambda: list_tasks_page(folder_id=folder_id, filters=filters, after=after, limit=limit),
+                       on_done=done, on_error=failed, key="tasks")
+
+    def _search_tasks(self, query: str):
+        folder_id, filters = self.folder_id, self._task_filter()
+        def done(rows):
+            self._task_cursor, self._tasks_exhausted, self._loading_more = None, True, False
+            self.table.set_rows(self._row_values(r) for r in rows)
+        def failed(e):
+            self._loading_more = False
+            print("Search failed:", e)
+        self._loading_more = True
+        self.db.submit(lambda: search_tasks(query, SEARCH_LIMIT, folder_id=folder_id, filters=filters),
+                       on_done=done, on_error=failed, key="tasks")
 
     def reload_tasks(self):
-        rows = self._apply_filters(list_tasks(include_done=True, folder_id=self.folder_id))
-        self.tree.delete(*self.tree.get_children())
-        for (tid, title, _notes, start_date, due_date, priority, progress, is_done) in rows:
-            start_str = start_date.strftime("%Y-%m-%d") if start_date else ""
-            due_str   = due_date.strftime("%Y-%m-%d") if due_date else ""
-            self.tree.insert("", "end", iid=str(tid), values=(title, start_str, due_str, priority, progress, "✓" if is_done else ""))
-        self.tree.update_idletasks(); self.root.update_idletasks()
+        query = self.search_var.get().strip()
+        if query:
+            self._search_tasks(query); return  # ranked matches, no paging
+        # Re-read as many rows as are loaded now, so the diff keeps the scroll spot
+        self._loading_more = True  # no paging until this lands
+        self._request_page(None, max(TASK_PAGE_SIZE, len(self.table)), self.table.set_rows)
+
+    def load_more_tasks(self):
+        if self._tasks_exhausted:
+            self._loading_more = False; return
+        self._request_page(self._task_cursor, TASK_PAGE_SIZE, self.table.append_rows)
+
+    def _on_tree_yscroll(self, first, last):
+        self.tree_sb.set(first, last)
+        if float(last) > 0.9 and not self._tasks_exhausted and not self._loading_more:
+            self._loading_more = True
+            self.root.after_idle(self.load_more_tasks)
+
+    def refresh_task(self, tid: int):
+        """Re-read one task after a mutation and patch (or drop) just its row."""
+        folder_id, filters = self.folder_id, self._task_filter()
+        def apply(row):
+            if row is None:
+                self.table.remove_row(str(tid)); return
+            if not self.table.update_row(*self._row_values(row)):
+                self.refresh.invalidate("tasks")  # newly visible under the filter: needs its sorted slot
+        self.db.submit(lambda: get_task(tid, folder_id=folder_id, filters=filters),
+                       on_done=apply, key=f"task:{tid}")
+
+    # ---------- Sync ----------
+    def _poll_changes(self):
+        def done(changes):
+            self._apply_changes(changes)
+            self.root.after(SYNC_POLL_MS, self._poll_changes)
+        def failed(e):
+            print("Sync failed:", e)
+            self.root.after(SYNC_POLL_MS, self._poll_changes)
+        self.db.submit(_fetch_changes, self._sync_version, on_done=done, on_error=failed, key="sync")
+
+    def _apply_changes(self, ch):
+        """Patch folders, rows and cached settings from a changes_since() delta."""
+        self._sync_version = ch["version"]
+        if ch["reset"]:
+            self.refresh.invalidate("folders", "stats"); return
+        if ch["settings"]:
+            merge_settings(ch["settings"])
+        if ch["folders"] or ch["deleted"]["folders"]:
+            self._apply_folder_changes(ch["folders"], ch["deleted"]["folders"])
+        if ch["tasks"] or ch["deleted"]["tasks"]:
+            self._apply_task_changes(ch["tasks"], ch["deleted"]["tasks"])
+            self.refresh.invalidate("stats")
+
+    def _apply_folder_changes(self, changed, deleted):
+        if self.folder_id in deleted:
+            self.refresh.invalidate("folders"); return  # falls back to Inbox
+        folders = dict(self.folders)
+        for fid in deleted: folders.pop(fid, None)
+        folders.update(changed)
+        self.folders = sorted(folders.items(), key=lambda f: f[1])
+        self.folder_map = {name: fid for fid, name in self.folders}
+        self.folder_combo.configure(values=[name for _fid, name in self.folders])
+        if self.folder_id in folders:
+            self.folder_combo.set(folders[self.folder_id])  # may have been renamed
+
+    def _apply_task_changes(self, changed, deleted):
+        busy = self.edits.busy_ids()  # rows already showing a newer local edit
+        searching = bool(self.search_var.get().strip())
+        folder_id, filters = self.folder_id, self._task_filter()
+        for tid in deleted:
+            self.table.remove_row(str(tid))
+        visible = set(TaskTable.from_rows(row[:8] for row in changed).where(filters).ids)
+        stale = False
+        for row in changed:  # oldest first
+            task, task_folder, created_at = row[:8], row[8], row[9]
+            if task[0] in busy:
+                continue
+            iid, values = self._row_values(task)
+            if (folder_id is not None and task_folder != folder_id) or task[0] not in visible:
+                self.table.remove_row(iid)
+            elif self.table.update_row(iid, values) or searching:
+                continue
+            elif created_at is not None and created_at >= self._tasks_loaded_at:
+                self.table.restore_row(iid, 0, values)  # new since the last load: newest first
+            else:
+                stale = True  # an older task moved into view; its slot needs the sorted list
+        if stale:
+            self.refresh.invalidate("tasks")
 
     def _selected_id(self) -> int | None:
         sel = self.tree.selection()
         return int(sel[0]) if sel else None
 
+    def _selected_ids(self) -> list[int]:
+        return [int(iid) for iid in self.tree.selection()]
+
     def mark_done(self):
-        tid = self._selected_id()
-        if tid is None: return
-        toggle_done(tid, True); self.reload_tasks(); self.refresh_stats()
+        tids = self._selected_ids()
+        if not tids: return
+        self._edit_tasks(tids, toggle_done_many, True, col=COL_DONE, value="✓")
 
     def mark_undone(self):
-        tid = self._selected_id()
-        if tid is None: return
-        toggle_done(tid, False); self.reload_tasks(); self.refresh_stats()
+        tids = self._selected_ids()
+        if not tids: return
+        self._edit_tasks(tids, toggle_done_many, False, col=COL_DONE, value="")
 
     def delete_task_click(self):
-        tid = self._selected_id()
-        if tid is None: return
-        if messagebox.askyesno("Delete", "Delete selected task?"):
-            delete_task(tid); self.reload_tasks(); self.refresh_stats()
+        tids = self._selected_ids()
+        if not tids: return
+        prompt = "Delete selected task?" if len(tids) == 1 else f"Delete {len(tids)} selected tasks?"
+        if messagebox.askyesno("Delete", prompt):
+            self._edit_tasks(tids, delete_task_many, remove=True)
 
     # ---------- Right-click actions ----------
     def show_context(self, event):
-        # rebuild Move-to-folder submenu with current folders
+        # rebuild Move-to-folder submenu from the folders loaded by reload_folders
         self.move_menu.delete(0, "end")
-        for fid, name in list_folders():
+        for fid, name in self.folders:
             self.move_menu.add_command(label=name, command=lambda f=fid: self.move_to_folder(f))
         row = self.tree.identify_row(event.y)
-        if row: self.tree.selection_set(row)
+        if row and row not in self.tree.selection(): self.tree.selection_set(row)
         try:
             self.ctx.tk_popup(event.x_root, event.y_root)
         finally:
             self.ctx.grab_release()
 
     def move_to_folder(self, folder_id: int):
-        tid = self._selected_id()
-        if tid is None: return
-        move_task_to_folder(tid, folder_id)
-        self.reload_tasks()
+        tids = self._selected_ids()
+        if not tids: return
+        self._edit_tasks(tids, move_task_to_folder_many, folder_id, remove=(folder_id != self.folder_id))
 
     def set_priority(self, level: str):
-        tid = self._selected_id()
-        if tid is None: return
-        update_priority(tid, level); self.reload_tasks()
+        tids = self._selected_ids()
+        if not tids: return
+        self._edit_tasks(tids, update_priority_many, level, col=COL_PRIORITY, value=level)
 
     def set_progress(self, state: str):
-        tid = self._selected_id()
-        if tid is None: return
-        set_progress(tid, state); self.reload_tasks()
+        tids = self._selected_ids()
+        if not tids: return
+        self._edit_tasks(tids, set_progress_many, state, col=COL_PROGRESS, value=state)
 
     def rename_selected(self):
         tid = self._selected_id()
@@ -567,45 +1105,29 @@ class App:
         current_title = cur_vals[0] if cur_vals else ""
         new_title = simpledialog.askstring("Rename Task", "New title:", initialvalue=current_title, parent=self.root)
         if new_title and new_title.strip():
-            rename_task(tid, new_title.strip()); self.reload_tasks()
+            self._edit_tasks([tid], _rename_first, new_title.strip(), col=COL_TITLE, value=new_title.strip())
 
     def set_date(self, kind: str):
-        tid = self._selected_id()
-        if tid is None: return
+        tids = self._selected_ids()
+        if not tids: return
         prompt = "Start date (YYYY-MM-DD, blank to clear):" if kind == "start" else "Due date (YYYY-MM-DD, blank to clear):"
         s = simpledialog.askstring("Set Date", prompt, parent=self.root)
         if s is None: return
         s = s.strip()
+        setter = set_start_date_many if kind == "start" else set_due_date_many
+        col = COL_START if kind == "start" else COL_DUE
         if s == "":
-            (set_start_date if kind == "start" else set_due_date)(tid, None); self.reload_tasks(); return
+            self._edit_tasks(tids, setter, None, col=col, value=""); return
         try:
             dt = datetime.strptime(s, "%Y-%m-%d").date()
         except ValueError:
             messagebox.showerror("Invalid date", "Please use YYYY-MM-DD."); return
-        (set_start_date if kind == "start" else set_due_date)(tid, dt); self.reload_tasks()
+        self._edit_tasks(tids, setter, dt, col=col, value=dt.strftime("%Y-%m-%d"))
 
     # ---------- Filtering ----------
-    def _apply_filters(self, rows):
-        today = date.today()
-        start_of_week = today - timedelta(days=today.weekday())
-        end_of_week = start_of_week + timedelta(days=6)
-        def in_week(d): return d is not None and start_of_week <= d <= end_of_week
-
-        mode = self.filter_mode
-        out = []
-        for (tid, title, _notes, start_date, due_date, priority, progress, is_done) in rows:
-            keep = True
-            if   mode == "today":   keep = (due_date == today)
-            elif mode == "week":    keep = in_week(due_date)
-            elif mode == "overdue": keep = (due_date is not None and due_date < today and not is_done)
-            elif mode == "done":    keep = bool(is_done)
-            elif mode == "p_not":   keep = (progress == "Not started")
-            elif mode == "p_in":    keep = (progress == "In progress")
-            elif mode == "p_done":  keep = (progress == "Completed")
-            if not keep: continue
-            if self.priority_filter != "All" and priority != self.priority_filter: continue
-            out.append((tid, title, _notes, start_date, due_date, priority, progress, is_done))
-        return out
+    def _task_filter(self) -> TaskFilter:
+        """Current filter dropdowns as a TaskFilter (evaluated in SQL)."""
+        return TaskFilter.from_mode(self.filter_mode, self.priority_filter)
 
     # ---------- Timer ----------
     def _get_duration_seconds(self, mode: str) -> int:
@@ -621,15 +1143,14 @@ class App:
             "work_h": self.work_h.get(), "work_m": self.work_m.get(), "work_s": self.work_s.get(),
             "break_h": self.break_h.get(), "break_m": self.break_m.get(), "break_s": self.break_s.get(),
         }.items():
-            set_setting(k, str(v))
+            set_setting_deferred(k, str(v))
 
     def on_change_mode(self):
         mode = self.timer_mode.get()
-        set_setting("timer_mode", mode)
-        total = self._get_duration_seconds(mode)
-        if not self.timer_running or not self.timer_paused:
-            self.remaining = total
-        self._update_timer_display()
+        self._save_setting("timer_mode", mode)
+        self.timer.set_durations(self._get_duration_seconds("work"), self._get_duration_seconds("break"))
+        self.timer.set_mode(mode)
+        self.refresh.invalidate("timer")
         
     def _apply_preset(self):
         preset = self.preset_var.get()
@@ -651,70 +1172,62 @@ class App:
         self.timer_link_task_title.set(vals[0] or f"Task #{tid}")
 
     def on_toggle_auto(self):
-        set_setting("auto_start_break", "1" if self.auto_start_break.get() else "0")
+        self.timer.auto_start_break = self.auto_start_break.get()
+        self._save_setting("auto_start_break", "1" if self.auto_start_break.get() else "0")
 
     def on_start_timer(self):
         self._persist_durations()
         if self.timer_link_task_id is None: self.link_current_task()
-        if not self.timer_running:
-            if self.remaining <= 0: self.on_change_mode()
-            self.timer_running = True; self.timer_paused = False
-            self.timer_started_at = datetime.now(); self._tick()
-        elif self.timer_paused:
-            self.timer_paused = False; self._tick()
+        self.timer.set_durations(self._get_duration_seconds("work"), self._get_duration_seconds("break"))
+        self.timer.start()
+        self._poll_timer()
 
     def on_pause_timer(self):
-        if not self.timer_running: return
-        self.timer_paused = True
-        if self.timer_after_id: self.root.after_cancel(self.timer_after_id); self.timer_after_id = None
+        self.timer.pause()
+        self._poll_timer()
 
     def on_reset_timer(self):
-        if self.timer_after_id: self.root.after_cancel(self.timer_after_id); self.timer_after_id = None
-        self.timer_running = False; self.timer_paused = False; self.timer_started_at = None
-        self.on_change_mode()
+        self.timer.reset()
+        self._poll_timer()
 
-    def _tick(self):
-        if not self.timer_running or self.timer_paused: return
-        if self.remaining <= 0: self._handle_session_complete(); return
-        self.remaining -= 1; self._update_timer_display()
-        self.timer_after_id = self.root.after(1000, self._tick)
-
-    # def _update_timer_display(self):
-    #     m = max(self.remaining, 0) // 60; s = max(self.remaining, 0) % 60
-    #     self.timer_display.set(f"{m:02d}:{s:02d}")
-
-    def _update_timer_display(self):
-        m = max(self.remaining, 0) // 60
-        s = max(self.remaining, 0) % 60
-        self.timer_display.set(f"{m:02d}:{s:02d}")
-        # Update canvas timer text
-        self.canvas.itemconfig(self.timer_text, text=f"{m:02d}:{s:02d}")
-        # Update progress arc (clockwise)
-        total = self._get_duration_seconds(self.timer_mode.get())
-        if total > 0:
-            progress = (1 - self.remaining / total) * 360
-            self.canvas.itemconfig(self.arc, extent=-progress)  # negative = clockwise
-
-
-
-    def _handle_session_complete(self):
-        self.timer_running = False; self.timer_paused = False
-        end_time = datetime.now()
-        if self.timer_started_at and self.timer_mode.get() == "work":
-            duration = int(round((end_time - self.timer_started_at).total_seconds() / 60.0))
+    def _poll_timer(self):
+        if self.timer_after_id: self.root.after_cancel(self.timer_after_id); self.timer_after_id = None
+        done = self.timer.tick()
+        self.refresh.invalidate("timer")
+        if self.timer.snapshot().running:
+            self.timer_after_id = self.root.after(TIMER_POLL_MS, self._poll_timer)
+        if done: self._handle_session_complete(done)
+
+    def _render_timer(self):
+        state = self.timer.snapshot()
+        m, s = divmod(state.remaining_s, 60)
+        text = f"{m:02d}:{s:02d}"
+        extent = -round(state.fraction_done * 360, 1) if state.total_s > 0 else self._timer_drawn[1]  # negative = clockwise
+        # Polls run 5x a second but the display changes once a second: only touch what moved
+        drawn_text, drawn_extent = self._timer_drawn
+        if text != drawn_text:
+            self.timer_display.set(text)
+            self.canvas.itemconfig(self.timer_text, text=text)
+        if extent is not None and extent != drawn_extent:
+            self.canvas.itemconfig(self.arc, extent=extent)
+        self._timer_drawn = (text, extent)
+
+    def _handle_session_complete(self, done):
+        if done.mode == "work":
+            duration = int(round(done.active_s / 60.0))
             if duration > 0:
-                try: log_focus_session(self.timer_link_task_id, self.timer_started_at, end_time, duration)
-                except Exception as e: print("Focus session log failed:", e)
-                self.refresh_stats()
+                self._write(log_focus_session, self.timer_link_task_id, done.started_at, done.ended_at, duration,
+                            then=lambda _: self.refresh.invalidate("stats"),
+                            error=lambda e: print("Focus session log failed:", e))
+        # The engine has already moved on to the next phase (and started it if auto)
+        mode = self.timer.snapshot().mode
+        if mode != self.timer_mode.get():
+            self.timer_mode.set(mode); self._save_setting("timer_mode", mode)
         try: self.root.bell()
         except Exception: pass
         messagebox.showinfo("Session complete", "Time's up!")
-        if self.timer_mode.get() == "work" and self.auto_start_break.get():
-            self.timer_mode.set("break"); self.on_change_mode(); self.on_start_timer()
-        else:
-            self.on_change_mode()
 
-def create_ui(root: tk.Tk):
-    return App(root)
+def create_ui(root: tk.Tk, on_loaded=None):
+    return App(root, on_loaded=on_loaded)
 
 